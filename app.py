@@ -1,16 +1,23 @@
 """Flask应用主文件"""
 from flask import Flask, render_template
 from flask_cors import CORS
-from database import init_db
+from database import init_db, init_app
 from routes import register_routes
+from utils import access_log
 
 # 创建Flask应用
 app = Flask(__name__)
 CORS(app)
 
+# 数据库连接池：请求结束时回收未归还的连接
+init_app(app)
+
 # 注册所有路由
 register_routes(app)
 
+# 配置 ACCESS_LOG_PATH 时记录 JSONL 访问日志
+access_log.init_app(app)
+
 
 @app.route('/')
 def index():
@@ -0,0 +1,11 @@
+"""性能基准测试
+
+每个基准脚本使用独立的临时数据库，运行方式：python -m benchmarks.<脚本名>
+
+- datagen：按规模和种子生成确定性的合成数据集（也可生成数据库文件供 locust 等外部压测使用）
+- bench_routes：各路由处理函数的微基准
+- bench_import：批量导入每秒导入的行数，低于 --min-rate 时退出码为 1
+- workload：多角色 locust 压测负载（入口为仓库根目录的 locustfile.py），无界面运行时写结果文件并按阈值设置退出码
+- replay：回放 utils/access_log.py 记录的 JSONL 访问日志（进程内或 HTTP），按路由输出延迟与错误率
+- results / compare：结果文件格式，以及比较两次运行的结果
+"""
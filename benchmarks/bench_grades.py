@@ -0,0 +1,71 @@
+"""成绩录入基准：比较逐条 PUT /api/student-courses/<id> 与批量 POST /api/student-courses/grades 的耗时
+
+python -m benchmarks.bench_grades [--sizes 30,300,3000]
+"""
+import argparse
+import sys
+import time
+from datetime import datetime
+
+from benchmarks.harness import use_temp_database
+
+# 必须在导入 app / database 之前设置，确保使用临时数据库
+use_temp_database('bench_grades_')
+
+from app import app  # noqa: E402
+from database import init_db, get_db  # noqa: E402
+
+
+def seed_class(size):
+    """创建一门课程和 size 名已选课的学生，返回 (课程 id, [(选课 id, 学号)])"""
+    conn = get_db()
+    now = datetime.now().isoformat()
+    cursor = conn.execute('INSERT INTO courses (course_code, course_name, created_at) VALUES (?, ?, ?)',
+                          (f'BENCH{size}', f'基准课程{size}', now))
+    course_id = cursor.lastrowid
+    student_ids = [f'B{size}_{i:06d}' for i in range(size)]
+    conn.executemany('INSERT INTO students (student_id, name, gender, family_info, created_at) VALUES (?, ?, ?, ?, ?)',
+                     [(sid, f'学生{i}', '男', '{}', now) for i, sid in enumerate(student_ids)])
+    conn.executemany('INSERT INTO student_courses (student_id, course_id, created_at) VALUES (?, ?, ?)',
+                     [(sid, course_id, now) for sid in student_ids])
+    rows = conn.execute('SELECT id, student_id FROM student_courses WHERE course_id = ?', (course_id,)).fetchall()
+    conn.commit()
+    conn.close()
+    return course_id, [(row['id'], row['student_id']) for row in rows]
+
+
+def per_row(client, course_id, enrollments):
+    start = time.perf_counter()
+    for enrollment_id, _ in enrollments:
+        response = client.put(f'/api/student-courses/{enrollment_id}',
+                              json={'exam_score': 80, 'daily_score': 90})
+        assert response.status_code == 200, response.data
+    return time.perf_counter() - start
+
+
+def batch(client, course_id, enrollments):
+    grades = [{'student_id': student_id, 'course_id': course_id, 'exam_score': 85, 'daily_score': 95}
+              for _, student_id in enrollments]
+    start = time.perf_counter()
+    response = client.post('/api/student-courses/grades', json={'grades': grades})
+    assert response.status_code == 200, response.data
+    return time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='30,300,3000')
+    args = parser.parse_args(argv)
+
+    init_db()
+    client = app.test_client()
+    print(f"{'rows':>6} {'per-row PUT (ms)':>17} {'batch (ms)':>11} {'speedup':>8}")
+    for size in (int(s) for s in args.sizes.split(',')):
+        course_id, enrollments = seed_class(size)
+        slow = per_row(client, course_id, enrollments)
+        fast = batch(client, course_id, enrollments)
+        print(f'{size:>6} {slow * 1000:>17.1f} {fast * 1000:>11.1f} {slow / fast:>7.1f}x')
+
+
+if __name__ == '__main__':
+    sys.exit(main())
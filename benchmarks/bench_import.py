@@ -0,0 +1,90 @@
+"""批量导入基准：POST /api/students/import 每秒导入的行数（CSV 与 JSON Lines）
+
+python -m benchmarks.bench_import [--rows 20000] [--repeat 3] [--min-rate 20000] [--output 结果文件]
+
+每次导入一批新学号（库中已有的数据随之增长，索引与全文索引的维护成本也计入）；
+中位数耗时对应的导入速率低于 --min-rate 行/秒时退出码为 1。
+"""
+import argparse
+import itertools
+import json
+import sys
+
+from benchmarks.harness import use_temp_database, measure, summarize
+
+# 必须在导入 app / database 之前设置，确保使用临时数据库
+use_temp_database('bench_import_')
+
+from app import app  # noqa: E402
+from database import init_db  # noqa: E402
+
+CSV_HEADER = 'student_id,name,gender,age,phone,email,address,class_name,teacher_name\n'
+
+
+def csv_body(ids):
+    return (CSV_HEADER + ''.join(
+        f'{sid},学生{i},{"男女"[i % 2]},{16 + i % 4},138{i:08d},{sid.lower()}@example.com,'
+        f'某市某区{i % 100}号,高一{i % 20}班,老师{i % 50}\n' for i, sid in ids)).encode('utf-8')
+
+
+def jsonl_body(ids):
+    return ''.join(json.dumps({
+        'student_id': sid, 'name': f'学生{i}', 'gender': '男女'[i % 2], 'age': 16 + i % 4,
+        'phone': f'138{i:08d}', 'email': f'{sid.lower()}@example.com', 'address': f'某市某区{i % 100}号',
+        'class_name': f'高一{i % 20}班', 'teacher_name': f'老师{i % 50}',
+    }, ensure_ascii=False) + '\n' for i, sid in ids).encode('utf-8')
+
+
+FORMATS = {
+    'csv': ('text/csv', csv_body),
+    'jsonl': ('application/x-ndjson', jsonl_body),
+}
+
+
+def import_case(client, fmt, rows, batches):
+    """每次调用导入 rows 个新学号；请求体在 setup 中生成，不计入耗时"""
+    content_type, build = FORMATS[fmt]
+    body = {}
+
+    def setup():
+        start = next(batches) * rows
+        body['data'] = build((i, f'I{i:09d}') for i in range(start, start + rows))
+
+    def fn():
+        response = client.post('/api/students/import', data=body['data'], content_type=content_type)
+        result = response.get_json()
+        assert response.status_code == 200 and result['inserted'] == rows, result
+    return fn, setup
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=20000, help='每次导入的行数')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--min-rate', type=float, default=20000, help='导入速率下限（行/秒）')
+    parser.add_argument('--output', help='写入结果文件（格式见 benchmarks.results）')
+    args = parser.parse_args(argv)
+
+    init_db()
+    client = app.test_client()
+    batches = itertools.count()
+    results = []
+    print(f"{'case':<12} {'median (ms)':>12} {'rows/s':>10}")
+    for fmt in FORMATS:
+        fn, setup = import_case(client, fmt, args.rows, batches)
+        summary = summarize(measure(fn, args.repeat, warmup=1, setup=setup))
+        rate = args.rows / (summary['median'] / 1000)
+        results.append({'name': f'import {fmt}', 'unit': 'ms', **summary, 'rows': args.rows, 'rows_per_sec': rate})
+        print(f"{'import ' + fmt:<12} {summary['median']:>12.1f} {rate:>10.0f}")
+    if args.output:
+        from benchmarks.results import write_results
+        write_results('import', {'rows': args.rows, 'repeat': args.repeat}, results, args.output)
+    slow = [row['name'] for row in results if row['rows_per_sec'] < args.min_rate]
+    if slow:
+        print(f"低于 {args.min_rate:.0f} 行/秒: {', '.join(slow)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,95 @@
+"""登录基准：模拟压测负载中的学生登录，比较 bcrypt 在请求线程内计算与在进程池中计算时的延迟
+
+并发客户端反复以 load_test_user / 123456 登录（同 benchmarks.workload.StudentUser 以学号和默认密码登录，
+locustfile.py 从该模块导入 AdminUser / TeacherUser / StudentUser），
+同时另一组客户端请求学生列表，观察 bcrypt 对其他请求的影响。
+
+python -m benchmarks.bench_login [--clients 16] [--duration 10] [--rounds 12]
+"""
+import argparse
+import http.client
+import json
+import logging
+import os
+import statistics
+import sys
+import threading
+import time
+
+from benchmarks.harness import use_temp_database, percentile
+
+# 必须在导入 app / database 之前设置，确保使用临时数据库
+use_temp_database('bench_login_')
+
+from werkzeug.serving import make_server  # noqa: E402
+
+from app import app  # noqa: E402
+from database import init_db  # noqa: E402
+from utils import password_hashing  # noqa: E402
+from utils.response_cache import clear_response_cache  # noqa: E402
+
+
+def client_loop(port, method, path, body, stop, latencies, statuses):
+    conn = http.client.HTTPConnection('127.0.0.1', port)
+    headers = {'Content-Type': 'application/json'}
+    while not stop.is_set():
+        if path.startswith('/api/students'):
+            clear_response_cache()
+        start = time.perf_counter()
+        conn.request(method, path, body=body, headers=headers)
+        response = conn.getresponse()
+        response.read()
+        latencies.append((time.perf_counter() - start) * 1000)
+        statuses[response.status] = statuses.get(response.status, 0) + 1
+    conn.close()
+
+
+def run(port, clients, duration):
+    stop = threading.Event()
+    login, login_status = [], {}
+    reads, read_status = [], {}
+    login_body = json.dumps({'username': 'load_test_user', 'password': '123456'})
+    threads = [threading.Thread(target=client_loop,
+                                args=(port, 'POST', '/api/login', login_body, stop, login, login_status))
+               for _ in range(clients)]
+    threads += [threading.Thread(target=client_loop,
+                                 args=(port, 'GET', '/api/students?page=1&limit=10', None, stop, reads, read_status))
+                for _ in range(max(1, clients // 4))]
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return login, login_status, reads
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--rounds', type=int, default=password_hashing.AUTH_BCRYPT_ROUNDS)
+    args = parser.parse_args(argv)
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    init_db()
+    password_hashing.AUTH_BCRYPT_ROUNDS = args.rounds
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    # 先登录一次完成自动创建，之后每次都是 bcrypt 校验
+    app.test_client().post('/api/login', json={'username': 'load_test_user', 'password': '123456'})
+
+    print(f"{'mode':<22} {'logins':>7} {'login p50':>10} {'login p99':>10} {'503':>5} "
+          f"{'list p50':>9} {'list p99':>9}")
+    workers = os.cpu_count() or 1
+    for mode, worker_count in (('inline', 0), (f'process pool x{workers}', workers)):
+        password_hashing.AUTH_HASH_WORKERS = worker_count
+        login, status, reads = run(server.server_port, args.clients, args.duration)
+        print(f'{mode:<22} {len(login):>7} {statistics.median(login):>9.1f}ms {percentile(login, 99):>9.1f}ms '
+              f'{status.get(503, 0):>5} {statistics.median(reads):>8.1f}ms {percentile(reads, 99):>8.1f}ms')
+    server.shutdown()
+    password_hashing.shutdown()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
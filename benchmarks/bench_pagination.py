@@ -0,0 +1,80 @@
+"""列表分页基准：比较页码分页（OFFSET）与游标分页在第 1 页和第 5,000 页的耗时
+
+python -m benchmarks.bench_pagination [--limit 10] [--repeat 20] [--output 结果文件]
+"""
+import argparse
+import sys
+from datetime import datetime, timedelta
+
+from benchmarks.harness import use_temp_database, measure, summarize
+from benchmarks.results import write_results
+
+# 必须在导入 app / database 之前设置，确保使用临时数据库
+use_temp_database('bench_pagination_')
+
+from app import app  # noqa: E402
+from database import init_db, get_db, get_read_db  # noqa: E402
+from utils.pagination import encode_cursor  # noqa: E402
+from utils.response_cache import clear_response_cache  # noqa: E402
+
+DEEP_PAGE = 5000
+
+
+def seed_students(count):
+    conn = get_db()
+    base = datetime(2024, 1, 1)
+    conn.executemany('''INSERT INTO students (student_id, name, gender, family_info, class_name, created_at)
+                        VALUES (?, ?, ?, ?, ?, ?)''',
+                     [(f'S{i:07d}', f'学生{i}', '男' if i % 2 else '女', '{}', f'班级{i % 40}',
+                       (base + timedelta(seconds=i)).isoformat()) for i in range(count)])
+    conn.commit()
+    conn.close()
+
+
+def cursor_before_page(page, limit):
+    """第 page 页之前最后一行对应的游标"""
+    conn = get_read_db()
+    row = conn.execute('SELECT created_at, id FROM students ORDER BY created_at DESC, id DESC LIMIT 1 OFFSET ?',
+                       ((page - 1) * limit - 1,)).fetchone()
+    conn.close()
+    return encode_cursor(row['created_at'], row['id'])
+
+
+def request(client, url):
+    def fn():
+        response = client.get(url)
+        assert response.status_code == 200, response.data
+    return fn
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--limit', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--output', help='写入结果文件（格式见 benchmarks.results）')
+    args = parser.parse_args(argv)
+
+    init_db()
+    seed_students(DEEP_PAGE * args.limit + args.limit)
+    client = app.test_client()
+    deep_cursor = cursor_before_page(DEEP_PAGE, args.limit)
+
+    cases = [
+        ('offset page 1', f'/api/students?page=1&limit={args.limit}'),
+        (f'offset page {DEEP_PAGE}', f'/api/students?page={DEEP_PAGE}&limit={args.limit}'),
+        ('cursor page 1', f'/api/students?limit={args.limit}&cursor='),
+        (f'cursor page {DEEP_PAGE}', f'/api/students?limit={args.limit}&cursor={deep_cursor}'),
+    ]
+    results = []
+    print(f"{'case':<20} {'median (ms)':>12}")
+    for name, url in cases:
+        # 每次都清空响应缓存，测量的是查询本身而不是缓存命中
+        summary = summarize(measure(request(client, url), args.repeat, setup=clear_response_cache))
+        results.append({'name': name, 'unit': 'ms', **summary})
+        print(f"{name:<20} {summary['median']:>12.2f}")
+    if args.output:
+        write_results('pagination', {'limit': args.limit, 'repeat': args.repeat}, results, args.output)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,115 @@
+"""各路由处理函数的微基准：在确定性合成数据上用 Flask 测试客户端逐个请求
+
+python -m benchmarks.bench_routes [--scale 10k] [--seed 42] [--repeat 50] [--only students]
+                                  [--cached] [--database 已有数据库] [--output 结果文件]
+
+默认在临时数据库中用 benchmarks.datagen 生成数据；每次请求前清空响应缓存（--cached 时保留），
+测量的是处理函数与查询本身。结果按 benchmarks.results 的格式写入文件，用 benchmarks.compare 对比。
+"""
+import argparse
+import itertools
+import os
+import sqlite3
+import sys
+
+from benchmarks.harness import use_temp_database, measure, summarize
+
+
+def route_cases(conn):
+    """返回 [(名称, 方法, URL, 请求体)]；请求体为函数时每次请求重新生成（如需要唯一学号的新增）"""
+    students = conn.execute('SELECT COUNT(*) FROM students').fetchone()[0]
+    student_id = conn.execute('SELECT student_id FROM students ORDER BY id LIMIT 1 OFFSET ?',
+                              (students // 2,)).fetchone()[0]
+    course_id = conn.execute('SELECT course_id FROM student_courses WHERE student_id = ? LIMIT 1',
+                             (student_id,)).fetchone()[0]
+    enrolled = [row[0] for row in conn.execute('SELECT student_id FROM student_courses WHERE course_id = ?',
+                                               (course_id,))]
+    deep_page = max(1, students // 20)
+    new_ids = itertools.count()
+    return [
+        ('students.list page 1', 'GET', '/api/students?page=1&limit=10', None),
+        (f'students.list page {deep_page}', 'GET', f'/api/students?page={deep_page}&limit=10', None),
+        ('students.list count=none', 'GET', '/api/students?page=1&limit=10&count=none', None),
+        ('students.options prefix', 'GET', '/api/students/options?q=王&limit=20', None),
+        ('search students', 'GET', '/api/search?q=王伟&type=students', None),
+        ('search all types', 'GET', f'/api/search?q={student_id}', None),
+        ('courses.list page 1', 'GET', '/api/courses?page=1&limit=10', None),
+        ('courses.options', 'GET', '/api/courses/options?limit=1000', None),
+        ('student_courses.list by student', 'GET', f'/api/student-courses?student_id={student_id}', None),
+        ('student_courses.list by course', 'GET', f'/api/student-courses?course_id={course_id}', None),
+        ('attendance.list by student', 'GET', f'/api/attendance?student_id={student_id}', None),
+        ('attendance.list by course', 'GET', f'/api/attendance?course_id={course_id}', None),
+        ('attendance.export by course', 'GET', f'/api/attendance/export?course_id={course_id}&format=ndjson', None),
+        ('rewards.list page 1', 'GET', '/api/rewards-punishments?page=1&limit=10', None),
+        ('parents.list by student', 'GET', f'/api/parents?student_id={student_id}', None),
+        ('statistics', 'GET', '/api/statistics', None),
+        ('users.list', 'GET', '/api/users', None),
+        ('students.create', 'POST', '/api/students',
+         lambda: {'student_id': f'BENCH{next(new_ids):07d}', 'name': '基准学生', 'gender': '男'}),
+        ('students.update', 'PUT', f'/api/students/{student_id}',
+         {'name': '基准更新', 'gender': '女', 'class_name': '高11班', 'email': 'bench@example.com'}),
+        ('student_courses.grades batch', 'POST', '/api/student-courses/grades',
+         {'grades': [{'student_id': sid, 'course_id': course_id, 'exam_score': 80, 'daily_score': 90}
+                     for sid in enrolled]}),
+        ('attendance.roll_call', 'POST', '/api/attendance/roll-call',
+         {'course_id': course_id, 'date': '2025-01-06', 'records': {sid: '出勤' for sid in enrolled}}),
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', default='10k', help='学生数：1k / 10k / 100k / 1m 或整数')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--warmup', type=int, default=3)
+    parser.add_argument('--only', help='只运行名称包含该字符串的用例')
+    parser.add_argument('--cached', action='store_true', help='不清空响应缓存，测量缓存命中路径')
+    parser.add_argument('--database', help='使用已有的数据库（会被写入），不生成数据')
+    parser.add_argument('--output', help='结果文件路径，默认写入 benchmarks/results/')
+    args = parser.parse_args(argv)
+
+    # 必须在导入 app / database 之前确定数据库路径
+    if args.database:
+        os.environ['DATABASE'] = path = args.database
+    else:
+        path = use_temp_database('bench_routes_')
+    from benchmarks.datagen import generate, parse_scale
+    from benchmarks.results import write_results
+    from database import init_db
+    from utils.response_cache import clear_response_cache
+    from app import app
+
+    if args.database:
+        init_db()
+    else:
+        generate(path, parse_scale(args.scale), args.seed, log=lambda line: print(f'  {line}', file=sys.stderr))
+    conn = sqlite3.connect(path)
+    cases = route_cases(conn)
+    students = conn.execute('SELECT COUNT(*) FROM students').fetchone()[0]
+    conn.close()
+
+    client = app.test_client()
+    results = []
+    width = max(len(name) for name, *_ in cases)
+    print(f"{'case':<{width}} {'median (ms)':>12} {'p95 (ms)':>9}")
+    for name, method, url, body in cases:
+        if args.only and args.only not in name:
+            continue
+
+        def request():
+            response = client.open(url, method=method, json=body() if callable(body) else body)
+            response.get_data()
+            assert response.status_code < 400, (name, response.status_code, response.get_data(as_text=True))
+
+        samples = measure(request, args.repeat, args.warmup, setup=None if args.cached else clear_response_cache)
+        summary = summarize(samples)
+        results.append({'name': name, 'unit': 'ms', **summary})
+        print(f"{name:<{width}} {summary['median']:>12.3f} {summary['p95']:>9.3f}")
+
+    params = {'students': students, 'seed': None if args.database else args.seed, 'repeat': args.repeat,
+              'warmup': args.warmup, 'cached': args.cached, 'only': args.only}
+    print(f'results: {write_results("routes", params, results, args.output)}')
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,161 @@
+"""/api/statistics 基准：比较逐课程查询（N+1）、分组聚合与物化统计表三种实现
+
+python -m benchmarks.bench_statistics [--repeat 5] [--output 结果文件]
+
+在 10、1,000、10,000 门课程的规模下分别测量三种实现的 SQL 耗时，以及接口的完整耗时（含 JSON 序列化）。
+"""
+import argparse
+import random
+import sys
+from datetime import datetime
+
+from benchmarks.harness import use_temp_database, measure, summarize
+from benchmarks.results import write_results
+
+# 必须在导入 app / database 之前设置，确保使用临时数据库
+use_temp_database('bench_statistics_')
+
+from app import app  # noqa: E402
+from database import init_db, get_db, get_read_db  # noqa: E402
+from utils.response_cache import clear_response_cache  # noqa: E402
+from routes.attendance import ATTENDANCE_STATUSES  # noqa: E402
+from benchmarks.datagen import ATTENDANCE_WEIGHTS  # noqa: E402
+
+SCALES = (10, 1000, 10000)
+STUDENTS = 2000
+ENROLLMENTS_PER_COURSE = 5
+ATTENDANCE_PER_COURSE = 10
+
+
+def seed_courses(start, end, rng):
+    """插入编号 [start, end) 的课程及其选课、考勤记录"""
+    conn = get_db()
+    cursor = conn.cursor()
+    now = datetime.now().isoformat()
+    for i in range(start, end):
+        cursor.execute('INSERT INTO courses (course_code, course_name, teacher, credits, created_at) VALUES (?, ?, ?, ?, ?)',
+                       (f'C{i:05d}', f'课程{i}', f'教师{i % 50}', rng.randint(1, 5), now))
+        course_id = cursor.lastrowid
+        enrollments = []
+        for _ in range(ENROLLMENTS_PER_COURSE):
+            exam, daily = rng.randint(40, 100), rng.randint(40, 100)
+            enrollments.append((f'S{rng.randrange(STUDENTS):05d}', course_id, exam, daily,
+                                exam * 0.7 + daily * 0.3, '2025-秋', now))
+        cursor.executemany('''INSERT INTO student_courses (student_id, course_id, exam_score, daily_score,
+                              final_score, semester, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)''', enrollments)
+        cursor.executemany('''INSERT INTO attendance (student_id, course_id, date, status, reason, created_at)
+                              VALUES (?, ?, ?, ?, ?, ?)''',
+                           [(f'S{rng.randrange(STUDENTS):05d}', course_id, f'2025-09-{rng.randint(1, 30):02d}',
+                             rng.choices(ATTENDANCE_STATUSES, ATTENDANCE_WEIGHTS)[0], '', now)
+                            for _ in range(ATTENDANCE_PER_COURSE)])
+    conn.commit()
+    conn.close()
+
+
+def seed_students():
+    conn = get_db()
+    now = datetime.now().isoformat()
+    conn.executemany('''INSERT INTO students (student_id, name, gender, family_info, created_at)
+                        VALUES (?, ?, ?, ?, ?)''',
+                     [(f'S{i:05d}', f'学生{i}', '男' if i % 2 else '女', '{}', now) for i in range(STUDENTS)])
+    conn.commit()
+    conn.close()
+
+
+def legacy_statistics():
+    """原实现：每门课程额外执行三条查询"""
+    conn = get_read_db()
+    cursor = conn.cursor()
+    cursor.execute('SELECT COUNT(*) FROM students')
+    cursor.execute('SELECT COUNT(*) FROM courses')
+    cursor.execute('SELECT AVG(final_score) FROM student_courses')
+    cursor.execute('SELECT COUNT(*) FROM attendance')
+    cursor.execute("SELECT COUNT(*) FROM attendance WHERE status='出勤'")
+    cursor.execute('SELECT id, course_code, course_name FROM courses')
+    for course in cursor.fetchall():
+        cursor.execute('SELECT AVG(final_score) FROM student_courses WHERE course_id = ?', (course['id'],))
+        cursor.fetchone()
+        cursor.execute('SELECT COUNT(*) FROM attendance WHERE course_id = ?', (course['id'],))
+        cursor.fetchone()
+        cursor.execute("SELECT COUNT(*) FROM attendance WHERE course_id = ? AND status='出勤'", (course['id'],))
+        cursor.fetchone()
+    conn.close()
+
+
+def grouped_statistics():
+    """分组聚合实现：两条语句，但每次仍扫描选课和考勤明细"""
+    conn = get_read_db()
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT (SELECT COUNT(*) FROM students), (SELECT COUNT(*) FROM courses),
+               (SELECT AVG(final_score) FROM student_courses),
+               COUNT(*), SUM(CASE WHEN status = '出勤' THEN 1 ELSE 0 END)
+        FROM attendance
+    ''')
+    cursor.fetchone()
+    cursor.execute('''
+        SELECT c.id, c.course_code, c.course_name, sc.avg_score, a.total, a.present
+        FROM courses c
+        LEFT JOIN (SELECT course_id, AVG(final_score) AS avg_score FROM student_courses GROUP BY course_id) sc
+               ON sc.course_id = c.id
+        LEFT JOIN (SELECT course_id, COUNT(*) AS total,
+                          SUM(CASE WHEN status = '出勤' THEN 1 ELSE 0 END) AS present
+                   FROM attendance GROUP BY course_id) a ON a.course_id = c.id
+        ORDER BY c.id
+    ''')
+    cursor.fetchall()
+    conn.close()
+
+
+def materialized_statistics():
+    """当前实现：读取触发器维护的 global_stats / course_stats"""
+    conn = get_read_db()
+    cursor = conn.cursor()
+    cursor.execute('SELECT * FROM global_stats WHERE id = 1')
+    cursor.fetchone()
+    cursor.execute('''
+        SELECT c.id, c.course_code, c.course_name, cs.score_count, cs.score_sum,
+               cs.attendance_total, cs.attendance_present
+        FROM courses c LEFT JOIN course_stats cs ON cs.course_id = c.id
+        ORDER BY c.id
+    ''')
+    cursor.fetchall()
+    conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help='写入结果文件（格式见 benchmarks.results）')
+    args = parser.parse_args(argv)
+
+    init_db()
+    seed_students()
+    client = app.test_client()
+    rng = random.Random(42)
+
+    def endpoint():
+        response = client.get('/api/statistics')
+        assert response.status_code == 200
+
+    implementations = (('N+1 SQL', legacy_statistics, None), ('grouped SQL', grouped_statistics, None),
+                       ('materialized', materialized_statistics, None), ('endpoint', endpoint, clear_response_cache))
+    results = []
+    print(f"{'courses':>8} {'N+1 SQL (ms)':>13} {'grouped SQL (ms)':>17} {'materialized (ms)':>18} {'endpoint (ms)':>14}")
+    seeded = 0
+    for scale in SCALES:
+        seed_courses(seeded, scale, rng)
+        seeded = scale
+        medians = []
+        for name, fn, setup in implementations:
+            summary = summarize(measure(fn, args.repeat, setup=setup))
+            results.append({'name': f'{name} @ {scale} courses', 'unit': 'ms', **summary})
+            medians.append(summary['median'])
+        legacy, grouped, materialized, total = medians
+        print(f'{scale:>8} {legacy:>13.2f} {grouped:>17.2f} {materialized:>18.2f} {total:>14.2f}')
+    if args.output:
+        write_results('statistics', {'repeat': args.repeat}, results, args.output)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
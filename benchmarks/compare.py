@@ -0,0 +1,61 @@
+"""比较两次基准运行的结果文件
+
+python -m benchmarks.compare <基准结果.json> <新结果.json> [--metric median] [--threshold 10]
+
+按用例名称对齐，输出两次的指标和变化百分比；变化超过 threshold% 的用例标记为 slower / faster。
+存在变慢的用例时退出码为 1，可用于 CI。
+"""
+import argparse
+import sys
+
+from benchmarks.results import load_results
+
+
+def compare(base, new, metric='median', threshold=10.0):
+    """返回 [(名称, 基准值, 新值, 变化百分比, 标记)]，只在一侧存在的用例值为 None"""
+    base_results = {result['name']: result for result in base['results']}
+    new_results = {result['name']: result for result in new['results']}
+    rows = []
+    for name in list(base_results) + [name for name in new_results if name not in base_results]:
+        before = base_results.get(name, {}).get(metric)
+        after = new_results.get(name, {}).get(metric)
+        if before is None or after is None or before == 0:
+            rows.append((name, before, after, None, 'missing' if before is None or after is None else ''))
+            continue
+        change = (after - before) / before * 100
+        flag = 'slower' if change > threshold else 'faster' if change < -threshold else ''
+        rows.append((name, before, after, change, flag))
+    return rows
+
+
+def _format(value):
+    return '-' if value is None else f'{value:.3f}'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('base')
+    parser.add_argument('new')
+    parser.add_argument('--metric', default='median', choices=('median', 'p95', 'p99', 'mean', 'min', 'max'))
+    parser.add_argument('--threshold', type=float, default=10.0, help='标记变化的百分比阈值')
+    args = parser.parse_args(argv)
+
+    base, new = load_results(args.base), load_results(args.new)
+    if base['suite'] != new['suite']:
+        print(f"警告：比较的是不同的基准（{base['suite']} / {new['suite']}）", file=sys.stderr)
+    if base['params'] != new['params']:
+        print(f"警告：运行参数不同：{base['params']} / {new['params']}", file=sys.stderr)
+    print(f"base {(base['commit'] or '?')[:10]}{' (dirty)' if base['dirty'] else ''}  "
+          f"new {(new['commit'] or '?')[:10]}{' (dirty)' if new['dirty'] else ''}  metric {args.metric}")
+
+    rows = compare(base, new, args.metric, args.threshold)
+    width = max([len(row[0]) for row in rows] + [4])
+    print(f"{'case':<{width}} {'base':>10} {'new':>10} {'change':>8}")
+    for name, before, after, change, flag in rows:
+        change_text = '-' if change is None else f'{change:+.1f}%'
+        print(f'{name:<{width}} {_format(before):>10} {_format(after):>10} {change_text:>8} {flag}')
+    return 1 if any(row[4] == 'slower' for row in rows) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,206 @@
+"""确定性的合成数据生成器
+
+python -m benchmarks.datagen --scale 100k [--seed 42] --output bench.db [--force]
+
+按学生数生成成比例的课程、选课、考勤、奖惩和家长数据，直接写入 SQLite。
+同样的规模和种子总是生成完全相同的数据（含 created_at），不同提交之间的基准结果可以直接比较。
+灌数据期间删除二级索引和统计、全文检索触发器，灌完后一次性重建索引、触发器、统计表和全文索引。
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import sqlite3
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+from database import init_db, drop_derived_objects, rebuild_derived_objects
+from routes.attendance import ATTENDANCE_STATUSES
+from routes.student_courses import compute_final_score
+
+SCALES = {'1k': 1_000, '10k': 10_000, '100k': 100_000, '1m': 1_000_000}
+
+# 相对学生数的比例
+STUDENTS_PER_COURSE = 50
+MIN_COURSES = 10
+ENROLLMENTS_PER_STUDENT = 4
+SESSIONS_PER_ENROLLMENT = 3  # 每条选课对应的考勤次数
+REWARDS_PER_STUDENT = 0.3
+SECOND_PARENT_RATE = 0.5  # 有两位家长的学生比例，平均每名学生 1.5 位家长
+STUDENTS_PER_CLASS = 40
+
+BATCH_SIZE = 10_000  # 每个事务插入的行数
+BASE_TIME = datetime(2024, 9, 1, 8, 0, 0)
+TERM_DAYS = [day for day in (date(2024, 9, 2) + timedelta(days=i) for i in range(120)) if day.weekday() < 5]
+SEMESTER = '2024-秋'
+
+SURNAMES = '王李张刘陈杨黄赵吴周徐孙马朱胡郭何高林罗'
+GIVEN = '伟芳娜敏静丽强磊军洋勇艳杰娟涛明超秀霞平刚桂英华玉兰'
+SUBJECTS = ('语文', '数学', '英语', '物理', '化学', '生物', '历史', '地理', '政治', '信息技术', '音乐', '美术', '体育')
+CITIES = ('北京市', '上海市', '广州市', '深圳市', '杭州市', '南京市', '成都市', '武汉市', '西安市', '重庆市')
+REWARD_TITLES = {'奖励': ('三好学生', '优秀班干部', '竞赛一等奖', '进步之星'), '处分': ('警告', '严重警告', '记过')}
+
+
+def parse_scale(value):
+    """'100k'、'1m' 或整数字符串 -> 学生数"""
+    value = value.lower()
+    if value in SCALES:
+        return SCALES[value]
+    count = int(value)
+    if count <= 0:
+        raise ValueError('学生数必须为正整数')
+    return count
+
+
+def _name(rng, surname=None):
+    return (surname or rng.choice(SURNAMES)) + ''.join(rng.choice(GIVEN) for _ in range(rng.choice((1, 2))))
+
+
+def _phone(rng):
+    return f'1{rng.choice("3589")}{rng.randrange(10 ** 9):09d}'
+
+
+def _timestamp(offset):
+    return (BASE_TIME + timedelta(seconds=offset)).isoformat()
+
+
+def _insert(conn, sql, rows):
+    """按 BATCH_SIZE 分批插入并提交，返回插入的行数"""
+    total = 0
+    rows = iter(rows)
+    while True:
+        batch = list(itertools.islice(rows, BATCH_SIZE))
+        if not batch:
+            return total
+        conn.executemany(sql, batch)
+        conn.commit()
+        total += len(batch)
+
+
+def _students(rng, count, surnames):
+    for i in range(count):
+        klass = i // STUDENTS_PER_CLASS
+        email = f's{i:07d}@example.com'
+        address = f'{rng.choice(CITIES)}{rng.randint(1, 300)}号'
+        yield (f'S{i:07d}', _name(rng, surnames[i]), rng.choice('男女'), rng.randint(15, 18), _phone(rng),
+               email, address, json.dumps({'email': email, 'address': address}, ensure_ascii=False),
+               f'高{klass % 3 + 1}{klass // 3 + 1}班', f'{SURNAMES[klass % len(SURNAMES)]}老师', _timestamp(i))
+
+
+def _courses(rng, count):
+    for j in range(count):
+        yield (f'C{j:05d}', f'{SUBJECTS[j % len(SUBJECTS)]}{j // len(SUBJECTS) + 1}', f'{rng.choice(SURNAMES)}老师',
+               rng.randint(1, 5), _timestamp(j))
+
+
+def _enrollments(rng, students, course_ids):
+    per_student = min(ENROLLMENTS_PER_STUDENT, len(course_ids))
+    for i in range(students):
+        for course_id in rng.sample(course_ids, per_student):
+            exam, daily = rng.randint(40, 100), rng.randint(50, 100)
+            yield (f'S{i:07d}', course_id, exam, daily, compute_final_score(exam, daily), SEMESTER,
+                   _timestamp(i * per_student))
+
+
+# 出勤、缺席、请假的比例，与 ATTENDANCE_STATUSES 对应
+ATTENDANCE_WEIGHTS = (90, 4, 6)
+
+
+def _attendance(rng, enrollments):
+    for student_id, course_id in enrollments:
+        for day in sorted(rng.sample(TERM_DAYS, SESSIONS_PER_ENROLLMENT)):
+            status = rng.choices(ATTENDANCE_STATUSES, ATTENDANCE_WEIGHTS)[0]
+            yield (student_id, course_id, day.isoformat(), status, '' if status == '出勤' else '病假',
+                   f'{day.isoformat()}T08:00:00')
+
+
+def _rewards(rng, students):
+    for k in range(int(students * REWARDS_PER_STUDENT)):
+        kind = '奖励' if rng.random() < 0.8 else '处分'
+        day = rng.choice(TERM_DAYS).isoformat()
+        yield (f'S{rng.randrange(students):07d}', kind, rng.choice(REWARD_TITLES[kind]), '', day, _timestamp(k))
+
+
+def _parents(rng, students, surnames):
+    for i in range(students):
+        relationships = ('父亲', '母亲') if rng.random() < SECOND_PARENT_RATE else (rng.choice(('父亲', '母亲')),)
+        for relationship in relationships:
+            name = _name(rng, surnames[i] if relationship == '父亲' else None)
+            yield (f'S{i:07d}', name, relationship, _phone(rng), '', f'{rng.choice(CITIES)}{rng.randint(1, 300)}号',
+                   _timestamp(i))
+
+
+def generate(path, students, seed=42, log=print):
+    """在 path 生成规模为 students 的数据集，返回各表行数
+
+    path 必须是新文件（或空库）：生成器假定课程 id 从 1 开始连续分配。
+    """
+    rng = random.Random(seed)
+    init_db(path)
+    conn = sqlite3.connect(path)
+    # 数据可以重新生成，灌数据时不需要持久性保证；大缓存减少索引维护时的页换入换出
+    conn.execute('PRAGMA synchronous = OFF')
+    conn.execute('PRAGMA cache_size = -262144')
+    cursor = conn.cursor()
+    drop_derived_objects(cursor)
+    conn.commit()
+
+    counts = {}
+    surnames = [rng.choice(SURNAMES) for _ in range(students)]
+    course_count = max(MIN_COURSES, students // STUDENTS_PER_COURSE)
+    steps = [
+        ('students', '''INSERT INTO students (student_id, name, gender, age, contact, email, address, family_info,
+                                              class_name, teacher, created_at)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+         lambda: _students(rng, students, surnames)),
+        ('courses', 'INSERT INTO courses (course_code, course_name, teacher, credits, created_at) VALUES (?, ?, ?, ?, ?)',
+         lambda: _courses(rng, course_count)),
+        ('student_courses', '''INSERT INTO student_courses (student_id, course_id, exam_score, daily_score,
+                                                            final_score, semester, created_at)
+                               VALUES (?, ?, ?, ?, ?, ?, ?)''',
+         lambda: _enrollments(rng, students, list(range(1, course_count + 1)))),
+        ('attendance', '''INSERT INTO attendance (student_id, course_id, date, status, reason, created_at)
+                          VALUES (?, ?, ?, ?, ?, ?)''',
+         lambda: _attendance(rng, conn.execute('SELECT student_id, course_id FROM student_courses ORDER BY id'))),
+        ('rewards_punishments', '''INSERT INTO rewards_punishments (student_id, type, title, description, date,
+                                                                    created_at)
+                                   VALUES (?, ?, ?, ?, ?, ?)''',
+         lambda: _rewards(rng, students)),
+        ('parents', '''INSERT INTO parents (student_id, parent_name, relationship, phone, email, address, created_at)
+                       VALUES (?, ?, ?, ?, ?, ?, ?)''',
+         lambda: _parents(rng, students, surnames)),
+    ]
+    for table, sql, rows in steps:
+        start = time.perf_counter()
+        counts[table] = _insert(conn, sql, rows())
+        log(f'{table:<20} {counts[table]:>10} rows {time.perf_counter() - start:>7.1f}s')
+
+    start = time.perf_counter()
+    rebuild_derived_objects(cursor)
+    conn.commit()
+    conn.close()
+    log(f"{'indexes/stats/fts':<20} {'':>10}      {time.perf_counter() - start:>7.1f}s")
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', default='1k', help='学生数：1k / 10k / 100k / 1m 或整数')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', required=True, help='生成的数据库文件路径')
+    parser.add_argument('--force', action='store_true', help='覆盖已存在的文件')
+    args = parser.parse_args(argv)
+
+    if os.path.exists(args.output):
+        if not args.force:
+            parser.error(f'{args.output} 已存在，使用 --force 覆盖')
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(args.output + suffix):
+                os.remove(args.output + suffix)
+    generate(args.output, parse_scale(args.scale), args.seed)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
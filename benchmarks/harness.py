@@ -0,0 +1,52 @@
+"""基准脚本的公共工具：临时数据库、计时与统计"""
+import os
+import statistics
+import tempfile
+import time
+
+
+def use_temp_database(prefix):
+    """让本进程使用新的临时数据库，返回数据库路径
+
+    必须在导入 app / database 之前调用（config.DATABASE 在导入时读取环境变量）。
+    """
+    path = os.path.join(tempfile.mkdtemp(prefix=prefix), 'bench.db')
+    os.environ['DATABASE'] = path
+    return path
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def summarize(samples):
+    """样本（毫秒）的统计摘要"""
+    return {
+        'samples': len(samples),
+        'median': statistics.median(samples),
+        'p95': percentile(samples, 95),
+        'p99': percentile(samples, 99),
+        'mean': statistics.fmean(samples),
+        'min': min(samples),
+        'max': max(samples),
+    }
+
+
+def measure(fn, repeat, warmup=0, setup=None):
+    """执行 fn warmup + repeat 次，返回后 repeat 次的耗时样本（毫秒）
+
+    setup 在每次执行前调用，不计入耗时（如清空响应缓存）。
+    """
+    for _ in range(warmup):
+        if setup:
+            setup()
+        fn()
+    samples = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
@@ -0,0 +1,265 @@
+"""回放 JSONL 访问日志（utils/access_log.py 记录的格式）
+
+python -m benchmarks.replay access.jsonl [--target inprocess | http://127.0.0.1:5000] [--database 数据库]
+                            [--speed 1] [--concurrency 8] [--login admin:admin123 ...] [--limit N]
+                            [--max-error-rate 0.01] [--output 结果文件]
+
+- --target inprocess（默认）用 Flask 测试客户端在本进程内回放，必须用 --database 指定数据库，
+  回放前复制到临时目录，原文件不会被写入；传入 URL 时通过 HTTP 回放到运行中的服务，
+  写请求会真实执行，请对数据库副本回放。
+- --speed 按原始时间间隔回放的倍速（2 表示两倍速），0 表示不等待、按 --concurrency 尽快发送。
+  按时间回放时延迟从计划发送时刻算起，客户端排队的时间也计入，不会因为服务变慢而少发请求。
+- 日志中的用户名按 --login 给出的账号登录后带上令牌；登录请求里被去掉的密码也用这里的密码补上，
+  其余去掉了敏感字段或未记录请求体的请求跳过。
+
+按路由输出延迟分位数（中位数、p95、p99）、错误率（5xx 或连接失败）和与原始状态码不一致的次数，
+结果按 benchmarks.results 的格式写入文件；汇总错误率超过 --max-error-rate 时退出码为 1。
+"""
+import argparse
+import http.client
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote, urlsplit
+
+from benchmarks.harness import summarize
+
+
+def load_records(path, limit=None):
+    """读取访问日志，按请求开始时间排序；无法解析的行跳过并返回其行号"""
+    records, bad_lines = [], []
+    with open(path, encoding='utf-8') as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                record = None
+            if not isinstance(record, dict) or not all(key in record for key in ('t', 'method', 'path')):
+                bad_lines.append(number)
+                continue
+            records.append(record)
+            if limit and len(records) >= limit:
+                break
+    records.sort(key=lambda record: record['t'])
+    return records, bad_lines
+
+
+def route_name(record):
+    return f"{record['method']} {record.get('endpoint') or record['path']}"
+
+
+def prepare(records, passwords):
+    """返回 (可回放的 [(记录, 请求体)], 跳过原因计数)"""
+    jobs, skipped = [], Counter()
+    for record in records:
+        body = record.get('body')
+        if record.get('body_omitted'):
+            skipped['body omitted'] += 1
+            continue
+        if record.get('redacted'):
+            username = body.get('username') if record['path'] == '/api/login' and isinstance(body, dict) else None
+            if username not in passwords:
+                skipped['redacted'] += 1
+                continue
+            body = {**body, 'password': passwords[username]}
+        jobs.append((record, body))
+    return jobs, skipped
+
+
+class InProcessTarget:
+    """本进程内的 Flask 测试客户端，每个线程一个"""
+
+    def __init__(self, app):
+        self.app = app
+        self._local = threading.local()
+
+    def send(self, method, url, body=None, headers=None):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        response = client.open(url, method=method, json=body, headers=headers)
+        data = response.get_data()
+        return response.status_code, data
+
+
+class HttpTarget:
+    """通过 HTTP 回放，每个线程一个保持连接"""
+
+    def __init__(self, base_url):
+        parts = urlsplit(base_url)
+        self.host, self.port = parts.hostname, parts.port
+        self.connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+        self.prefix = parts.path.rstrip('/')
+        self._local = threading.local()
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = self._local.connection = self.connection_class(self.host, self.port, timeout=30)
+        return connection
+
+    def send(self, method, url, body=None, headers=None):
+        headers = dict(headers or {})
+        payload = None
+        if body is not None:
+            payload = json.dumps(body, ensure_ascii=False).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+        try:
+            connection = self._connection()
+            connection.request(method, self.prefix + url, payload, headers)
+            response = connection.getresponse()
+            return response.status, response.read()
+        except (OSError, http.client.HTTPException):
+            self._local.connection = None  # 连接断开后下次重建
+            raise
+
+
+def login(target, username, password):
+    status, data = target.send('POST', '/api/login', {'username': username, 'password': password})
+    token = json.loads(data).get('token') if status == 200 else None
+    if not token:
+        raise ValueError(f'账号 {username} 登录失败（状态码 {status}）')
+    return token
+
+
+def copy_database(path):
+    """把数据库（含 WAL 中已提交的内容）复制到临时目录，返回副本路径"""
+    copy = os.path.join(tempfile.mkdtemp(prefix='replay_'), os.path.basename(path))
+    source = sqlite3.connect(f'file:{quote(os.path.abspath(path))}?mode=ro', uri=True)
+    target = sqlite3.connect(copy)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+    return copy
+
+
+def _url(record):
+    url = quote(record['path'])
+    return f"{url}?{quote(record['query'], safe='=&%+')}" if record.get('query') else url
+
+
+def replay(jobs, target, concurrency=8, speed=1.0, tokens=None):
+    """回放 [(记录, 请求体)]，返回 [(路由, 延迟毫秒, 状态码或 None, 原始状态码)]"""
+    tokens = tokens or {}
+    results = []
+    lock = threading.Lock()
+
+    def run(record, body, due):
+        token = tokens.get(record.get('user'))
+        headers = {'Authorization': f'Bearer {token}'} if token else None
+        start = due if due is not None else time.perf_counter()
+        try:
+            status, _ = target.send(record['method'], _url(record), body, headers)
+        except Exception:  # 连接失败或进程内未捕获的异常都记为错误，不中断回放
+            status = None
+        elapsed = (time.perf_counter() - start) * 1000
+        with lock:
+            results.append((route_name(record), elapsed, status, record.get('status')))
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        if speed > 0 and jobs:
+            first, origin = jobs[0][0]['t'], time.perf_counter()
+            for record, body in jobs:
+                due = origin + (record['t'] - first) / speed
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                executor.submit(run, record, body, due)
+        else:
+            # 不按时间回放时限制排队的任务数，延迟只计实际发送后的时间
+            slots = threading.BoundedSemaphore(concurrency * 2)
+            for record, body in jobs:
+                slots.acquire()
+                executor.submit(run, record, body, None).add_done_callback(lambda _: slots.release())
+    return results
+
+
+def _row(name, samples, duration):
+    latencies = [latency for _, latency, _, _ in samples]
+    errors = sum(1 for _, _, status, _ in samples if status is None or status >= 500)
+    return {
+        'name': name,
+        'unit': 'ms',
+        **summarize(latencies),
+        'errors': errors,
+        'error_rate': errors / len(samples),
+        'status_mismatches': sum(1 for _, _, status, recorded in samples if recorded and status != recorded),
+        'rps': len(samples) / duration if duration else 0,
+    }
+
+
+def report(results, duration):
+    """按路由汇总回放结果，最后一项为汇总"""
+    by_route = defaultdict(list)
+    for result in results:
+        by_route[result[0]].append(result)
+    rows = [_row(name, samples, duration) for name, samples in sorted(by_route.items())]
+    if results:
+        rows.append(_row('Aggregated', results, duration))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('log', help='JSONL 访问日志')
+    parser.add_argument('--target', default='inprocess', help='inprocess 或服务地址，如 http://127.0.0.1:5000')
+    parser.add_argument('--database', help='本进程内回放时使用的数据库（复制到临时目录后回放）')
+    parser.add_argument('--speed', type=float, default=1.0, help='回放倍速，0 表示不等待')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--login', action='append', default=[], metavar='用户名:密码',
+                        help='日志中该用户的请求使用此账号登录后的令牌，可重复')
+    parser.add_argument('--limit', type=int, help='只回放前 N 条记录')
+    parser.add_argument('--max-error-rate', type=float, default=0.01, help='汇总错误率上限')
+    parser.add_argument('--output', help='结果文件路径，默认写入 benchmarks/results/')
+    args = parser.parse_args(argv)
+
+    passwords = dict(item.split(':', 1) for item in args.login)
+    records, bad_lines = load_records(args.log, args.limit)
+    if bad_lines:
+        print(f'跳过 {len(bad_lines)} 行无法解析的记录（首行 {bad_lines[0]}）', file=sys.stderr)
+    jobs, skipped = prepare(records, passwords)
+    for reason, count in skipped.items():
+        print(f'跳过 {count} 条记录：{reason}', file=sys.stderr)
+    if not jobs:
+        parser.error('没有可回放的记录')
+    if args.target == 'inprocess' and not args.database:
+        parser.error('本进程内回放必须用 --database 指定数据库')
+
+    if args.target == 'inprocess':
+        # 必须在导入 app / database 之前确定数据库路径；回放的写请求只作用于副本
+        os.environ['DATABASE'] = copy_database(args.database)
+        from app import app
+        target = InProcessTarget(app)
+    else:
+        target = HttpTarget(args.target)
+    tokens = {username: login(target, username, password) for username, password in passwords.items()}
+
+    from benchmarks.results import write_results
+    start = time.perf_counter()
+    results = replay(jobs, target, args.concurrency, args.speed, tokens)
+    rows = report(results, time.perf_counter() - start)
+
+    width = max(len(row['name']) for row in rows)
+    print(f"{'route':<{width}} {'count':>7} {'median':>8} {'p95':>8} {'p99':>8} {'errors':>7} {'mismatch':>8}")
+    for row in rows:
+        print(f"{row['name']:<{width}} {row['samples']:>7} {row['median']:>8.2f} {row['p95']:>8.2f} "
+              f"{row['p99']:>8.2f} {row['error_rate']:>7.2%} {row['status_mismatches']:>8}")
+    params = {'log': os.path.basename(args.log), 'records': len(records), 'replayed': len(jobs),
+              'target': args.target,
+              'speed': args.speed, 'concurrency': args.concurrency}
+    print(f'results: {write_results("replay", params, rows, args.output)}')
+    return 1 if rows[-1]['error_rate'] > args.max_error_rate else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
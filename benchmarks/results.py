@@ -0,0 +1,75 @@
+"""基准结果文件
+
+每次运行写一个 JSON 文件，便于在不同提交之间比较（python -m benchmarks.compare）：
+
+    {
+      "format": 1,
+      "suite": "routes",
+      "commit": "7c81edd...", "dirty": false,
+      "created_at": "2026-01-01T12:00:00",
+      "environment": {"python": "3.11.7", "sqlite": "3.45.1", "platform": "...", "cpus": 8},
+      "params": {"scale": 100000, "seed": 42, "repeat": 50},
+      "results": [
+        {"name": "students.list page 1", "unit": "ms",
+         "samples": 50, "median": 1.2, "p95": 1.9, "p99": 2.8, "mean": 1.3, "min": 1.0, "max": 3.1}
+      ]
+    }
+
+未指定输出路径时写入 benchmarks/results/<suite>-<提交>-<时间>.json。
+"""
+import json
+import os
+import platform
+import sqlite3
+import subprocess
+from datetime import datetime
+
+RESULTS_FORMAT = 1
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+
+def _git(*args):
+    try:
+        return subprocess.run(['git', *args], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(RESULTS_DIR)).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment():
+    return {
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def write_results(suite, params, results, path=None):
+    """写入结果文件并返回路径；results 为 [{'name', 'unit', **summarize(samples)}]"""
+    commit = _git('rev-parse', 'HEAD')
+    created_at = datetime.now()
+    document = {
+        'format': RESULTS_FORMAT,
+        'suite': suite,
+        'commit': commit,
+        'dirty': bool(_git('status', '--porcelain', '--untracked-files=no')),
+        'created_at': created_at.isoformat(timespec='seconds'),
+        'environment': environment(),
+        'params': params,
+        'results': results,
+    }
+    if path is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = os.path.join(RESULTS_DIR, f"{suite}-{(commit or 'nogit')[:10]}-{created_at:%Y%m%d%H%M%S}.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(document, f, ensure_ascii=False, indent=2)
+    return path
+
+
+def load_results(path):
+    with open(path, encoding='utf-8') as f:
+        document = json.load(f)
+    if document.get('format') != RESULTS_FORMAT:
+        raise ValueError(f"{path}: 不支持的结果文件格式 {document.get('format')}")
+    return document
@@ -0,0 +1,378 @@
+"""多角色 locust 压测负载
+
+locust -f locustfile.py --host http://127.0.0.1:5000 --headless -u 50 -r 10 -t 2m \
+       [--dataset-students 100000] [--max-p95 500] [--max-fail-ratio 0.01] [--min-rps 0] [--results 结果文件]
+
+按前端各角色可见的标签页模拟真实操作：
+- 管理员：学生/课程列表（含深分页）、搜索、展开学生详情、新增/修改学生、统计面板、用户列表；
+- 教师：下拉选项加载、按课程查看考勤、点名、改成绩/批量录入成绩、按学生查家长、统计面板；
+- 学生：以学号登录（首次登录自动创建账号），查看本人信息、选课成绩、家长、课程列表。
+三类用户按 weight 混合（默认 1 : 4 : 20）。
+
+数据池在测试开始时通过接口加载（课程、教师名下的选课名单）；学生学号按 benchmarks.datagen 的
+规则 S0000000 起连续编号，--dataset-students 指定数据集的学生数，--pool-seed 固定抽样顺序。
+结束时（--headless）按 benchmarks.results 的格式写入每个接口的延迟和吞吐，并按 --max-p95 等阈值
+设置退出码，可直接作为 CI 的回归门槛，也可以用 benchmarks.compare 与上次结果对比。
+"""
+import random
+import string
+import sys
+from datetime import date, timedelta
+
+import gevent
+from gevent.lock import Semaphore
+from locust import HttpUser, between, events, task
+from locust.runners import WorkerRunner
+
+from benchmarks.results import write_results
+from routes.attendance import ATTENDANCE_STATUSES
+
+# 与 benchmarks.datagen 一致的默认账号与学期日期
+ADMIN_ACCOUNT = ('admin', 'admin123')
+TEACHER_ACCOUNT = ('teacher', 'teacher123')
+STUDENT_PASSWORD = '123456'
+TERM_START = date(2024, 9, 2)
+TERM_DAYS = 120
+SEARCH_TERMS = ('王', '李', '张', '刘', '陈', '王伟', '李娜', '张敏', '高1', '老师')
+PAGE_SIZE = 10
+DEEP_PAGE_RATE = 0.1  # 翻到深页的比例，其余集中在前 5 页
+ROSTER_LIMIT = 100
+LOGIN_RETRIES = 3  # 登录返回 503（密码哈希排队已满）时按 Retry-After 重试的次数
+
+
+class DataPool:
+    """测试数据池：进程内所有虚拟用户共享，测试开始时加载一次"""
+
+    def __init__(self):
+        self.students = 0
+        self.course_ids = []
+        self.rng = random.Random()
+        self.loaded = False
+        self.lock = Semaphore()
+
+    def configure(self, students, seed):
+        self.students = students
+        self.rng = random.Random(seed)
+        self.loaded = False
+
+    def load(self, client):
+        """通过课程选项接口加载课程 id；未指定学生数时用学生列表的 total
+
+        第一个启动的用户负责加载，同时启动的其他用户等待其完成。
+        """
+        with self.lock:
+            if not self.loaded:
+                self._load(client)
+                self.loaded = True
+
+    def _load(self, client):
+        response = client.get('/api/courses/options', params={'limit': 1000}, name='[setup] courses.options')
+        self.course_ids = [course['id'] for course in response.json().get('data', [])]
+        if not self.students:
+            response = client.get('/api/students', params={'page': 1, 'limit': 1}, name='[setup] students.total')
+            self.students = response.json().get('total') or 0
+
+    def student_id(self):
+        return f'S{self.rng.randrange(max(self.students, 1)):07d}'
+
+    def course_id(self):
+        return self.rng.choice(self.course_ids) if self.course_ids else 1
+
+    def page(self, total):
+        """页码：大部分在前几页，少量随机深页"""
+        pages = max(1, -(-total // PAGE_SIZE))
+        if self.rng.random() < DEEP_PAGE_RATE:
+            return self.rng.randint(1, pages)
+        return self.rng.randint(1, min(5, pages))
+
+    def day(self):
+        return (TERM_START + timedelta(days=self.rng.randrange(TERM_DAYS))).isoformat()
+
+
+POOL = DataPool()
+
+
+@events.init_command_line_parser.add_listener
+def _add_arguments(parser):
+    parser.add_argument('--dataset-students', type=int, default=0,
+                        help='数据集学生数（benchmarks.datagen 的 --scale），0 表示从接口读取')
+    parser.add_argument('--pool-seed', type=int, default=42, help='数据池抽样的随机种子')
+    parser.add_argument('--max-p95', type=float, default=0, help='全部请求 p95 延迟上限（毫秒），0 表示不检查')
+    parser.add_argument('--max-fail-ratio', type=float, default=0.01, help='失败请求比例上限')
+    parser.add_argument('--min-rps', type=float, default=0, help='总吞吐下限（请求/秒），0 表示不检查')
+    parser.add_argument('--results', default=None, help='结果文件路径，默认写入 benchmarks/results/')
+
+
+@events.test_start.add_listener
+def _configure_pool(environment, **kwargs):
+    options = environment.parsed_options
+    if options is not None:
+        POOL.configure(options.dataset_students, options.pool_seed)
+
+
+def _entry_result(name, entry, duration):
+    return {
+        'name': name,
+        'unit': 'ms',
+        'samples': entry.num_requests,
+        'median': entry.median_response_time,
+        'p95': entry.get_response_time_percentile(0.95),
+        'p99': entry.get_response_time_percentile(0.99),
+        'mean': entry.avg_response_time,
+        'min': entry.min_response_time or 0,
+        'max': entry.max_response_time,
+        'failures': entry.num_failures,
+        'rps': entry.num_requests / duration if duration else 0,
+    }
+
+
+def summarize_stats(stats):
+    """把 locust 统计转为 benchmarks.results 的结果列表，最后一项为汇总"""
+    duration = max(stats.last_request_timestamp or 0, stats.start_time) - stats.start_time
+    results = [_entry_result(f'{entry.method} {entry.name}', entry, duration)
+               for entry in sorted(stats.entries.values(), key=lambda e: (e.name, e.method))
+               if entry.num_requests]
+    results.append(_entry_result('Aggregated', stats.total, duration))
+    return results
+
+
+def check_gates(total, max_p95=0, max_fail_ratio=0.01, min_rps=0):
+    """检查汇总结果是否满足阈值，返回不满足的说明列表"""
+    failures = []
+    fail_ratio = total['failures'] / total['samples'] if total['samples'] else 0
+    if max_p95 and total['p95'] > max_p95:
+        failures.append(f"p95 {total['p95']:.0f}ms > {max_p95:.0f}ms")
+    if fail_ratio > max_fail_ratio:
+        failures.append(f'失败比例 {fail_ratio:.2%} > {max_fail_ratio:.2%}')
+    if min_rps and total['rps'] < min_rps:
+        failures.append(f"吞吐 {total['rps']:.1f} rps < {min_rps:.1f} rps")
+    return failures
+
+
+@events.quitting.add_listener
+def _write_summary(environment, **kwargs):
+    """无界面运行结束时写结果文件并按阈值设置退出码（分布式时只在 master 上执行）"""
+    options = environment.parsed_options
+    if options is None or not options.headless or isinstance(environment.runner, WorkerRunner):
+        return
+    results = summarize_stats(environment.stats)
+    total = results[-1]
+    params = {'students': POOL.students, 'pool_seed': options.pool_seed, 'users': options.num_users,
+              'spawn_rate': options.spawn_rate, 'run_time': options.run_time, 'host': environment.host}
+    path = write_results('locust', params, results, options.results)
+    print(f"results: {path}  {total['rps']:.1f} rps  median {total['median']:.0f}ms  p95 {total['p95']:.0f}ms",
+          file=sys.stderr)
+    failures = check_gates(total, options.max_p95, options.max_fail_ratio, options.min_rps)
+    for failure in failures:
+        print(f'未通过: {failure}', file=sys.stderr)
+    if failures:
+        environment.process_exit_code = 1
+
+
+class RoleUser(HttpUser):
+    """登录后带令牌访问接口的用户基类"""
+    abstract = True
+    wait_time = between(0.5, 2)
+    account = None
+
+    def on_start(self):
+        POOL.load(self.client)
+        self.login(*self.account)
+
+    def on_stop(self):
+        self.client.post('/api/logout')
+
+    def login(self, username, password):
+        """登录并在之后的请求中带上令牌；服务端返回 503 时按 Retry-After 等待后重试"""
+        for _ in range(LOGIN_RETRIES):
+            response = self.client.post('/api/login', json={'username': username, 'password': password})
+            if response.status_code != 503:
+                break
+            gevent.sleep(float(response.headers.get('Retry-After', 1)))
+        token = response.json().get('token') if response.ok else None
+        if token:
+            self.client.headers['Authorization'] = f'Bearer {token}'
+
+    def dropdowns(self):
+        """打开带下拉选择的表单时加载学生、课程选项"""
+        self.client.get('/api/students/options', name='/api/students/options')
+        self.client.get('/api/courses/options', name='/api/courses/options')
+
+    def list_page(self, url, name, **params):
+        """列表页：先取第一页拿到总数，再按分布翻页"""
+        response = self.client.get(url, params={'page': 1, 'limit': PAGE_SIZE, **params}, name=f'{name} page=1')
+        total = (response.json().get('total') or 0) if response.ok else 0
+        page = POOL.page(total)
+        if page > 1:
+            self.client.get(url, params={'page': page, 'limit': PAGE_SIZE, **params}, name=f'{name} page=[n]')
+
+    def statistics(self):
+        self.client.get('/api/statistics')
+
+    def parents_of(self, student_id):
+        self.client.get('/api/parents', params={'student_id': student_id, 'page': 1, 'limit': 1000},
+                        name='/api/parents?student_id=[id]')
+
+
+class AdminUser(RoleUser):
+    weight = 1
+    account = ADMIN_ACCOUNT
+
+    @task(6)
+    def students_tab(self):
+        self.list_page('/api/students', '/api/students')
+
+    @task(3)
+    def search_students(self):
+        self.client.get('/api/search', params={'q': POOL.rng.choice(SEARCH_TERMS), 'type': 'students',
+                                               'limit': 100, 'count': 'none'},
+                        name='/api/search?type=students')
+
+    @task(3)
+    def expand_student(self):
+        """展开学生行：加载该生的选课和考勤"""
+        student_id = POOL.student_id()
+        self.client.get('/api/student-courses', params={'student_id': student_id},
+                        name='/api/student-courses?student_id=[id]')
+        self.client.get('/api/attendance', params={'student_id': student_id, 'limit': 1000},
+                        name='/api/attendance?student_id=[id]')
+
+    @task(1)
+    def create_and_edit_student(self):
+        student_id = 'L' + ''.join(POOL.rng.choices(string.digits, k=9))
+        response = self.client.post('/api/students', json={'student_id': student_id, 'name': '压测学生',
+                                                           'gender': '男', 'age': 16})
+        if response.ok:
+            self.client.put(f'/api/students/{student_id}',
+                            json={'name': '压测学生', 'gender': '女', 'class_name': '高11班',
+                                  'email': f'{student_id}@example.com'},
+                            name='/api/students/[id]')
+
+    @task(2)
+    def courses_tab(self):
+        self.list_page('/api/courses', '/api/courses')
+
+    @task(2)
+    def student_courses_tab(self):
+        self.dropdowns()
+        self.list_page('/api/student-courses', '/api/student-courses')
+
+    @task(2)
+    def rewards_tab(self):
+        self.client.get('/api/students/options', name='/api/students/options')
+        self.list_page('/api/rewards-punishments', '/api/rewards-punishments')
+
+    @task(1)
+    def parents_tab(self):
+        self.list_page('/api/parents', '/api/parents')
+
+    @task(2)
+    def statistics_tab(self):
+        self.statistics()
+
+    @task(1)
+    def users_tab(self):
+        self.client.get('/api/users', params={'page': 1, 'limit': PAGE_SIZE}, name='/api/users page=1')
+
+
+class TeacherUser(RoleUser):
+    weight = 4
+    account = TEACHER_ACCOUNT
+
+    def on_start(self):
+        super().on_start()
+        self.switch_course()
+
+    def switch_course(self):
+        """选择一门课程并加载其选课名单（成绩编辑和点名的对象）"""
+        self.course_id = POOL.course_id()
+        response = self.client.get('/api/student-courses',
+                                   params={'course_id': self.course_id, 'page': 1, 'limit': ROSTER_LIMIT},
+                                   name='/api/student-courses?course_id=[id]')
+        self.roster = response.json().get('data', []) if response.ok else []
+
+    @task(2)
+    def change_course(self):
+        self.switch_course()
+
+    @task(6)
+    def attendance_tab(self):
+        self.dropdowns()
+        self.list_page('/api/attendance', '/api/attendance?course_id=[id]', course_id=self.course_id)
+
+    @task(3)
+    def roll_call(self):
+        if not self.roster:
+            return
+        weights = (90, 4, 6)  # 与 ATTENDANCE_STATUSES 对应
+        records = {row['student_id']: POOL.rng.choices(ATTENDANCE_STATUSES, weights)[0] for row in self.roster}
+        self.client.post('/api/attendance/roll-call',
+                         json={'course_id': self.course_id, 'date': POOL.day(), 'records': records})
+
+    @task(4)
+    def edit_grade(self):
+        if not self.roster:
+            return
+        row = POOL.rng.choice(self.roster)
+        self.client.put(f"/api/student-courses/{row['id']}",
+                        json={'exam_score': POOL.rng.randint(40, 100), 'daily_score': POOL.rng.randint(50, 100)},
+                        name='/api/student-courses/[id]')
+
+    @task(1)
+    def batch_grades(self):
+        if not self.roster:
+            return
+        grades = [{'student_id': row['student_id'], 'course_id': self.course_id,
+                   'exam_score': POOL.rng.randint(40, 100), 'daily_score': POOL.rng.randint(50, 100)}
+                  for row in self.roster]
+        self.client.post('/api/student-courses/grades', json={'grades': grades})
+
+    @task(2)
+    def rewards_tab(self):
+        self.client.get('/api/students/options', name='/api/students/options')
+        self.list_page('/api/rewards-punishments', '/api/rewards-punishments')
+
+    @task(2)
+    def parent_lookup(self):
+        if self.roster:
+            self.parents_of(POOL.rng.choice(self.roster)['student_id'])
+
+    @task(3)
+    def statistics_tab(self):
+        self.statistics()
+
+
+class StudentUser(RoleUser):
+    weight = 20
+
+    def on_start(self):
+        # 以数据集中随机一名学生的学号登录，首次登录时服务端自动创建学生账号
+        POOL.load(self.client)
+        self.student_id = POOL.student_id()
+        self.login(self.student_id, STUDENT_PASSWORD)
+
+    @task(3)
+    def my_info(self):
+        self.client.get('/api/search', params={'q': self.student_id, 'type': 'students', 'limit': 100,
+                                               'count': 'none'},
+                        name='/api/search?q=[student_id]')
+
+    @task(5)
+    def my_courses(self):
+        self.client.get('/api/student-courses', params={'student_id': self.student_id, 'limit': 1000},
+                        name='/api/student-courses?student_id=[id]')
+
+    @task(2)
+    def courses_tab(self):
+        self.list_page('/api/courses', '/api/courses')
+
+    @task(2)
+    def my_parents(self):
+        self.parents_of(self.student_id)
+
+    @task(1)
+    def account_tab(self):
+        if 'Authorization' not in self.client.headers:
+            self.login(self.student_id, STUDENT_PASSWORD)
+            return
+        self.client.get('/api/me')
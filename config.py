@@ -1,3 +1,70 @@
 """应用配置文件"""
-DATABASE = 'student_management.db'
+import os
+import secrets
 
+DATABASE = os.environ.get('DATABASE', 'student_management.db')
+
+# 会话令牌签名密钥；未配置时每次启动随机生成（会话本身也只保存在进程内存中）
+SECRET_KEY = os.environ.get('SECRET_KEY') or secrets.token_hex(32)
+
+# 数据库连接池配置（写操作统一走单一写连接，这里配置的是只读连接池）
+DB_READ_POOL_SIZE = int(os.environ.get('DB_READ_POOL_SIZE', 10))  # 只读连接池最大连接数
+DB_POOL_IDLE_TIMEOUT = 300  # 空闲连接超过该秒数后关闭
+DB_POOL_CHECKOUT_TIMEOUT = 30  # 池满或写通道被占用时等待的最长秒数
+DB_POOL_HEALTH_CHECK_INTERVAL = 60  # 空闲超过该秒数的连接在借出前先做健康检查
+
+# 锁竞争处理
+DB_BUSY_TIMEOUT = 5  # SQLite 库内等待锁释放的秒数（busy_timeout）
+DB_REQUEST_DEADLINE = 10  # 单个请求在数据库锁上最多等待的秒数
+DB_RETRY_BASE_DELAY = 0.01  # 重试退避的初始间隔（秒），每次翻倍并加随机抖动
+DB_RETRY_MAX_DELAY = 0.5  # 重试退避的最大间隔（秒）
+
+# SQL 剖析
+SQL_SLOW_QUERY_MS = float(os.environ.get('SQL_SLOW_QUERY_MS', 100))  # 单条语句（含读取结果）超过该毫秒数记为慢查询
+SQL_SLOW_QUERY_LOG_SIZE = 200  # 慢查询日志保留的最近条数
+# /api/_debug/* 运行状态接口：默认只在调试模式下或对管理员开放，设置 DEBUG_ENDPOINTS=1 时对所有请求开放
+DEBUG_ENDPOINTS = os.environ.get('DEBUG_ENDPOINTS') == '1'
+
+# 访问日志（JSONL，供 benchmarks.replay 回放）
+ACCESS_LOG_PATH = os.environ.get('ACCESS_LOG_PATH')  # 未配置时不记录
+ACCESS_LOG_MAX_BODY = 64 * 1024  # 超过该字节数的请求体不写入日志
+
+# 数据迁移
+MIGRATION_BATCH_SIZE = 1000  # 回填数据时每批读取和更新的行数
+
+# 列表分页
+PAGE_MAX_LIMIT = 1000  # 列表接口单页最多返回的行数（前端按学生查看选课、考勤时一次取 1000 条）
+
+# 列表总数缓存
+COUNT_CACHE_SIZE = 4096  # 缓存的过滤条件组合数上限
+COUNT_CACHE_TTL = 300  # 秒；写接口会主动使缓存失效，TTL 只兜底进程外的修改
+
+# 下拉框选项接口（/api/students/options、/api/courses/options）
+OPTIONS_MAX_LIMIT = 1000  # 单次最多返回的选项数
+OPTIONS_CACHE_SIZE = 256  # 缓存的 (接口, 前缀, 数量) 组合数上限
+OPTIONS_CACHE_TTL = 300  # 秒；写接口会主动使缓存失效
+
+# 读接口响应缓存
+RESPONSE_CACHE_SIZE = 512  # 缓存的 (路由, 查询参数) 组合数上限
+RESPONSE_CACHE_TTL = 60  # 秒；写接口会主动使相关表的缓存失效
+
+# 批量导入与批量录入
+IMPORT_BATCH_SIZE = 1000  # 每个事务插入的行数
+IMPORT_MAX_ERRORS = 1000  # 响应中最多返回的逐行错误数
+GRADE_BATCH_MAX = 5000  # 批量录入成绩单次请求最多的记录数
+
+# 流式导出
+EXPORT_FETCH_SIZE = 500  # 每次从游标读取并输出的行数
+
+# 密码哈希（bcrypt 在独立进程池中执行，不占用请求线程和 GIL）
+AUTH_HASH_WORKERS = int(os.environ.get('AUTH_HASH_WORKERS', os.cpu_count() or 1))  # 0 表示在请求线程内直接计算
+AUTH_HASH_QUEUE_LIMIT = AUTH_HASH_WORKERS * 8  # 排队 + 执行中的哈希任务上限，超出时直接返回 503
+AUTH_HASH_TIMEOUT = 5  # 等待单个哈希任务结果的最长秒数
+AUTH_BCRYPT_ROUNDS = int(os.environ.get('AUTH_BCRYPT_ROUNDS', 12))  # bcrypt 代价因子
+
+# 登录会话
+SESSION_TTL = 8 * 3600  # 秒；令牌签名与内存中的会话都在此时间后失效
+SESSION_MAX_ENTRIES = 10000  # 内存中最多保存的会话数，超出时淘汰最久未使用的
+
+# 全文检索
+SEARCH_MAX_LIMIT = 100  # 每页最多返回的结果数
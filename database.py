@@ -4,16 +4,26 @@ import time
 import hashlib
 import json
 import random
+import threading
 from datetime import datetime
-from config import DATABASE
+from flask import g, has_app_context, jsonify
+from utils import sql_profiling
+from utils.cache import invalidate_all
+from utils.sql_profiling import ProfilingCursor
+from config import (DATABASE, DB_READ_POOL_SIZE, DB_POOL_IDLE_TIMEOUT, DB_POOL_CHECKOUT_TIMEOUT,
+                    DB_POOL_HEALTH_CHECK_INTERVAL, DB_BUSY_TIMEOUT, DB_REQUEST_DEADLINE,
+                    DB_RETRY_BASE_DELAY, DB_RETRY_MAX_DELAY, MIGRATION_BATCH_SIZE)
 
 
-def init_db():
-    """初始化数据库"""
-    conn = sqlite3.connect(DATABASE, timeout=30, isolation_level='IMMEDIATE')
+def init_db(path=None):
+    """初始化数据库；path 默认为当前使用的数据库（config.DATABASE 或 use_database() 指定的路径）"""
+    conn = sqlite3.connect(path or DATABASE, timeout=30, isolation_level='IMMEDIATE')
     cursor = conn.cursor()
     print("Initializing database...")  # Debug
     
+    # WAL 模式下读不阻塞写、写不阻塞读
+    cursor.execute('PRAGMA journal_mode=WAL')
+    
     # Create users table
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS users (
@@ -140,29 +150,998 @@ def init_db():
                            (username, password, role, datetime.now().isoformat()))
         print("Default users added")
     
+    migrate(cursor)
+    
     conn.commit()
     conn.close()
     print("Database initialization complete")
 
 
-def get_db():
-    """获取数据库连接"""
-    conn = sqlite3.connect(DATABASE, timeout=30, isolation_level='IMMEDIATE')
+def _migration_001_route_indexes(cursor):
+    """为各路由的过滤、关联和排序列创建索引"""
+    statements = [
+        # 列表接口 ORDER BY created_at DESC
+        'CREATE INDEX IF NOT EXISTS idx_students_created_at ON students (created_at)',
+        'CREATE INDEX IF NOT EXISTS idx_courses_created_at ON courses (created_at)',
+        'CREATE INDEX IF NOT EXISTS idx_users_created_at ON users (created_at)',
+        # 登录时按姓名查找学生
+        'CREATE INDEX IF NOT EXISTS idx_students_name ON students (name)',
+        # routes/student_courses.py：按学生/课程过滤，按 created_at 排序
+        'CREATE INDEX IF NOT EXISTS idx_student_courses_student_created ON student_courses (student_id, created_at)',
+        'CREATE INDEX IF NOT EXISTS idx_student_courses_course_created ON student_courses (course_id, created_at)',
+        'CREATE INDEX IF NOT EXISTS idx_student_courses_created_at ON student_courses (created_at)',
+        'CREATE INDEX IF NOT EXISTS idx_student_courses_student_course ON student_courses (student_id, course_id)',
+        # routes/attendance.py：按学生/课程/日期过滤，按 date 排序
+        'CREATE INDEX IF NOT EXISTS idx_attendance_student_date ON attendance (student_id, date)',
+        'CREATE INDEX IF NOT EXISTS idx_attendance_course_date ON attendance (course_id, date)',
+        'CREATE INDEX IF NOT EXISTS idx_attendance_date ON attendance (date)',
+        # routes/rewards.py：按学生/类型过滤，按 date 排序
+        'CREATE INDEX IF NOT EXISTS idx_rewards_student_date ON rewards_punishments (student_id, date)',
+        'CREATE INDEX IF NOT EXISTS idx_rewards_type_date ON rewards_punishments (type, date)',
+        'CREATE INDEX IF NOT EXISTS idx_rewards_date ON rewards_punishments (date)',
+        # routes/parents.py：按学生过滤，按 created_at 排序
+        'CREATE INDEX IF NOT EXISTS idx_parents_student_created ON parents (student_id, created_at)',
+        'CREATE INDEX IF NOT EXISTS idx_parents_created_at ON parents (created_at)',
+    ]
+    for statement in statements:
+        cursor.execute(statement)
+
+
+def _migration_002_statistics_indexes(cursor):
+    """统计接口按课程分组聚合时使用的覆盖索引"""
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_student_courses_course_score ON student_courses (course_id, final_score)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_attendance_course_status ON attendance (course_id, status)')
+
+
+def rebuild_statistics(cursor):
+    """根据明细表重新计算 course_stats / global_stats（迁移回填及数据修复时使用）"""
+    cursor.execute('DELETE FROM course_stats')
+    cursor.execute('''
+        INSERT INTO course_stats (course_id, score_count, score_sum, attendance_total, attendance_present)
+        SELECT course_id, SUM(score_count), SUM(score_sum), SUM(attendance_total), SUM(attendance_present)
+        FROM (
+            SELECT course_id, COUNT(final_score) AS score_count, COALESCE(SUM(final_score), 0) AS score_sum,
+                   0 AS attendance_total, 0 AS attendance_present
+            FROM student_courses WHERE course_id IS NOT NULL GROUP BY course_id
+            UNION ALL
+            SELECT course_id, 0, 0, COUNT(*), SUM(status = '出勤')
+            FROM attendance WHERE course_id IS NOT NULL GROUP BY course_id
+        )
+        GROUP BY course_id
+    ''')
+    cursor.execute('''
+        INSERT OR REPLACE INTO global_stats (id, student_count, course_count, score_count, score_sum,
+                                             attendance_total, attendance_present)
+        SELECT 1,
+               (SELECT COUNT(*) FROM students),
+               (SELECT COUNT(*) FROM courses),
+               (SELECT COUNT(final_score) FROM student_courses),
+               (SELECT COALESCE(SUM(final_score), 0) FROM student_courses),
+               (SELECT COUNT(*) FROM attendance),
+               (SELECT COUNT(*) FROM attendance WHERE status = '出勤')
+    ''')
+
+
+def _migration_003_statistics_materialization(cursor):
+    """统计物化表及维护它们的触发器
+
+    course_stats / global_stats 保存成绩与考勤的计数和求和，
+    明细表的每次增删改由触发器增量更新，统计接口无需扫描明细表。
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS course_stats (
+            course_id INTEGER PRIMARY KEY,
+            score_count INTEGER NOT NULL DEFAULT 0,
+            score_sum REAL NOT NULL DEFAULT 0,
+            attendance_total INTEGER NOT NULL DEFAULT 0,
+            attendance_present INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS global_stats (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            student_count INTEGER NOT NULL DEFAULT 0,
+            course_count INTEGER NOT NULL DEFAULT 0,
+            score_count INTEGER NOT NULL DEFAULT 0,
+            score_sum REAL NOT NULL DEFAULT 0,
+            attendance_total INTEGER NOT NULL DEFAULT 0,
+            attendance_present INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    
+    # 成绩：sign 为 +1 表示计入 NEW 行，-1 表示扣除 OLD 行
+    def score_delta(row, sign):
+        return f'''
+            UPDATE global_stats SET score_count = score_count {sign} ({row}.final_score IS NOT NULL),
+                                    score_sum = score_sum {sign} COALESCE({row}.final_score, 0)
+            WHERE id = 1;
+            INSERT INTO course_stats (course_id, score_count, score_sum)
+            SELECT {row}.course_id, 0, 0 WHERE {row}.course_id IS NOT NULL
+            ON CONFLICT (course_id) DO NOTHING;
+            UPDATE course_stats SET score_count = score_count {sign} ({row}.final_score IS NOT NULL),
+                                    score_sum = score_sum {sign} COALESCE({row}.final_score, 0)
+            WHERE course_id = {row}.course_id;
+        '''
+    
+    # 考勤：出勤状态计入 attendance_present
+    def attendance_delta(row, sign):
+        return f'''
+            UPDATE global_stats SET attendance_total = attendance_total {sign} 1,
+                                    attendance_present = attendance_present {sign} ({row}.status = '出勤')
+            WHERE id = 1;
+            INSERT INTO course_stats (course_id, attendance_total, attendance_present)
+            SELECT {row}.course_id, 0, 0 WHERE {row}.course_id IS NOT NULL
+            ON CONFLICT (course_id) DO NOTHING;
+            UPDATE course_stats SET attendance_total = attendance_total {sign} 1,
+                                    attendance_present = attendance_present {sign} ({row}.status = '出勤')
+            WHERE course_id = {row}.course_id;
+        '''
+    
+    triggers = {
+        'trg_students_insert_stats': 'AFTER INSERT ON students BEGIN '
+            'UPDATE global_stats SET student_count = student_count + 1 WHERE id = 1; END',
+        'trg_students_delete_stats': 'AFTER DELETE ON students BEGIN '
+            'UPDATE global_stats SET student_count = student_count - 1 WHERE id = 1; END',
+        'trg_courses_insert_stats': 'AFTER INSERT ON courses BEGIN '
+            'UPDATE global_stats SET course_count = course_count + 1 WHERE id = 1; END',
+        'trg_courses_delete_stats': 'AFTER DELETE ON courses BEGIN '
+            'UPDATE global_stats SET course_count = course_count - 1 WHERE id = 1; END',
+        'trg_student_courses_insert_stats': f'AFTER INSERT ON student_courses BEGIN {score_delta("NEW", "+")} END',
+        'trg_student_courses_delete_stats': f'AFTER DELETE ON student_courses BEGIN {score_delta("OLD", "-")} END',
+        'trg_student_courses_update_stats': 'AFTER UPDATE OF final_score, course_id ON student_courses BEGIN '
+            f'{score_delta("OLD", "-")} {score_delta("NEW", "+")} END',
+        'trg_attendance_insert_stats': f'AFTER INSERT ON attendance BEGIN {attendance_delta("NEW", "+")} END',
+        'trg_attendance_delete_stats': f'AFTER DELETE ON attendance BEGIN {attendance_delta("OLD", "-")} END',
+        'trg_attendance_update_stats': 'AFTER UPDATE OF status, course_id ON attendance BEGIN '
+            f'{attendance_delta("OLD", "-")} {attendance_delta("NEW", "+")} END',
+    }
+    for name, body in triggers.items():
+        cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+        cursor.execute(f'CREATE TRIGGER {name} {body}')
+    
+    rebuild_statistics(cursor)
+
+
+def _migration_004_options_indexes(cursor):
+    """下拉选项接口按名称排序、按前缀过滤时使用的覆盖索引"""
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_students_name_student_id ON students (name, student_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_courses_course_name ON courses (course_name)')
+
+
+# 全文检索：(FTS5 表, 源表, 检索列)
+SEARCH_INDEXES = [
+    ('students_fts', 'students', ('name', 'student_id', 'contact', 'class_name', 'teacher')),
+    ('courses_fts', 'courses', ('course_name', 'course_code', 'teacher')),
+    ('parents_fts', 'parents', ('parent_name', 'phone')),
+]
+
+
+def _migration_005_search_indexes(cursor):
+    """学生、课程、家长的 FTS5 全文索引及同步触发器
+
+    使用外部内容表（content=源表），索引中不重复保存列值；unicode61 分词下连续的中文是一个词，
+    检索时按前缀匹配（prefix 索引加速 2、3 字的前缀），姓名、学号、电话、班级都能按开头几个字查到。
+    """
+    for fts, table, columns in SEARCH_INDEXES:
+        cursor.execute(f'''
+            CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+                {', '.join(columns)}, content='{table}', content_rowid='id',
+                tokenize='unicode61', prefix='2 3'
+            )
+        ''')
+    _create_search_triggers(cursor)
+    for fts, _, _ in SEARCH_INDEXES:
+        # 回填已有数据
+        cursor.execute(f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')")
+
+
+def _create_search_triggers(cursor):
+    """全文索引同步触发器
+
+    search_index_deferred 中有源表名时插入触发器不逐行写索引，由 insert_deferring_search_index
+    在同一事务内批量补建；该表只在批量插入的写事务内有数据，提交前清空。
+    """
+    cursor.execute('CREATE TABLE IF NOT EXISTS search_index_deferred (table_name TEXT PRIMARY KEY)')
+    for fts, table, columns in SEARCH_INDEXES:
+        column_list = ', '.join(columns)
+        new_values = ', '.join(f'NEW.{column}' for column in columns)
+        old_values = ', '.join(f'OLD.{column}' for column in columns)
+        triggers = {
+            f'trg_{table}_insert_fts': f'AFTER INSERT ON {table} '
+                f"WHEN NOT EXISTS (SELECT 1 FROM search_index_deferred WHERE table_name = '{table}') BEGIN "
+                f'INSERT INTO {fts} (rowid, {column_list}) VALUES (NEW.id, {new_values}); END',
+            f'trg_{table}_delete_fts': f'AFTER DELETE ON {table} BEGIN '
+                f"INSERT INTO {fts} ({fts}, rowid, {column_list}) VALUES ('delete', OLD.id, {old_values}); END",
+            f'trg_{table}_update_fts': f'AFTER UPDATE OF {column_list} ON {table} BEGIN '
+                f"INSERT INTO {fts} ({fts}, rowid, {column_list}) VALUES ('delete', OLD.id, {old_values}); "
+                f'INSERT INTO {fts} (rowid, {column_list}) VALUES (NEW.id, {new_values}); END',
+        }
+        for name, body in triggers.items():
+            cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+            cursor.execute(f'CREATE TRIGGER {name} {body}')
+
+
+def insert_deferring_search_index(cursor, table, query, rows):
+    """用 executemany 插入一批行，全文索引在插入后用一条 INSERT ... SELECT 补建
+
+    逐行触发的 FTS 写入是批量导入的主要开销，集中补建快约 3 倍。先写入标记开启写事务、
+    拿到写锁后再读取当前最大 id，新行的 id（AUTOINCREMENT）都大于它；调用方负责提交或回滚。
+    """
+    fts, columns = next((fts, columns) for fts, source, columns in SEARCH_INDEXES if source == table)
+    column_list = ', '.join(columns)
+    execute_with_retry(cursor, 'INSERT INTO search_index_deferred (table_name) VALUES (?)', (table,))
+    last_id = cursor.execute(f'SELECT COALESCE(MAX(id), 0) FROM {table}').fetchone()[0]
+    execute_with_retry(cursor, query, rows, many=True)
+    cursor.execute(f'INSERT INTO {fts} (rowid, {column_list}) SELECT id, {column_list} FROM {table} WHERE id > ?',
+                   (last_id,))
+    cursor.execute('DELETE FROM search_index_deferred WHERE table_name = ?', (table,))
+
+
+def drop_derived_objects(cursor):
+    """删除二级索引及统计、全文检索触发器（批量灌入数据前使用，灌完后调用 rebuild_derived_objects）"""
+    cursor.execute(r"""
+        SELECT type, name FROM sqlite_master
+        WHERE (type = 'trigger' AND name LIKE 'trg\_%' ESCAPE '\') OR (type = 'index' AND name LIKE 'idx\_%' ESCAPE '\')
+    """)
+    for kind, name in cursor.fetchall():
+        cursor.execute(f'DROP {kind.upper()} IF EXISTS {name}')
+
+
+def rebuild_derived_objects(cursor):
+    """重新创建索引和触发器，并根据明细表重建统计表和全文索引（这些迁移都可重复执行）"""
+    for migration in (_migration_001_route_indexes, _migration_002_statistics_indexes,
+                      _migration_003_statistics_materialization, _migration_004_options_indexes,
+                      _migration_005_search_indexes):
+        migration(cursor)
+
+
+def parse_family_info(family_info):
+    """从旧的 family_info 中解析 (email, address)
+
+    兼容三种历史格式：JSON 对象、"email|address"、纯文本（含 @ 视为 email，否则视为 address）。
+    """
+    if not family_info:
+        return '', ''
+    try:
+        family_data = json.loads(family_info)
+        if isinstance(family_data, dict):
+            return family_data.get('email') or '', family_data.get('address') or ''
+    except (json.JSONDecodeError, TypeError):
+        pass
+    if '|' in family_info:
+        email, address = family_info.split('|', 1)
+        return email, address
+    if '@' in family_info:
+        return family_info, ''
+    return '', family_info
+
+
+def _migration_006_student_contact_columns(cursor):
+    """学生表新增 email、address 列，并从 family_info 分批回填"""
+    cursor.execute("PRAGMA table_info(students)")
+    columns = [row[1] for row in cursor.fetchall()]
+    for column in ('email', 'address'):
+        if column not in columns:
+            cursor.execute(f"ALTER TABLE students ADD COLUMN {column} TEXT NOT NULL DEFAULT ''")
+    # 按主键分批读取和更新，避免一次把整张表读入内存
+    last_id = 0
+    while True:
+        cursor.execute('''
+            SELECT id, family_info FROM students
+            WHERE id > ? AND family_info IS NOT NULL AND family_info != ''
+            ORDER BY id LIMIT ?
+        ''', (last_id, MIGRATION_BATCH_SIZE))
+        rows = cursor.fetchall()
+        if not rows:
+            break
+        cursor.executemany('UPDATE students SET email = ?, address = ? WHERE id = ?',
+                           [(*parse_family_info(family_info), row_id) for row_id, family_info in rows])
+        last_id = rows[-1][0]
+
+
+def _migration_007_deferrable_search_triggers(cursor):
+    """全文索引插入触发器支持批量插入时延后、集中补建索引"""
+    _create_search_triggers(cursor)
+
+
+# 版本化迁移：(版本号, 说明, 迁移函数)，按版本号顺序执行，已执行的版本记录在 PRAGMA user_version 中
+MIGRATIONS = [
+    (1, 'route filter/join/order indexes', _migration_001_route_indexes),
+    (2, 'statistics covering indexes', _migration_002_statistics_indexes),
+    (3, 'materialized statistics tables and triggers', _migration_003_statistics_materialization),
+    (4, 'options lookup indexes', _migration_004_options_indexes),
+    (5, 'full-text search indexes', _migration_005_search_indexes),
+    (6, 'student email/address columns', _migration_006_student_contact_columns),
+    (7, 'deferrable full-text index triggers', _migration_007_deferrable_search_triggers),
+]
+
+
+def migrate(cursor):
+    """执行尚未应用的迁移
+
+    每个迁移连同 PRAGMA user_version 的更新在同一个事务中提交；sqlite3 模块不会为 DDL
+    自动开启事务，中途失败时整个迁移回滚，下次启动重新执行。
+    """
+    conn = cursor.connection
+    if conn.in_transaction:
+        conn.commit()
+    cursor.execute('PRAGMA user_version')
+    current = cursor.fetchone()[0]
+    for version, description, migration in MIGRATIONS:
+        if version <= current:
+            continue
+        cursor.execute('BEGIN IMMEDIATE')
+        try:
+            migration(cursor)
+            cursor.execute(f'PRAGMA user_version = {version}')
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+        print(f"Applied migration {version}: {description}")
+
+
+# 各路由实际执行的查询形状，用于 EXPLAIN QUERY PLAN 检查
+ROUTE_QUERIES = [
+    ('students.list', 'SELECT * FROM students ORDER BY created_at DESC, id DESC LIMIT ? OFFSET ?', (10, 0)),
+    ('courses.list', 'SELECT * FROM courses ORDER BY created_at DESC, id DESC LIMIT ? OFFSET ?', (10, 0)),
+    ('users.list', 'SELECT id, username, role, created_at FROM users ORDER BY created_at DESC, id DESC LIMIT ? OFFSET ?',
+     (10, 0)),
+    ('auth.student_by_name', 'SELECT student_id FROM students WHERE name = ? LIMIT 1', ('x',)),
+    ('student_courses.list', '''
+        SELECT sc.*, c.course_code, c.course_name, c.teacher, c.credits, s.name as student_name
+        FROM student_courses sc
+        LEFT JOIN courses c ON sc.course_id = c.id
+        LEFT JOIN students s ON sc.student_id = s.student_id
+        WHERE 1=1 ORDER BY sc.created_at DESC, sc.id DESC LIMIT ? OFFSET ?''', (10, 0)),
+    ('student_courses.list_by_student', '''
+        SELECT sc.*, c.course_code, c.course_name, c.teacher, c.credits, s.name as student_name
+        FROM student_courses sc
+        LEFT JOIN courses c ON sc.course_id = c.id
+        LEFT JOIN students s ON sc.student_id = s.student_id
+        WHERE 1=1 AND sc.student_id = ? ORDER BY sc.created_at DESC, sc.id DESC LIMIT ? OFFSET ?''', ('x', 10, 0)),
+    ('student_courses.list_by_course', '''
+        SELECT sc.*, c.course_code, c.course_name, c.teacher, c.credits, s.name as student_name
+        FROM student_courses sc
+        LEFT JOIN courses c ON sc.course_id = c.id
+        LEFT JOIN students s ON sc.student_id = s.student_id
+        WHERE 1=1 AND sc.course_id = ? ORDER BY sc.created_at DESC, sc.id DESC LIMIT ? OFFSET ?''', (1, 10, 0)),
+    ('student_courses.duplicate_check',
+     'SELECT id FROM student_courses WHERE student_id = ? AND course_id = ?', ('x', 1)),
+    ('attendance.list', '''
+        SELECT a.*, s.name as student_name, s.class_name, c.course_name
+        FROM attendance a
+        JOIN students s ON a.student_id = s.student_id
+        LEFT JOIN courses c ON a.course_id = c.id
+        WHERE 1=1 ORDER BY a.date DESC, a.id DESC LIMIT ? OFFSET ?''', (10, 0)),
+    ('attendance.list_by_student', '''
+        SELECT a.*, s.name as student_name, s.class_name, c.course_name
+        FROM attendance a
+        JOIN students s ON a.student_id = s.student_id
+        LEFT JOIN courses c ON a.course_id = c.id
+        WHERE 1=1 AND a.student_id = ? ORDER BY a.date DESC, a.id DESC LIMIT ? OFFSET ?''', ('x', 10, 0)),
+    ('attendance.list_by_course_date', '''
+        SELECT a.*, s.name as student_name, s.class_name, c.course_name
+        FROM attendance a
+        JOIN students s ON a.student_id = s.student_id
+        LEFT JOIN courses c ON a.course_id = c.id
+        WHERE 1=1 AND a.course_id = ? AND a.date = ? ORDER BY a.date DESC, a.id DESC LIMIT ? OFFSET ?''',
+     (1, '2025-01-01', 10, 0)),
+    ('attendance.list_by_date', '''
+        SELECT a.*, s.name as student_name, s.class_name, c.course_name
+        FROM attendance a
+        JOIN students s ON a.student_id = s.student_id
+        LEFT JOIN courses c ON a.course_id = c.id
+        WHERE 1=1 AND a.date = ? ORDER BY a.date DESC, a.id DESC LIMIT ? OFFSET ?''', ('2025-01-01', 10, 0)),
+    ('rewards.list', '''
+        SELECT rp.*, s.name as student_name
+        FROM rewards_punishments rp
+        JOIN students s ON rp.student_id = s.student_id
+        WHERE 1=1 ORDER BY rp.date DESC, rp.id DESC LIMIT ? OFFSET ?''', (10, 0)),
+    ('rewards.list_by_student', '''
+        SELECT rp.*, s.name as student_name
+        FROM rewards_punishments rp
+        JOIN students s ON rp.student_id = s.student_id
+        WHERE 1=1 AND rp.student_id = ? ORDER BY rp.date DESC, rp.id DESC LIMIT ? OFFSET ?''', ('x', 10, 0)),
+    ('rewards.list_by_type', '''
+        SELECT rp.*, s.name as student_name
+        FROM rewards_punishments rp
+        JOIN students s ON rp.student_id = s.student_id
+        WHERE 1=1 AND rp.type = ? ORDER BY rp.date DESC, rp.id DESC LIMIT ? OFFSET ?''', ('奖励', 10, 0)),
+    ('parents.list', '''
+        SELECT p.*, s.name as student_name, s.student_id
+        FROM parents p
+        JOIN students s ON p.student_id = s.student_id
+        WHERE 1=1 ORDER BY p.created_at DESC, p.id DESC LIMIT ? OFFSET ?''', (10, 0)),
+    ('parents.list_by_student', '''
+        SELECT p.*, s.name as student_name, s.student_id
+        FROM parents p
+        JOIN students s ON p.student_id = s.student_id
+        WHERE 1=1 AND p.student_id = ? ORDER BY p.created_at DESC, p.id DESC LIMIT ? OFFSET ?''', ('x', 10, 0)),
+    ('students.list_after_cursor', '''
+        SELECT * FROM students WHERE 1=1 AND created_at <= ? AND (created_at < ? OR id < ?)
+        ORDER BY created_at DESC, id DESC LIMIT ?''', ('2025-01-01', '2025-01-01', 100, 11)),
+    ('attendance.list_by_student_after_cursor', '''
+        SELECT a.*, s.name as student_name, s.class_name, c.course_name
+        FROM attendance a
+        JOIN students s ON a.student_id = s.student_id
+        LEFT JOIN courses c ON a.course_id = c.id
+        WHERE 1=1 AND a.student_id = ? AND a.date <= ? AND (a.date < ? OR a.id < ?)
+        ORDER BY a.date DESC, a.id DESC LIMIT ?''', ('x', '2025-01-01', '2025-01-01', 100, 11)),
+    ('attendance.count_by_student', '''
+        SELECT COUNT(*) FROM attendance a
+        WHERE EXISTS (SELECT 1 FROM students s WHERE s.student_id = a.student_id) AND a.student_id = ?''', ('x',)),
+    ('attendance.count_by_course_date', '''
+        SELECT COUNT(*) FROM attendance a
+        WHERE EXISTS (SELECT 1 FROM students s WHERE s.student_id = a.student_id)
+          AND a.course_id = ? AND a.date = ?''', (1, '2025-01-01')),
+    ('student_courses.count_by_course', 'SELECT COUNT(*) FROM student_courses sc WHERE sc.course_id = ?', (1,)),
+    ('rewards.count_by_type', '''
+        SELECT COUNT(*) FROM rewards_punishments rp
+        WHERE EXISTS (SELECT 1 FROM students s WHERE s.student_id = rp.student_id) AND rp.type = ?''', ('奖励',)),
+    ('parents.count_by_student', '''
+        SELECT COUNT(*) FROM parents p
+        WHERE EXISTS (SELECT 1 FROM students s WHERE s.student_id = p.student_id) AND p.student_id = ?''', ('x',)),
+    ('statistics.global', 'SELECT * FROM global_stats WHERE id = 1', ()),
+    ('attendance.roll_call_existing', 'SELECT student_id FROM attendance WHERE course_id = ? AND date = ?',
+     (1, '2025-01-01')),
+    ('attendance.roll_call_enrolled', '''
+        SELECT student_id FROM student_courses WHERE course_id = ? AND student_id IN (?, ?)''', (1, 'x', 'y')),
+    ('students.options', 'SELECT student_id, name FROM students ORDER BY name, student_id LIMIT ?', (1001,)),
+    ('courses.options', 'SELECT id, course_name FROM courses ORDER BY course_name, id LIMIT ?', (1001,)),
+]
+
+
+def explain_route_queries(conn=None):
+    """对 ROUTE_QUERIES 中的每条查询执行 EXPLAIN QUERY PLAN
+
+    返回 [{'name', 'plan', 'full_scan', 'temp_sort'}]：
+    full_scan 表示存在不走索引的全表扫描，temp_sort 表示排序需要临时 B 树。
+    """
+    own = conn is None
+    if own:
+        conn = get_read_db()
+    try:
+        report = []
+        for name, query, params in ROUTE_QUERIES:
+            plan = [row[3] for row in conn.execute('EXPLAIN QUERY PLAN ' + query, params).fetchall()]
+            report.append({
+                'name': name,
+                'plan': plan,
+                'full_scan': any(step.startswith('SCAN ') and ' USING ' not in step for step in plan),
+                'temp_sort': any('USE TEMP B-TREE' in step for step in plan),
+            })
+        return report
+    finally:
+        if own:
+            conn.close()
+
+
+class PooledConnection(sqlite3.Connection):
+    """由连接池管理的连接，close() 时归还到连接池而不是真正关闭
+
+    游标统一为 ProfilingCursor，记录语句耗时供 SQL 剖析使用。
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._pool = None
+        self._owner = None  # 最近一次借出该连接的线程
+        self._generation = 0  # 每次借出递增，用于识别过期的归还请求
+        self._depth = 0  # 当前借出层数（写通道允许同一线程重入）
+        self._last_used = time.monotonic()
+
+    def cursor(self, factory=ProfilingCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, parameters):
+        return self.cursor().executemany(sql, parameters)
+
+    def close(self):
+        if self._pool is None:
+            super().close()
+        else:
+            self._pool.release(self)
+
+    def _destroy(self):
+        """真正关闭底层连接"""
+        self._pool = None
+        super().close()
+
+
+def _open_connection(database, readonly=False):
+    """打开一个可被连接池管理的连接
+
+    只读连接使用 DEFERRED 事务并开启 query_only，查询不会获取写锁；
+    写连接保持 IMMEDIATE，事务开始即占有写锁。
+    """
+    conn = sqlite3.connect(database, timeout=DB_BUSY_TIMEOUT,
+                           isolation_level='DEFERRED' if readonly else 'IMMEDIATE',
+                           check_same_thread=False, factory=PooledConnection)
     conn.row_factory = sqlite3.Row
+    if readonly:
+        conn.execute('PRAGMA query_only = ON')
+    else:
+        # WAL 下 NORMAL 同步级别仍能保证一致性，提交时少一次 fsync
+        conn.execute('PRAGMA synchronous = NORMAL')
     return conn
 
 
-def execute_with_retry(cursor, query, params):
-    """带重试机制的数据库执行"""
-    retries = 10
-    for attempt in range(retries):
+def _healthy(conn, interval):
+    """空闲超过 interval 秒的连接先执行 SELECT 1 确认可用"""
+    if time.monotonic() - conn._last_used < interval:
+        return True
+    try:
+        conn.execute('SELECT 1').fetchone()
+        return True
+    except sqlite3.Error:
+        return False
+
+
+class ConnectionPool:
+    """有界的 SQLite 只读连接池
+
+    - 同一线程优先拿回自己上次用过的连接（线程亲和）
+    - 池满时在 checkout_timeout 内等待其他请求归还
+    - 空闲过久的连接被关闭，借出前对较旧的连接做 SELECT 1 健康检查
+    """
+
+    def __init__(self, database, max_size=DB_READ_POOL_SIZE, idle_timeout=DB_POOL_IDLE_TIMEOUT,
+                 checkout_timeout=DB_POOL_CHECKOUT_TIMEOUT,
+                 health_check_interval=DB_POOL_HEALTH_CHECK_INTERVAL):
+        self.database = database
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.checkout_timeout = checkout_timeout
+        self.health_check_interval = health_check_interval
+        self._idle = []
+        self._size = 0
+        self._cond = threading.Condition()
+        self._stats = {
+            'checkouts': 0,
+            'created': 0,
+            'reused': 0,
+            'affinity_hits': 0,
+            'waits': 0,
+            'wait_time': 0.0,
+            'timeouts': 0,
+            'health_check_failures': 0,
+            'idle_closed': 0,
+        }
+
+    def _take_idle(self, now):
+        """从空闲列表中取出一个连接，优先当前线程的连接；顺便清理空闲超时的连接"""
+        expired = [c for c in self._idle if now - c._last_used > self.idle_timeout]
+        for conn in expired:
+            self._idle.remove(conn)
+            self._size -= 1
+            self._stats['idle_closed'] += 1
+            conn._destroy()
+        if not self._idle:
+            return None
+        ident = threading.get_ident()
+        for i in range(len(self._idle) - 1, -1, -1):
+            if self._idle[i]._owner == ident:
+                self._stats['affinity_hits'] += 1
+                return self._idle.pop(i)
+        return self._idle.pop()
+
+    def acquire(self):
+        """借出一个连接"""
+        deadline = None
+        while True:
+            conn = None
+            with self._cond:
+                while True:
+                    now = time.monotonic()
+                    conn = self._take_idle(now)
+                    if conn is not None or self._size < self.max_size:
+                        break
+                    if deadline is None:
+                        deadline = now + self.checkout_timeout
+                        self._stats['waits'] += 1
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        self._stats['timeouts'] += 1
+                        raise sqlite3.OperationalError('database connection pool exhausted')
+                    self._cond.wait(remaining)
+                    self._stats['wait_time'] += time.monotonic() - now
+                if conn is None:
+                    self._size += 1
+            if conn is None:
+                try:
+                    conn = _open_connection(self.database, readonly=True)
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+                with self._cond:
+                    self._stats['created'] += 1
+            elif not _healthy(conn, self.health_check_interval):
+                with self._cond:
+                    self._size -= 1
+                    self._stats['health_check_failures'] += 1
+                    self._cond.notify()
+                conn._destroy()
+                continue
+            else:
+                with self._cond:
+                    self._stats['reused'] += 1
+            with self._cond:
+                self._stats['checkouts'] += 1
+            conn._pool = self
+            conn._owner = threading.get_ident()
+            conn._generation += 1
+            conn._depth = 1
+            return conn
+
+    def release(self, conn):
+        """归还连接；未结束的事务会被回滚"""
+        if conn._depth == 0:
+            return
+        conn._depth = 0
         try:
-            cursor.execute(query, params)
-            return  # Success
-        except sqlite3.OperationalError as e:
-            if 'database is locked' in str(e) and attempt < retries - 1:
-                print(f"Database locked, retrying in 2s (attempt {attempt + 1})")
-                time.sleep(2)
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            conn._destroy()
+            return
+        conn._last_used = time.monotonic()
+        with self._cond:
+            self._idle.append(conn)
+            self._cond.notify()
+
+    def close_all(self):
+        """关闭所有空闲连接（已借出的连接在归还后仍会回到池中）"""
+        with self._cond:
+            for conn in self._idle:
+                conn._destroy()
+            self._size -= len(self._idle)
+            self._idle = []
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self._stats)
+            stats['size'] = self._size
+            stats['idle'] = len(self._idle)
+            stats['in_use'] = self._size - len(self._idle)
+            stats['max_size'] = self.max_size
+        return stats
+
+
+class WriterLane:
+    """单一写连接通道
+
+    所有 INSERT/UPDATE/DELETE 都经由同一个 IMMEDIATE 连接串行执行，
+    其他线程在此排队等待，而不是在 SQLite 写锁上反复重试。
+    同一线程可重入（例如测试中持有连接的同时调用接口），
+    只有最外层归还时才会回滚未提交的事务并让出通道。
+    """
+
+    def __init__(self, database, checkout_timeout=DB_POOL_CHECKOUT_TIMEOUT,
+                 health_check_interval=DB_POOL_HEALTH_CHECK_INTERVAL):
+        self.database = database
+        self.checkout_timeout = checkout_timeout
+        self.health_check_interval = health_check_interval
+        self._conn = None
+        self._cond = threading.Condition()
+        self._stats = {
+            'checkouts': 0,
+            'reentrant': 0,
+            'created': 0,
+            'waits': 0,
+            'wait_time': 0.0,
+            'timeouts': 0,
+            'health_check_failures': 0,
+        }
+
+    def acquire(self):
+        """占用写通道并返回写连接"""
+        ident = threading.get_ident()
+        with self._cond:
+            conn = self._conn
+            if conn is not None and conn._depth and conn._owner == ident:
+                conn._depth += 1
+                self._stats['checkouts'] += 1
+                self._stats['reentrant'] += 1
+                return conn
+            deadline = None
+            while self._conn is not None and self._conn._depth:
+                now = time.monotonic()
+                if deadline is None:
+                    # 排队时间同样受请求截止时间约束，超时按锁繁忙处理
+                    deadline = min(now + self.checkout_timeout, _request_deadline())
+                    self._stats['waits'] += 1
+                remaining = deadline - now
+                if remaining <= 0:
+                    self._stats['timeouts'] += 1
+                    raise sqlite3.OperationalError('database is locked: timed out waiting for database writer')
+                self._cond.wait(remaining)
+                self._stats['wait_time'] += time.monotonic() - now
+            conn = self._conn
+            if conn is not None and not _healthy(conn, self.health_check_interval):
+                self._stats['health_check_failures'] += 1
+                conn._destroy()
+                conn = self._conn = None
+            if conn is None:
+                conn = self._conn = _open_connection(self.database)
+                conn._pool = self
+                self._stats['created'] += 1
+            conn._owner = ident
+            conn._generation += 1
+            conn._depth = 1
+            self._stats['checkouts'] += 1
+            return conn
+
+    def release(self, conn):
+        """归还一层占用；最外层归还时回滚未提交事务并唤醒排队的写请求"""
+        with self._cond:
+            if conn._depth == 0:
+                return
+            conn._depth -= 1
+            if conn._depth:
+                return
+            try:
+                if conn.in_transaction:
+                    conn.rollback()
+            except sqlite3.Error:
+                conn._destroy()
+                self._conn = None
+            conn._last_used = time.monotonic()
+            self._cond.notify()
+
+    def close_all(self):
+        """关闭空闲的写连接"""
+        with self._cond:
+            if self._conn is not None and not self._conn._depth:
+                self._conn._destroy()
+                self._conn = None
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self._stats)
+            stats['in_use'] = 1 if self._conn is not None and self._conn._depth else 0
+        return stats
+
+
+_read_pool = None
+_writer = None
+_pool_lock = threading.Lock()
+
+
+def _get_read_pool():
+    global _read_pool
+    if _read_pool is None:
+        with _pool_lock:
+            if _read_pool is None:
+                _read_pool = ConnectionPool(DATABASE)
+    return _read_pool
+
+
+def _get_writer():
+    global _writer
+    if _writer is None:
+        with _pool_lock:
+            if _writer is None:
+                _writer = WriterLane(DATABASE)
+    return _writer
+
+
+def _track(conn):
+    if has_app_context():
+        # 记录本次请求借出的连接，请求结束时兜底归还
+        g.setdefault('_db_connections', []).append((conn, conn._generation, conn._depth))
+    return conn
+
+
+def get_db():
+    """获取写连接（串行写通道），用完调用 close() 归还"""
+    return _track(_get_writer().acquire())
+
+
+def get_read_db():
+    """从只读连接池获取连接，供 GET 查询使用，用完调用 close() 归还"""
+    return _track(_get_read_pool().acquire())
+
+
+def get_pool_stats():
+    """连接池统计：借出次数、新建/复用次数、等待次数与等待时间等"""
+    return {'read': _get_read_pool().stats(), 'write': _get_writer().stats()}
+
+
+def close_pool():
+    """关闭连接池中的空闲连接"""
+    for pool in (_read_pool, _writer):
+        if pool is not None:
+            pool.close_all()
+
+
+def use_database(path):
+    """切换到另一个数据库文件（测试为每个用例使用独立的临时数据库）
+
+    关闭并丢弃现有的连接池，之后借出的连接都打开 path；进程内缓存全部失效。
+    调用时不应有借出未归还的连接。
+    """
+    global DATABASE, _read_pool, _writer
+    with _pool_lock:
+        close_pool()
+        DATABASE = path
+        _read_pool = _writer = None
+    invalidate_all()
+
+
+def _release_request_connections(exc=None):
+    # 逆序归还，保证写通道的重入层数按借出顺序回退
+    for conn, generation, depth in reversed(g.pop('_db_connections', [])):
+        if conn._generation == generation and conn._depth >= depth:
+            conn.close()
+
+
+def _start_request_deadline():
+    g._db_deadline = time.monotonic() + DB_REQUEST_DEADLINE
+
+
+def _busy_response(e):
+    """超过请求截止时间仍拿不到锁或写通道时返回 503，提示客户端稍后重试"""
+    if not _is_lock_error(e):
+        raise e
+    response = jsonify({'success': False, 'message': '数据库繁忙，请稍后重试'})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
+
+def init_app(app):
+    """注册请求开始时的数据库截止时间、锁繁忙的 503 响应、请求结束时的 SQL 剖析汇总和连接回收钩子"""
+    app.before_request(_start_request_deadline)
+    app.register_error_handler(sqlite3.OperationalError, _busy_response)
+    sql_profiling.init_app(app, get_read_db)
+    app.teardown_appcontext(_release_request_connections)
+
+
+class LockWaitStats:
+    """锁等待统计：重试次数、超时次数，以及语句在 execute_with_retry 中的耗时分布（毫秒）
+
+    耗时包含 SQLite busy_timeout 在库内等待锁的时间，因此分布的尾部即锁等待。
+    """
+
+    BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = [0] * (len(self.BUCKETS) + 1)  # 最后一格为 +Inf
+        self._stats = {
+            'calls': 0,
+            'contended': 0,
+            'retries': 0,
+            'deadline_exceeded': 0,
+            'total_time': 0.0,
+        }
+
+    def record(self, attempts, elapsed, exceeded=False):
+        ms = elapsed * 1000
+        with self._lock:
+            self._stats['calls'] += 1
+            self._stats['total_time'] += elapsed
+            if attempts > 1 or exceeded:
+                self._stats['contended'] += 1
+                self._stats['retries'] += attempts - 1
+            if exceeded:
+                self._stats['deadline_exceeded'] += 1
+            for i, bound in enumerate(self.BUCKETS):
+                if ms <= bound:
+                    self._counts[i] += 1
+                    break
             else:
-                raise
+                self._counts[-1] += 1
+
+    def snapshot(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['histogram'] = {
+                **{f'le_{bound}ms': count for bound, count in zip(self.BUCKETS, self._counts)},
+                'le_inf': self._counts[-1],
+            }
+        return stats
+
+
+_lock_wait_stats = LockWaitStats()
+
+
+def get_lock_wait_stats():
+    """execute_with_retry 的锁等待统计"""
+    return _lock_wait_stats.snapshot()
+
+
+def _is_lock_error(e):
+    code = getattr(e, 'sqlite_errorcode', None)
+    return code in (5, 6) or 'locked' in str(e)  # SQLITE_BUSY / SQLITE_LOCKED
+
+
+def _request_deadline():
+    """当前请求的数据库截止时间；请求外调用时从现在开始计算"""
+    if has_app_context() and '_db_deadline' in g:
+        return g._db_deadline
+    return time.monotonic() + DB_REQUEST_DEADLINE
+
+
+def _set_busy_timeout(cursor, seconds):
+    try:
+        cursor.connection.execute(f'PRAGMA busy_timeout = {max(int(seconds * 1000), 0)}')
+    except sqlite3.Error:
+        pass
+
+
+def execute_with_retry(cursor, query, params=(), many=False):
+    """带重试机制的数据库执行
+
+    先由 SQLite 的 busy_timeout 在库内等待锁释放（等待时长不超过请求剩余时间），
+    仍然失败时按指数退避加随机抖动重试，直到请求截止时间。
+    many=True 时 params 为参数序列，使用 executemany 执行（params 需可重复迭代）。
+    """
+    execute = cursor.executemany if many else cursor.execute
+    deadline = _request_deadline()
+    start = time.monotonic()
+    attempt = 0
+    delay = DB_RETRY_BASE_DELAY
+    adjusted = False
+    if deadline - start < DB_BUSY_TIMEOUT:
+        _set_busy_timeout(cursor, deadline - start)
+        adjusted = True
+    try:
+        while True:
+            attempt += 1
+            try:
+                execute(query, params)
+                break
+            except sqlite3.OperationalError as e:
+                now = time.monotonic()
+                if not _is_lock_error(e):
+                    raise
+                if now >= deadline:
+                    _lock_wait_stats.record(attempt, now - start, exceeded=True)
+                    raise
+                time.sleep(min(random.uniform(0, delay), deadline - now))
+                delay = min(delay * 2, DB_RETRY_MAX_DELAY)
+                # 下一次尝试在库内最多等到请求截止
+                _set_busy_timeout(cursor, min(DB_BUSY_TIMEOUT, deadline - time.monotonic()))
+                adjusted = True
+    finally:
+        if adjusted:
+            _set_busy_timeout(cursor, DB_BUSY_TIMEOUT)
+    _lock_wait_stats.record(attempt, time.monotonic() - start)
+
+
+
+# 旧版 SQLite 单条语句最多 999 个绑定参数，IN 列表按此分段
+IN_CHUNK_SIZE = 500
+
+
+def fetch_in_chunks(cursor, query, values, params=()):
+    """执行包含 {placeholders} 的 IN 查询，values 过多时分段执行并合并结果
+
+    params 为 IN 列表之前的其他绑定参数。
+    """
+    values = list(values)
+    rows = []
+    for start in range(0, len(values), IN_CHUNK_SIZE):
+        chunk = values[start:start + IN_CHUNK_SIZE]
+        cursor.execute(query.format(placeholders=','.join('?' * len(chunk))), (*params, *chunk))
+        rows.extend(cursor.fetchall())
+    return rows
 
+if __name__ == '__main__':
+    import sys
+    init_db()
+    if '--explain' in sys.argv:
+        for entry in explain_route_queries():
+            flags = ' '.join(flag for flag in ('full_scan', 'temp_sort') if entry[flag])
+            print(f"{entry['name']}: {flags or 'ok'}")
+            for step in entry['plan']:
+                print(f"    {step}")
@@ -1,16 +1,5 @@
-from locust import HttpUser, task, between
+"""压测入口：管理员、教师、学生三类用户的混合负载，见 benchmarks/workload.py
 
-
-class WebsiteUser(HttpUser):
-    wait_time = between(1, 2)
-
-    @task(3)
-    def get_students(self):
-        self.client.get('/api/students?page=1&limit=10')
-
-    @task(1)
-    def login(self):
-        self.client.post('/api/login', json={
-            'username': 'load_test_user',
-            'password': '123456'
-        })
+locust -f locustfile.py --host http://127.0.0.1:5000 --headless -u 50 -r 10 -t 2m --dataset-students 10000
+"""
+from benchmarks.workload import AdminUser, TeacherUser, StudentUser  # noqa: F401
@@ -1,8 +1,10 @@
 """路由注册"""
-from . import auth, students, courses, student_courses, attendance, rewards, parents, users, statistics
+from . import auth, students, courses, student_courses, attendance, rewards, parents, users, statistics, search, debug, metrics
+from utils import metrics as request_metrics
 
 def register_routes(app):
     """注册所有路由到Flask应用"""
+    request_metrics.init_app(app)
     app.register_blueprint(auth.auth_bp)
     app.register_blueprint(students.students_bp)
     app.register_blueprint(courses.courses_bp)
@@ -12,4 +14,6 @@ def register_routes(app):
     app.register_blueprint(parents.parents_bp)
     app.register_blueprint(users.users_bp)
     app.register_blueprint(statistics.statistics_bp)
-
+    app.register_blueprint(search.search_bp)
+    app.register_blueprint(debug.debug_bp)
+    app.register_blueprint(metrics.metrics_bp)
@@ -1,64 +1,98 @@
 """考勤管理路由"""
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, current_app, request, jsonify
 from datetime import datetime
-from database import get_db, execute_with_retry
+from database import get_db, get_read_db, execute_with_retry, fetch_in_chunks
+from utils.cache import bump_tables
+from utils.response_cache import cached_response
+from utils.pagination import InvalidCursor, parse_pagination, paginate_query, page_response
+from utils.counting import parse_count_mode, count_rows
+from utils.export import parse_export_format, export_response
 
 attendance_bp = Blueprint('attendance', __name__)
 
+ATTENDANCE_STATUSES = ('出勤', '缺席', '请假')
+STATUS_MESSAGE = '状态只能是 ' + '、'.join(ATTENDANCE_STATUSES)
+
+LIST_QUERY = '''
+    SELECT a.*, s.name as student_name, s.class_name, c.course_name
+    FROM attendance a
+    JOIN students s ON a.student_id = s.student_id
+    LEFT JOIN courses c ON a.course_id = c.id
+    WHERE 1=1
+'''
+
+
+def _list_filters(args):
+    """列表与导出共用的过滤条件，返回 (conditions, params)"""
+    conditions = []
+    params = []
+    if args.get('student_id'):
+        conditions.append('a.student_id = ?')
+        params.append(args['student_id'])
+    if args.get('course_id'):
+        conditions.append('a.course_id = ?')
+        params.append(args['course_id'])
+    if args.get('date'):
+        conditions.append('a.date = ?')
+        params.append(args['date'])
+    return conditions, params
+
 
 @attendance_bp.route('/api/attendance', methods=['GET'])
+@cached_response('attendance', 'students', 'courses')
 def get_attendance():
-    student_id = request.args.get('student_id')
-    course_id = request.args.get('course_id')
-    date = request.args.get('date')
-    page = int(request.args.get('page', 1))
-    limit = int(request.args.get('limit', 10))
+    try:
+        page, limit, after = parse_pagination(request.args)
+    except InvalidCursor:
+        return jsonify({'success': False, 'message': '分页游标无效'}), 400
+    except ValueError:
+        return jsonify({'success': False, 'message': 'page 和 limit 必须为正整数'}), 400
+    try:
+        count_mode = parse_count_mode(request.args)
+    except ValueError:
+        return jsonify({'success': False, 'message': 'count 参数只能是 exact、estimate 或 none'}), 400
     
-    conn = get_db()
+    conn = get_read_db()
     cursor = conn.cursor()
     
-    query = '''
-        SELECT a.*, s.name as student_name, s.class_name, c.course_name
-        FROM attendance a
-        JOIN students s ON a.student_id = s.student_id
-        LEFT JOIN courses c ON a.course_id = c.id
-        WHERE 1=1
-    '''
-    params = []
-    
-    if student_id:
-        query += ' AND a.student_id = ?'
-        params.append(student_id)
-    if course_id:
-        query += ' AND a.course_id = ?'
-        params.append(course_id)
-    if date:
-        query += ' AND a.date = ?'
-        params.append(date)
+    conditions, params = _list_filters(request.args)
+    query = LIST_QUERY + ''.join(' AND ' + condition for condition in conditions)
     
-    # Get total count
-    count_query = f'SELECT COUNT(*) as total FROM ({query})'
-    cursor.execute(count_query, params)
-    total = cursor.fetchone()['total']
+    # 总数只统计考勤表本身；列表内连接 students，这里用 EXISTS 保持一致
+    total = count_rows(cursor, 'attendance a',
+                       ['EXISTS (SELECT 1 FROM students s WHERE s.student_id = a.student_id)'] + conditions,
+                       params, ('attendance', 'students'), count_mode)
     
     # Paginate
-    query += ' ORDER BY a.date DESC LIMIT ? OFFSET ?'
-    params.extend([limit, (page - 1) * limit])
-    
+    query, params = paginate_query(query, params, 'a.date', 'a.id', page, limit, after)
     cursor.execute(query, params)
     results = [dict(row) for row in cursor.fetchall()]
     conn.close()
-    return jsonify({'total': total, 'data': results, 'page': page, 'limit': limit})
+    return jsonify(page_response(total, results, page, limit, after, 'date'))
+
+
+@attendance_bp.route('/api/attendance/export', methods=['GET'])
+def export_attendance():
+    """流式导出考勤记录，过滤参数同列表接口，format=csv|ndjson"""
+    try:
+        fmt = parse_export_format(request.args)
+    except ValueError:
+        return jsonify({'success': False, 'message': 'format 参数只能是 csv 或 ndjson'}), 400
+    conditions, params = _list_filters(request.args)
+    query = LIST_QUERY + ''.join(' AND ' + condition for condition in conditions)
+    query += ' ORDER BY a.date DESC, a.id DESC'
+    return export_response(get_read_db(), query, params, fmt, 'attendance')
 
 
 @attendance_bp.route('/api/attendance', methods=['POST'])
 def add_attendance():
     """添加考勤记录"""
     data = request.json
-    print(f"Received attendance data: {data}")  # Debug print
     
     if not data or not data.get('student_id') or not data.get('date') or not data.get('status'):
         return jsonify({'success': False, 'message': '学生ID、日期和状态不能为空'}), 400
+    if data['status'] not in ATTENDANCE_STATUSES:
+        return jsonify({'success': False, 'message': STATUS_MESSAGE}), 400
     
     conn = get_db()
     cursor = conn.cursor()
@@ -70,6 +104,7 @@ def add_attendance():
         ''', (data['student_id'], data.get('course_id'), data['date'], data['status'], 
               data.get('reason', ''), datetime.now().isoformat()))
         conn.commit()
+        bump_tables('attendance')
         conn.close()
         return jsonify({'success': True, 'message': '考勤记录添加成功'})
     except Exception as e:
@@ -77,6 +112,83 @@ def add_attendance():
         return jsonify({'success': False, 'message': f'添加失败: {str(e)}'}), 500
 
 
+@attendance_bp.route('/api/attendance/roll-call', methods=['POST'])
+def roll_call():
+    """按课次点名：一次提交整门课某天的考勤
+
+    请求体为 {"course_id": 1, "date": "2025-03-01", "records": {"学号": "出勤" 或 {"status": ..., "reason": ...}}}。
+    学生必须已选该课程（一次查询校验）；同一课程、日期、学生已有记录时更新，否则新增，
+    重复提交结果不变。整份点名在一个事务内写入，任何一条无效则全部不写入。
+    """
+    data = request.get_json(silent=True) or {}
+    records = data.get('records')
+    if not data.get('course_id') or not data.get('date') or not isinstance(records, dict) or not records:
+        return jsonify({'success': False, 'message': '课程ID、日期和点名记录不能为空'}), 400
+    try:
+        course_id = int(data['course_id'])
+    except (ValueError, TypeError):
+        return jsonify({'success': False, 'message': '课程ID格式错误'}), 400
+    date = data['date']
+    
+    errors = []
+    roll = {}
+    seen = set()
+    for raw_id, entry in records.items():
+        student_id = raw_id.strip()
+        if isinstance(entry, dict):
+            status, reason = entry.get('status'), entry.get('reason') or ''
+        else:
+            status, reason = entry, ''
+        if not student_id:
+            errors.append({'student_id': student_id, 'message': '学生ID不能为空'})
+        elif student_id in seen:
+            # 去掉首尾空格后重复的学号（如 " S001" 与 "S001"）报错，而不是静默合并
+            errors.append({'student_id': student_id, 'message': '学生ID重复'})
+        elif status not in ATTENDANCE_STATUSES:
+            errors.append({'student_id': student_id, 'message': STATUS_MESSAGE})
+        else:
+            roll[student_id] = (status, reason)
+        seen.add(student_id)
+    
+    conn = get_db()
+    cursor = conn.cursor()
+    
+    try:
+        enrolled = {row['student_id'] for row in fetch_in_chunks(
+            cursor, 'SELECT student_id FROM student_courses WHERE course_id = ? AND student_id IN ({placeholders})',
+            roll, params=(course_id,))}
+        errors.extend({'student_id': student_id, 'message': '该学生未选此课程'}
+                      for student_id in roll if student_id not in enrolled)
+        if errors:
+            conn.close()
+            return jsonify({'success': False, 'message': '点名数据有误，未写入任何记录', 'errors': errors}), 400
+        
+        # 先更新：UPDATE 开启写事务并持有写锁，之后查到的已有记录不会被其他写入者改变
+        execute_with_retry(cursor, '''
+            UPDATE attendance SET status=?, reason=? WHERE course_id=? AND date=? AND student_id=?
+        ''', [(status, reason, course_id, date, student_id) for student_id, (status, reason) in roll.items()],
+            many=True)
+        cursor.execute('SELECT student_id FROM attendance WHERE course_id=? AND date=?', (course_id, date))
+        existing = {row['student_id'] for row in cursor.fetchall()}
+        created_at = datetime.now().isoformat()
+        inserts = [(student_id, course_id, date, status, reason, created_at)
+                   for student_id, (status, reason) in roll.items() if student_id not in existing]
+        if inserts:
+            execute_with_retry(cursor, '''
+                INSERT INTO attendance (student_id, course_id, date, status, reason, created_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', inserts, many=True)
+        conn.commit()
+        bump_tables('attendance')
+        conn.close()
+        return jsonify({'success': True, 'message': '点名记录已保存',
+                        'inserted': len(inserts), 'updated': len(roll) - len(inserts)})
+    except Exception as e:
+        conn.rollback()
+        conn.close()
+        return jsonify({'success': False, 'message': f'保存失败: {str(e)}'}), 500
+
+
 @attendance_bp.route('/api/attendance/<int:id>', methods=['PUT'])
 def update_attendance(id):
     """更新考勤记录"""
@@ -87,6 +199,8 @@ def update_attendance(id):
     
     if not data.get('status'):
         return jsonify({'success': False, 'message': '状态不能为空'}), 400
+    if data['status'] not in ATTENDANCE_STATUSES:
+        return jsonify({'success': False, 'message': STATUS_MESSAGE}), 400
     
     conn = get_db()
     cursor = conn.cursor()
@@ -155,6 +269,7 @@ def update_attendance(id):
         execute_with_retry(cursor, update_query, tuple(update_values))
         
         conn.commit()
+        bump_tables('attendance')
         
         if cursor.rowcount == 0:
             conn.close()
@@ -164,7 +279,7 @@ def update_attendance(id):
         return jsonify({'success': True, 'message': '考勤记录更新成功'})
     except Exception as e:
         conn.close()
-        print(f"Update attendance error: {e}")  # Debug print
+        current_app.logger.exception('更新考勤记录失败')
         return jsonify({'success': False, 'message': f'更新失败: {str(e)}'}), 500
 
 
@@ -177,6 +292,7 @@ def delete_attendance(id):
     try:
         execute_with_retry(cursor, 'DELETE FROM attendance WHERE id=?', (id,))
         conn.commit()
+        bump_tables('attendance')
         
         if cursor.rowcount == 0:
             conn.close()
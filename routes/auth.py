@@ -1,12 +1,94 @@
 """用户认证路由"""
-from flask import Blueprint, request, jsonify
+import sqlite3
+from flask import Blueprint, current_app, request, jsonify, g
 from datetime import datetime
-import hashlib
-import random
-from database import get_db
+from database import get_db, get_read_db, execute_with_retry
+from utils.cache import bump_tables
+from utils.password_hashing import HashingBusy, hash_password, verify_password, needs_upgrade, record_upgrade
+from utils.sessions import create_session, resolve_session, revoke_session, token_from_request
+from utils.singleflight import SingleFlight
 
 auth_bp = Blueprint('auth', __name__)
 
+# 不存在的用户使用该密码登录时自动创建学生账号
+DEFAULT_PASSWORD = '123456'
+
+
+_provisioning = SingleFlight()
+
+
+def _provision_student_user(username):
+    """在一个写事务内创建学生用户及对应的学生记录
+
+    用户名已被占用（例如其他进程刚刚创建）时不写入任何数据并返回 None。
+    bcrypt 哈希在占用写通道之前计算。
+    """
+    password_hash = hash_password(DEFAULT_PASSWORD)
+    now = datetime.now().isoformat()
+    conn = get_db()
+    cursor = conn.cursor()
+    try:
+        execute_with_retry(cursor, '''
+            INSERT INTO users (username, password, role, created_at) VALUES (?, ?, 'student', ?)
+            ON CONFLICT(username) DO NOTHING
+            RETURNING id, username, role
+        ''', (username, password_hash, now))
+        user = cursor.fetchone()
+        if user is None:
+            conn.rollback()
+            return None
+        user_data = {'id': user['id'], 'username': user['username'], 'role': user['role']}
+        
+        # 已有学号或姓名等于用户名的学生记录时直接关联，否则以用户名为学号和姓名新建
+        cursor.execute('SELECT student_id FROM students WHERE student_id = ? OR name = ? LIMIT 1',
+                       (username, username))
+        student = cursor.fetchone()
+        if student is None:
+            # 空操作的 DO UPDATE 让 RETURNING 在学号冲突时也返回已有的行
+            execute_with_retry(cursor, '''
+                INSERT INTO students (student_id, name, gender, age, contact, family_info, class_name, teacher, created_at)
+                VALUES (?, ?, '未知', NULL, '', '{}', '', '', ?)
+                ON CONFLICT(student_id) DO UPDATE SET student_id = excluded.student_id
+                RETURNING student_id
+            ''', (username, username, now))
+            student = cursor.fetchone()
+        user_data['student_id'] = student['student_id']
+        conn.commit()
+        bump_tables('users', 'students')
+        return user_data
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+@auth_bp.before_app_request
+def load_current_user():
+    """根据请求携带的会话令牌设置 g.current_user（未登录或令牌无效时为 None），不查询数据库"""
+    token = token_from_request(request)
+    g.current_user = resolve_session(token) if token else None
+
+
+def _busy_response():
+    response = jsonify({'success': False, 'message': '登录请求过多，请稍后重试'})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
+
+def _upgrade_password_hash(user, password):
+    """登录成功后把旧的 MD5 哈希换成 bcrypt；只在哈希未被其他请求修改时更新"""
+    new_hash = hash_password(password)
+    conn = get_db()
+    try:
+        execute_with_retry(conn.cursor(), 'UPDATE users SET password=? WHERE id=? AND password=?',
+                           (new_hash, user['id'], user['password']))
+        conn.commit()
+        bump_tables('users')
+        record_upgrade()
+    finally:
+        conn.close()
+
 
 @auth_bp.route('/api/login', methods=['POST'])
 def login():
@@ -18,88 +100,54 @@ def login():
     if not username or not password:
         return jsonify({'success': False, 'message': '用户名和密码不能为空'}), 400
     
-    password_hash = hashlib.md5(password.encode()).hexdigest()
-    
-    conn = get_db()
+    # 查询与密码校验都不占用写通道：bcrypt 校验耗时较长，期间不应阻塞其他写请求
+    conn = get_read_db()
     cursor = conn.cursor()
-    cursor.execute('SELECT * FROM users WHERE username = ? AND password = ?', 
-                   (username, password_hash))
-    user = cursor.fetchone()
+    cursor.execute('SELECT * FROM users WHERE username = ?', (username,))
+    existing_user = cursor.fetchone()
+    conn.close()
+    
+    try:
+        verified = existing_user is not None and verify_password(password, existing_user['password'])
+    except HashingBusy:
+        return _busy_response()
+    if verified and needs_upgrade(existing_user['password']):
+        try:
+            _upgrade_password_hash(existing_user, password)
+        except (HashingBusy, sqlite3.Error):
+            # 升级只是顺带完成的，密码已校验通过；繁忙或写库失败时留到下次登录
+            current_app.logger.exception('升级密码哈希失败')
+    user = existing_user if verified else None
     
     # 如果用户不存在，且密码是默认密码123456，则自动创建学生用户和学生记录
     if not user:
-        default_password_hash = hashlib.md5('123456'.encode()).hexdigest()
-        if password_hash == default_password_hash:
-            # 检查用户名是否已存在于users表中（但密码不同）
-            cursor.execute('SELECT * FROM users WHERE username = ?', (username,))
-            existing_user = cursor.fetchone()
-            if existing_user:
-                conn.close()
-                return jsonify({'success': False, 'message': '用户名已存在，密码不正确'})
-            
-            try:
-                # 创建新用户（角色为学生）
-                cursor.execute('INSERT INTO users (username, password, role, created_at) VALUES (?, ?, ?, ?)',
-                             (username, default_password_hash, 'student', datetime.now().isoformat()))
-                
-                # 检查学生记录是否已存在（通过用户名作为name或student_id）
-                cursor.execute('SELECT student_id FROM students WHERE student_id = ? OR name = ? LIMIT 1', 
-                             (username, username))
-                student = cursor.fetchone()
-                
-                # 如果学生记录不存在，创建新的学生记录
-                if not student:
-                    # 使用用户名作为student_id（如果用户名已作为student_id存在，则使用时间戳+用户名）
-                    student_id = username
-                    # 检查student_id是否唯一
-                    cursor.execute('SELECT student_id FROM students WHERE student_id = ?', (student_id,))
-                    if cursor.fetchone():
-                        # 如果student_id已存在，则生成一个新的唯一student_id
-                        student_id = f"{username}_{int(datetime.now().timestamp())}_{random.randint(1000, 9999)}"
-                    
-                    # 创建学生记录，用户名作为姓名
-                    cursor.execute('''
-                        INSERT INTO students (student_id, name, gender, age, contact, family_info, class_name, teacher, created_at)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    ''', (student_id, username, '未知', None, '', '{}', '', '', datetime.now().isoformat()))
-                
-                conn.commit()
-                
-                # 重新查询创建的用户
-                cursor.execute('SELECT * FROM users WHERE username = ?', (username,))
-                user = cursor.fetchone()
-                
-                # 获取student_id
-                cursor.execute('SELECT student_id FROM students WHERE student_id = ? OR name = ? LIMIT 1', 
-                             (username, username))
-                student = cursor.fetchone()
-                conn.close()
-                
-                if user:
-                    user_data = {
-                        'id': user['id'],
-                        'username': user['username'],
-                        'role': user['role']
-                    }
-                    if student:
-                        user_data['student_id'] = student['student_id']
-                    
-                    return jsonify({
-                        'success': True,
-                        'user': user_data,
-                        'message': '用户已自动创建'
-                    })
-            except Exception as e:
-                conn.rollback()
-                conn.close()
-                print(f"Error auto-creating user: {e}")
-                return jsonify({'success': False, 'message': f'自动创建用户失败: {str(e)}'})
-        else:
-            conn.close()
+        if password != DEFAULT_PASSWORD:
             return jsonify({'success': False, 'message': '用户名或密码错误'})
+        # 用户名已存在于users表中（但密码不同）
+        if existing_user:
+            return jsonify({'success': False, 'message': '用户名已存在，密码不正确'})
+        
+        try:
+            # 同一用户名的并发首次登录只创建一次，其余请求共享结果
+            user_data = _provisioning.do(username, lambda: _provision_student_user(username))
+        except HashingBusy:
+            return _busy_response()
+        except Exception as e:
+            current_app.logger.exception('自动创建用户失败')
+            return jsonify({'success': False, 'message': f'自动创建用户失败: {str(e)}'})
+        if user_data is None:
+            return jsonify({'success': False, 'message': '用户名已存在，密码不正确'})
+        return jsonify({
+            'success': True,
+            'user': user_data,
+            'token': create_session(user_data),
+            'message': '用户已自动创建'
+        })
     
     # 用户已存在，正常登录流程
     if user:
+        conn = get_read_db()
+        cursor = conn.cursor()
         user_data = {
             'id': user['id'],
             'username': user['username'],
@@ -120,9 +168,26 @@ def login():
         conn.close()
         return jsonify({
             'success': True,
-            'user': user_data
+            'user': user_data,
+            'token': create_session(user_data)
         })
     else:
-        conn.close()
         return jsonify({'success': False, 'message': '用户名或密码错误'})
 
+
+
+@auth_bp.route('/api/logout', methods=['POST'])
+def logout():
+    """退出登录，撤销当前令牌对应的会话"""
+    token = token_from_request(request)
+    if token:
+        revoke_session(token)
+    return jsonify({'success': True, 'message': '已退出登录'})
+
+
+@auth_bp.route('/api/me', methods=['GET'])
+def current_user():
+    """当前登录用户（来自会话缓存）"""
+    if g.current_user is None:
+        return jsonify({'success': False, 'message': '未登录或登录已过期'}), 401
+    return jsonify({'success': True, 'user': g.current_user})
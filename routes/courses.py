@@ -2,29 +2,70 @@
 from flask import Blueprint, request, jsonify
 from datetime import datetime
 import sqlite3
-from database import get_db, execute_with_retry
+from database import get_db, get_read_db, execute_with_retry
+from utils.cache import bump_tables
+from utils.response_cache import cached_response
+from utils.pagination import InvalidCursor, parse_pagination, paginate_query, page_response
+from utils.counting import parse_count_mode, count_rows
+from utils.options import parse_options_args, prefix_range, options_response
 
 courses_bp = Blueprint('courses', __name__)
 
 
 @courses_bp.route('/api/courses', methods=['GET'])
+@cached_response('courses')
 def get_courses():
     """获取所有课程"""
-    page = int(request.args.get('page', 1))
-    limit = int(request.args.get('limit', 10))
+    try:
+        page, limit, after = parse_pagination(request.args)
+    except InvalidCursor:
+        return jsonify({'success': False, 'message': '分页游标无效'}), 400
+    except ValueError:
+        return jsonify({'success': False, 'message': 'page 和 limit 必须为正整数'}), 400
+    try:
+        count_mode = parse_count_mode(request.args)
+    except ValueError:
+        return jsonify({'success': False, 'message': 'count 参数只能是 exact、estimate 或 none'}), 400
     
-    conn = get_db()
+    conn = get_read_db()
     cursor = conn.cursor()
     
     # Get total count
-    cursor.execute('SELECT COUNT(*) as total FROM courses')
-    total = cursor.fetchone()['total']
+    total = count_rows(cursor, 'courses', [], [], ('courses',), count_mode)
     
     # Paginate
-    cursor.execute('SELECT * FROM courses ORDER BY created_at DESC LIMIT ? OFFSET ?', (limit, (page - 1) * limit))
+    query, params = paginate_query('SELECT * FROM courses WHERE 1=1', [], 'created_at', 'id', page, limit, after)
+    cursor.execute(query, params)
     courses = [dict(row) for row in cursor.fetchall()]
     conn.close()
-    return jsonify({'total': total, 'data': courses, 'page': page, 'limit': limit})
+    return jsonify(page_response(total, courses, page, limit, after, 'created_at'))
+
+
+@courses_bp.route('/api/courses/options', methods=['GET'])
+def get_course_options():
+    """课程下拉选项（id + 课程名），q 按课程名或课程代码前缀过滤"""
+    try:
+        q, limit = parse_options_args(request.args)
+    except ValueError:
+        return jsonify({'success': False, 'message': 'limit 参数无效'}), 400
+    return options_response('courses', q, limit, ('courses',), _load_course_options)
+
+
+def _load_course_options(q, limit):
+    conn = get_read_db()
+    cursor = conn.cursor()
+    if q:
+        low, high = prefix_range(q)
+        cursor.execute('''
+            SELECT id, course_name FROM courses
+            WHERE (course_name >= ? AND course_name < ?) OR (course_code >= ? AND course_code < ?)
+            ORDER BY course_name, id LIMIT ?
+        ''', (low, high, low, high, limit + 1))
+    else:
+        cursor.execute('SELECT id, course_name FROM courses ORDER BY course_name, id LIMIT ?', (limit + 1,))
+    rows = [dict(row) for row in cursor.fetchall()]
+    conn.close()
+    return rows
 
 
 @courses_bp.route('/api/courses', methods=['POST'])
@@ -41,6 +82,7 @@ def add_course():
         ''', (data.get('course_code'), data['course_name'], data.get('teacher'),
               data.get('credits'), datetime.now().isoformat()))
         conn.commit()
+        bump_tables('courses')
         conn.close()
         return jsonify({'success': True, 'message': '课程添加成功'})
     except sqlite3.IntegrityError:
@@ -69,6 +111,7 @@ def update_course(course_id):
         ''', (data['course_name'], data.get('teacher'), data.get('credits'), course_id))
         
         conn.commit()
+        bump_tables('courses')
         conn.close()
         return jsonify({'success': True, 'message': '课程更新成功'})
     except Exception as e:
@@ -85,6 +128,7 @@ def delete_course(course_id):
     try:
         execute_with_retry(cursor, 'DELETE FROM courses WHERE id=?', (course_id,))
         conn.commit()
+        bump_tables('courses')
         
         if cursor.rowcount == 0:
             conn.close()
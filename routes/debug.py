@@ -0,0 +1,52 @@
+"""运行状态查看路由
+
+这些接口会暴露 SQL 文本、参数形状以及会话和密码哈希的统计，只在调试模式（app.debug）、
+配置了 DEBUG_ENDPOINTS，或当前登录用户为管理员时可用，否则返回 404。
+"""
+from flask import Blueprint, current_app, g, request, jsonify
+from config import DEBUG_ENDPOINTS
+from utils.counting import get_count_cache_stats
+from utils.options import get_options_cache_stats
+from utils.response_cache import get_response_cache_stats
+from utils.password_hashing import get_hashing_stats
+from utils.sessions import get_session_stats
+from utils.sql_profiling import get_slow_queries
+
+debug_bp = Blueprint('debug', __name__)
+
+
+@debug_bp.before_request
+def _require_debug_access():
+    if current_app.debug or DEBUG_ENDPOINTS:
+        return None
+    user = g.get('current_user')
+    if user is None or user.get('role') != 'admin':
+        return jsonify({'success': False, 'message': '接口不存在'}), 404
+    return None
+
+
+@debug_bp.route('/api/_debug/cache', methods=['GET'])
+def get_cache_stats():
+    """各缓存的命中/未命中/淘汰/失效计数"""
+    return jsonify({
+        'responses': get_response_cache_stats(),
+        'counts': get_count_cache_stats(),
+        'options': get_options_cache_stats(),
+        'sessions': get_session_stats(),
+    })
+
+
+@debug_bp.route('/api/_debug/hashing', methods=['GET'])
+def get_hashing_pool_stats():
+    """密码哈希进程池的提交/拒绝/超时/升级计数"""
+    return jsonify(get_hashing_stats())
+
+
+@debug_bp.route('/api/_debug/slow-queries', methods=['GET'])
+def get_slow_query_log():
+    """最近的慢查询（含参数形状和执行计划），可用 limit 限制条数"""
+    try:
+        limit = int(request.args['limit']) if 'limit' in request.args else None
+    except ValueError:
+        return jsonify({'success': False, 'message': 'limit 参数无效'}), 400
+    return jsonify(get_slow_queries(limit))
@@ -0,0 +1,85 @@
+"""Prometheus 指标路由"""
+from flask import Blueprint, Response
+from database import get_lock_wait_stats, get_pool_stats
+from utils.metrics import registry, header, sample, histogram_samples
+from utils.counting import get_count_cache_stats
+from utils.options import get_options_cache_stats
+from utils.response_cache import get_response_cache_stats
+from utils.sessions import get_session_stats
+from utils.password_hashing import get_hashing_stats
+
+metrics_bp = Blueprint('metrics', __name__)
+
+# 缓存名 -> 统计函数
+_CACHES = {
+    'responses': get_response_cache_stats,
+    'counts': get_count_cache_stats,
+    'options': get_options_cache_stats,
+    'sessions': get_session_stats,
+}
+
+
+def _cache_lines():
+    stats = {name: load() for name, load in _CACHES.items()}
+    lines = header('cache_requests_total', 'counter', '进程内缓存的命中/未命中次数')
+    for name, cache in stats.items():
+        lines.append(sample('cache_requests_total', (('cache', name), ('result', 'hit')), cache['hits']))
+        lines.append(sample('cache_requests_total', (('cache', name), ('result', 'miss')), cache['misses']))
+    lines += header('cache_evictions_total', 'counter', '因容量上限被淘汰的缓存条目数')
+    lines += [sample('cache_evictions_total', (('cache', name),), cache['evictions']) for name, cache in stats.items()]
+    lines += header('cache_entries', 'gauge', '当前缓存条目数')
+    lines += [sample('cache_entries', (('cache', name),), cache['size']) for name, cache in stats.items()]
+    return lines
+
+
+def _lock_lines():
+    stats = get_lock_wait_stats()
+    lines = []
+    for key, help_text in (('retries', '写语句因锁冲突重试的次数'),
+                           ('contended', '发生过锁冲突的写语句数'),
+                           ('deadline_exceeded', '超过请求截止时间仍未获得锁的写语句数')):
+        name = f'db_lock_{key}_total'
+        lines += header(name, 'counter', help_text)
+        lines.append(sample(name, (), stats[key]))
+    # LockWaitStats 的直方图按毫秒分桶，这里换算为秒
+    histogram = stats['histogram']
+    bounds = [key[3:-2] for key in histogram if key != 'le_inf']
+    counts = [histogram[f'le_{bound}ms'] for bound in bounds] + [histogram['le_inf']]
+    lines += header('db_execute_duration_seconds', 'histogram', 'execute_with_retry 中语句的耗时（含锁等待）')
+    lines += histogram_samples('db_execute_duration_seconds', (), [int(bound) / 1000 for bound in bounds],
+                               counts, stats['total_time'])
+    return lines
+
+
+def _pool_lines():
+    stats = get_pool_stats()
+    lines = []
+    for key, kind, help_text in (('checkouts', 'counter', '连接借出次数'),
+                                 ('waits', 'counter', '借出连接时需要等待的次数'),
+                                 ('timeouts', 'counter', '等待连接超时的次数'),
+                                 ('in_use', 'gauge', '当前借出中的连接数')):
+        name = f'db_pool_{key}_total' if kind == 'counter' else f'db_pool_{key}'
+        lines += header(name, kind, help_text)
+        lines += [sample(name, (('pool', pool),), pool_stats[key]) for pool, pool_stats in stats.items()]
+    return lines
+
+
+def _hashing_lines():
+    stats = get_hashing_stats()
+    lines = []
+    for key, help_text in (('submitted', '提交到密码哈希进程池的任务数'),
+                           ('rejected', '因排队已满被拒绝的哈希任务数'),
+                           ('timeouts', '等待结果超时的哈希任务数')):
+        name = f'auth_hash_{key}_total'
+        lines += header(name, 'counter', help_text)
+        lines.append(sample(name, (), stats[key]))
+    lines += header('auth_hash_in_flight', 'gauge', '排队和执行中的哈希任务数（含调用方已超时放弃等待的任务）')
+    lines.append(sample('auth_hash_in_flight', (), stats['in_flight']))
+    return lines
+
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus 文本格式的指标"""
+    lines = registry.render() + _cache_lines() + _lock_lines() + _pool_lines() + _hashing_lines()
+    return Response('\n'.join(lines) + '\n', content_type='text/plain; version=0.0.4; charset=utf-8')
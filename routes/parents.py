@@ -1,19 +1,32 @@
 """家长管理路由"""
 from flask import Blueprint, request, jsonify
 from datetime import datetime
-from database import get_db, execute_with_retry
+from database import get_db, get_read_db, execute_with_retry
+from utils.cache import bump_tables
+from utils.response_cache import cached_response
+from utils.pagination import InvalidCursor, parse_pagination, paginate_query, page_response
+from utils.counting import parse_count_mode, count_rows
 
 parents_bp = Blueprint('parents', __name__)
 
 
 @parents_bp.route('/api/parents', methods=['GET'])
+@cached_response('parents', 'students')
 def get_parents():
     """获取家长信息"""
     student_id = request.args.get('student_id')
-    page = int(request.args.get('page', 1))
-    limit = int(request.args.get('limit', 10))
+    try:
+        page, limit, after = parse_pagination(request.args)
+    except InvalidCursor:
+        return jsonify({'success': False, 'message': '分页游标无效'}), 400
+    except ValueError:
+        return jsonify({'success': False, 'message': 'page 和 limit 必须为正整数'}), 400
+    try:
+        count_mode = parse_count_mode(request.args)
+    except ValueError:
+        return jsonify({'success': False, 'message': 'count 参数只能是 exact、estimate 或 none'}), 400
     
-    conn = get_db()
+    conn = get_read_db()
     cursor = conn.cursor()
     
     query = '''
@@ -22,25 +35,27 @@ def get_parents():
         JOIN students s ON p.student_id = s.student_id
         WHERE 1=1
     '''
+    conditions = []
     params = []
     
     if student_id:
-        query += ' AND p.student_id = ?'
+        conditions.append('p.student_id = ?')
         params.append(student_id)
     
-    # Get total count
-    count_query = f'SELECT COUNT(*) as total FROM ({query})'
-    cursor.execute(count_query, params)
-    total = cursor.fetchone()['total']
+    for condition in conditions:
+        query += ' AND ' + condition
     
-    # Paginate
-    query += ' ORDER BY p.created_at DESC LIMIT ? OFFSET ?'
-    params.extend([limit, (page - 1) * limit])
+    # 总数只统计家长表本身；列表内连接 students，这里用 EXISTS 保持一致
+    total = count_rows(cursor, 'parents p',
+                       ['EXISTS (SELECT 1 FROM students s WHERE s.student_id = p.student_id)'] + conditions,
+                       params, ('parents', 'students'), count_mode)
     
+    # Paginate
+    query, params = paginate_query(query, params, 'p.created_at', 'p.id', page, limit, after)
     cursor.execute(query, params)
     results = [dict(row) for row in cursor.fetchall()]
     conn.close()
-    return jsonify({'total': total, 'data': results, 'page': page, 'limit': limit})
+    return jsonify(page_response(total, results, page, limit, after, 'created_at'))
 
 
 @parents_bp.route('/api/parents', methods=['POST'])
@@ -63,6 +78,7 @@ def add_parent():
               datetime.now().isoformat()))
         
         conn.commit()
+        bump_tables('parents')
         conn.close()
         return jsonify({'success': True, 'message': '家长信息添加成功'})
     except Exception as e:
@@ -89,6 +105,7 @@ def update_parent(id):
               data.get('email'), data.get('address'), id))
         
         conn.commit()
+        bump_tables('parents')
         conn.close()
         return jsonify({'success': True, 'message': '家长信息更新成功'})
     except Exception as e:
@@ -105,6 +122,7 @@ def delete_parent(id):
     try:
         execute_with_retry(cursor, 'DELETE FROM parents WHERE id=?', (id,))
         conn.commit()
+        bump_tables('parents')
         
         if cursor.rowcount == 0:
             conn.close()
@@ -1,20 +1,33 @@
 """奖励处分管理路由"""
 from flask import Blueprint, request, jsonify
 from datetime import datetime
-from database import get_db, execute_with_retry
+from database import get_db, get_read_db, execute_with_retry
+from utils.cache import bump_tables
+from utils.response_cache import cached_response
+from utils.pagination import InvalidCursor, parse_pagination, paginate_query, page_response
+from utils.counting import parse_count_mode, count_rows
 
 rewards_bp = Blueprint('rewards', __name__)
 
 
 @rewards_bp.route('/api/rewards-punishments', methods=['GET'])
+@cached_response('rewards_punishments', 'students')
 def get_rewards_punishments():
     """获取奖励处分记录"""
     student_id = request.args.get('student_id')
     rp_type = request.args.get('type')
-    page = int(request.args.get('page', 1))
-    limit = int(request.args.get('limit', 10))
+    try:
+        page, limit, after = parse_pagination(request.args)
+    except InvalidCursor:
+        return jsonify({'success': False, 'message': '分页游标无效'}), 400
+    except ValueError:
+        return jsonify({'success': False, 'message': 'page 和 limit 必须为正整数'}), 400
+    try:
+        count_mode = parse_count_mode(request.args)
+    except ValueError:
+        return jsonify({'success': False, 'message': 'count 参数只能是 exact、estimate 或 none'}), 400
     
-    conn = get_db()
+    conn = get_read_db()
     cursor = conn.cursor()
     
     query = '''
@@ -23,28 +36,30 @@ def get_rewards_punishments():
         JOIN students s ON rp.student_id = s.student_id
         WHERE 1=1
     '''
+    conditions = []
     params = []
     
     if student_id:
-        query += ' AND rp.student_id = ?'
+        conditions.append('rp.student_id = ?')
         params.append(student_id)
     if rp_type:
-        query += ' AND rp.type = ?'
+        conditions.append('rp.type = ?')
         params.append(rp_type)
     
-    # Get total count
-    count_query = f'SELECT COUNT(*) as total FROM ({query})'
-    cursor.execute(count_query, params)
-    total = cursor.fetchone()['total']
+    for condition in conditions:
+        query += ' AND ' + condition
     
-    # Paginate
-    query += ' ORDER BY rp.date DESC LIMIT ? OFFSET ?'
-    params.extend([limit, (page - 1) * limit])
+    # 总数只统计奖惩表本身；列表内连接 students，这里用 EXISTS 保持一致
+    total = count_rows(cursor, 'rewards_punishments rp',
+                       ['EXISTS (SELECT 1 FROM students s WHERE s.student_id = rp.student_id)'] + conditions,
+                       params, ('rewards_punishments', 'students'), count_mode)
     
+    # Paginate
+    query, params = paginate_query(query, params, 'rp.date', 'rp.id', page, limit, after)
     cursor.execute(query, params)
     results = [dict(row) for row in cursor.fetchall()]
     conn.close()
-    return jsonify({'total': total, 'data': results, 'page': page, 'limit': limit})
+    return jsonify(page_response(total, results, page, limit, after, 'date'))
 
 
 @rewards_bp.route('/api/rewards-punishments', methods=['POST'])
@@ -66,6 +81,7 @@ def add_reward_punishment():
               data.get('description'), data['date'], datetime.now().isoformat()))
         
         conn.commit()
+        bump_tables('rewards_punishments')
         conn.close()
         return jsonify({'success': True, 'message': '记录添加成功'})
     except Exception as e:
@@ -82,6 +98,7 @@ def delete_reward_punishment(id):
     try:
         execute_with_retry(cursor, 'DELETE FROM rewards_punishments WHERE id=?', (id,))
         conn.commit()
+        bump_tables('rewards_punishments')
         
         if cursor.rowcount == 0:
             conn.close()
@@ -0,0 +1,84 @@
+"""全文检索路由"""
+from flask import Blueprint, request, jsonify
+from config import SEARCH_MAX_LIMIT
+from database import get_read_db
+from utils.response_cache import cached_response
+from utils.counting import parse_count_mode, count_rows
+from services.student_service import student_dict
+
+search_bp = Blueprint('search', __name__)
+
+# 类型 -> (FTS5 表, 源表, 查询, 行转换)
+# 在 FTS 查询内按 bm25 相关度（rank）排序并截取前 N 条，再与源表关联：
+# FTS5 对 ORDER BY rank LIMIT 只保留前 N 条，不会把全部命中行与源表关联
+SEARCH_TYPES = {
+    'students': ('students_fts', 'students', '''
+        SELECT s.*, m.rank
+        FROM (SELECT rowid, rank FROM students_fts WHERE students_fts MATCH ? ORDER BY rank LIMIT ?) m
+        JOIN students s ON s.id = m.rowid
+        ORDER BY m.rank
+    ''', student_dict),
+    'courses': ('courses_fts', 'courses', '''
+        SELECT c.*, m.rank
+        FROM (SELECT rowid, rank FROM courses_fts WHERE courses_fts MATCH ? ORDER BY rank LIMIT ?) m
+        JOIN courses c ON c.id = m.rowid
+        ORDER BY m.rank
+    ''', dict),
+    'parents': ('parents_fts', 'parents', '''
+        SELECT p.*, s.name AS student_name, m.rank
+        FROM (SELECT rowid, rank FROM parents_fts WHERE parents_fts MATCH ? ORDER BY rank LIMIT ?) m
+        JOIN parents p ON p.id = m.rowid
+        LEFT JOIN students s ON s.student_id = p.student_id
+        ORDER BY m.rank
+    ''', dict),
+}
+
+
+def build_match_query(q):
+    """把用户输入转换为 FTS5 查询：每个词加引号转义后做前缀匹配，多个词之间为 AND"""
+    terms = [term.replace('"', '""') for term in q.split()]
+    return ' '.join(f'"{term}"*' for term in terms if term)
+
+
+@search_bp.route('/api/search', methods=['GET'])
+@cached_response('students', 'courses', 'parents')
+def search():
+    """全文检索学生、课程、家长
+
+    q 为关键词（按词前缀匹配）；type 为逗号分隔的 students / courses / parents（默认全部）；
+    结果按相关度排序，每条带 type 字段，支持 page / limit 分页。
+    """
+    match = build_match_query(request.args.get('q', ''))
+    if not match:
+        return jsonify({'success': False, 'message': '请输入搜索关键词'}), 400
+    types = [t for t in request.args.get('type', ','.join(SEARCH_TYPES)).split(',') if t]
+    if not types or any(t not in SEARCH_TYPES for t in types):
+        return jsonify({'success': False, 'message': 'type 参数只能是 ' + '、'.join(SEARCH_TYPES)}), 400
+    try:
+        page = max(int(request.args.get('page', 1)), 1)
+        limit = min(max(int(request.args.get('limit', 10)), 1), SEARCH_MAX_LIMIT)
+        count_mode = parse_count_mode(request.args)
+    except ValueError:
+        return jsonify({'success': False, 'message': '分页或 count 参数无效'}), 400
+    
+    conn = get_read_db()
+    cursor = conn.cursor()
+    
+    # 每种类型只需取相关度最高的前 page * limit 条，合并后按相关度排序再截取当前页
+    results = []
+    total = 0
+    for search_type in types:
+        fts, table, query, transform = SEARCH_TYPES[search_type]
+        cursor.execute(query, (match, page * limit))
+        for row in cursor.fetchall():
+            item = transform(row)
+            item['type'] = search_type
+            results.append(item)
+        if total is not None:
+            count = count_rows(cursor, fts, [f'{fts} MATCH ?'], [match], (table,), count_mode)
+            total = None if count is None else total + count
+    conn.close()
+    
+    results.sort(key=lambda item: item['rank'])
+    data = results[(page - 1) * limit:page * limit]
+    return jsonify({'total': total, 'data': data, 'page': page, 'limit': limit})
@@ -1,61 +1,112 @@
 """学生选课和成绩管理路由"""
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, current_app, request, jsonify
 from datetime import datetime
+import math
 import sqlite3
-from database import get_db, execute_with_retry
+from database import get_db, get_read_db, execute_with_retry, fetch_in_chunks
+from config import GRADE_BATCH_MAX
+from utils.cache import bump_tables
+from utils.response_cache import cached_response
+from utils.pagination import InvalidCursor, parse_pagination, paginate_query, page_response
+from utils.counting import parse_count_mode, count_rows
+from utils.export import parse_export_format, export_response
 
 student_courses_bp = Blueprint('student_courses', __name__)
 
+SCORE_MIN, SCORE_MAX = 0, 100
+SCORE_MESSAGE = f'成绩必须是 {SCORE_MIN} 到 {SCORE_MAX} 之间的数字'
+
+LIST_QUERY = '''
+    SELECT sc.*, c.course_code, c.course_name, c.teacher, c.credits,
+           s.name as student_name
+    FROM student_courses sc
+    LEFT JOIN courses c ON sc.course_id = c.id
+    LEFT JOIN students s ON sc.student_id = s.student_id
+    WHERE 1=1
+'''
+
+
+def _list_filters(args):
+    """列表与导出共用的过滤条件，返回 (conditions, params)"""
+    conditions = []
+    params = []
+    if args.get('student_id'):
+        conditions.append('sc.student_id = ?')
+        params.append(args['student_id'])
+    if args.get('course_id'):
+        conditions.append('sc.course_id = ?')
+        params.append(args['course_id'])
+    return conditions, params
+
+
+def compute_final_score(exam_score, daily_score):
+    """总成绩 = 考试成绩 * 70% + 平时成绩 * 30%"""
+    return exam_score * 0.7 + daily_score * 0.3
+
+
+def parse_score(value):
+    """解析成绩；未提供时返回 None，非数字、nan/inf 或超出范围时抛出 ValueError"""
+    if value in (None, ''):
+        return None
+    try:
+        score = float(value)
+    except TypeError:
+        raise ValueError(value)
+    if not math.isfinite(score) or not SCORE_MIN <= score <= SCORE_MAX:
+        raise ValueError(value)
+    return score
+
 
 @student_courses_bp.route('/api/student-courses', methods=['GET'])
+@cached_response('student_courses', 'courses', 'students')
 def get_student_courses():
     """获取学生选课信息"""
-    student_id = request.args.get('student_id')
-    course_id = request.args.get('course_id')
-    page = int(request.args.get('page', 1))
-    limit = int(request.args.get('limit', 10))
+    try:
+        page, limit, after = parse_pagination(request.args)
+    except InvalidCursor:
+        return jsonify({'success': False, 'message': '分页游标无效'}), 400
+    except ValueError:
+        return jsonify({'success': False, 'message': 'page 和 limit 必须为正整数'}), 400
+    try:
+        count_mode = parse_count_mode(request.args)
+    except ValueError:
+        return jsonify({'success': False, 'message': 'count 参数只能是 exact、estimate 或 none'}), 400
     
-    conn = get_db()
+    conn = get_read_db()
     cursor = conn.cursor()
     
-    query = '''
-        SELECT sc.*, c.course_code, c.course_name, c.teacher, c.credits,
-               s.name as student_name
-        FROM student_courses sc
-        LEFT JOIN courses c ON sc.course_id = c.id
-        LEFT JOIN students s ON sc.student_id = s.student_id
-        WHERE 1=1
-    '''
-    params = []
-    
-    if student_id:
-        query += ' AND sc.student_id = ?'
-        params.append(student_id)
-    if course_id:
-        query += ' AND sc.course_id = ?'
-        params.append(course_id)
+    conditions, params = _list_filters(request.args)
+    query = LIST_QUERY + ''.join(' AND ' + condition for condition in conditions)
     
-    # Get total count
-    count_query = f'SELECT COUNT(*) as total FROM ({query})'
-    cursor.execute(count_query, params)
-    total = cursor.fetchone()['total']
+    # 总数只统计选课表本身（两个 LEFT JOIN 不改变行数）
+    total = count_rows(cursor, 'student_courses sc', conditions, params,
+                       ('student_courses',), count_mode)
     
     # Paginate
-    query += ' ORDER BY sc.created_at DESC LIMIT ? OFFSET ?'
-    params.extend([limit, (page - 1) * limit])
-    
+    query, params = paginate_query(query, params, 'sc.created_at', 'sc.id', page, limit, after)
     cursor.execute(query, params)
     results = [dict(row) for row in cursor.fetchall()]
-    print(f"Found {len(results)} student course records")  # Debug log
     conn.close()
-    return jsonify({'total': total, 'data': results, 'page': page, 'limit': limit})
+    return jsonify(page_response(total, results, page, limit, after, 'created_at'))
+
+
+@student_courses_bp.route('/api/student-courses/export', methods=['GET'])
+def export_student_courses():
+    """流式导出选课与成绩（含课程名、学生姓名），过滤参数同列表接口，format=csv|ndjson"""
+    try:
+        fmt = parse_export_format(request.args)
+    except ValueError:
+        return jsonify({'success': False, 'message': 'format 参数只能是 csv 或 ndjson'}), 400
+    conditions, params = _list_filters(request.args)
+    query = LIST_QUERY + ''.join(' AND ' + condition for condition in conditions)
+    query += ' ORDER BY sc.created_at DESC, sc.id DESC'
+    return export_response(get_read_db(), query, params, fmt, 'student_courses')
 
 
 @student_courses_bp.route('/api/student-courses', methods=['POST'])
 def add_student_course():
     """学生选课"""
     data = request.json
-    print(f"Received student course data: {data}")
     
     if not data or not data.get('student_id') or not data.get('course_id'):
         return jsonify({'success': False, 'message': '学生ID和课程ID不能为空'}), 400
@@ -69,6 +120,11 @@ def add_student_course():
     
     if not student_id:
         return jsonify({'success': False, 'message': '学生ID不能为空'}), 400
+    try:
+        exam_score = parse_score(data.get('exam_score')) or 0
+        daily_score = parse_score(data.get('daily_score')) or 0
+    except ValueError:
+        return jsonify({'success': False, 'message': SCORE_MESSAGE}), 400
     
     conn = get_db()
     cursor = conn.cursor()
@@ -93,9 +149,7 @@ def add_student_course():
     
     try:
         # 计算总成绩
-        exam_score = float(data.get('exam_score', 0)) if data.get('exam_score') else 0
-        daily_score = float(data.get('daily_score', 0)) if data.get('daily_score') else 0
-        final_score = exam_score * 0.7 + daily_score * 0.3
+        final_score = compute_final_score(exam_score, daily_score)
         
         execute_with_retry(cursor, '''
             INSERT INTO student_courses (student_id, course_id, exam_score, 
@@ -105,6 +159,7 @@ def add_student_course():
               final_score, data.get('semester'), datetime.now().isoformat()))
         
         conn.commit()
+        bump_tables('student_courses')
         conn.close()
         return jsonify({'success': True, 'message': '选课添加成功'})
     except sqlite3.IntegrityError as e:
@@ -115,14 +170,131 @@ def add_student_course():
         return jsonify({'success': False, 'message': f'添加失败: {str(e)}'}), 500
 
 
+def _parse_grade(item):
+    """解析批量成绩中的一条记录，返回 (记录, 错误信息)"""
+    if not isinstance(item, dict):
+        return None, '每条记录必须是 JSON 对象'
+    student_id = str(item.get('student_id') or '').strip()
+    if not student_id or item.get('course_id') in (None, ''):
+        return None, '学生ID和课程ID不能为空'
+    try:
+        course_id = int(item['course_id'])
+    except (ValueError, TypeError):
+        return None, '课程ID格式错误'
+    # 未提供的成绩为 None：更新时保留原值，新增时按 0 计
+    try:
+        exam_score = parse_score(item.get('exam_score'))
+        daily_score = parse_score(item.get('daily_score'))
+    except ValueError:
+        return None, SCORE_MESSAGE
+    return {'student_id': student_id, 'course_id': course_id, 'exam_score': exam_score,
+            'daily_score': daily_score, 'semester': item.get('semester')}, None
+
+
+@student_courses_bp.route('/api/student-courses/grades', methods=['POST'])
+def upsert_grades():
+    """批量录入成绩
+
+    请求体为 {"grades": [{student_id, course_id, exam_score, daily_score, semester}, ...]}。
+    学生、课程和已有选课记录各用一次集合查询校验；已选课的只更新提供的成绩并重算总成绩，
+    未选课的新增选课记录（未提供的成绩按 0 计）。
+    所有记录在一个事务内写入，任何一条校验失败则全部不写入并返回逐条错误。
+    """
+    data = request.get_json(silent=True)
+    items = data.get('grades') if isinstance(data, dict) else None
+    if not isinstance(items, list) or not items:
+        return jsonify({'success': False, 'message': 'grades 必须是非空数组'}), 400
+    if len(items) > GRADE_BATCH_MAX:
+        return jsonify({'success': False, 'message': f'单次最多录入 {GRADE_BATCH_MAX} 条成绩'}), 400
+    
+    errors = []
+    grades = []
+    seen = set()
+    for index, item in enumerate(items):
+        grade, error = _parse_grade(item)
+        if grade and (grade['student_id'], grade['course_id']) in seen:
+            error = '同一学生和课程重复出现'
+        if error:
+            errors.append({'index': index, 'message': error})
+            continue
+        seen.add((grade['student_id'], grade['course_id']))
+        grades.append((index, grade))
+    
+    conn = get_db()
+    cursor = conn.cursor()
+    
+    try:
+        student_ids = {grade['student_id'] for _, grade in grades}
+        course_ids = {grade['course_id'] for _, grade in grades}
+        known_students = {row['student_id'] for row in fetch_in_chunks(
+            cursor, 'SELECT student_id FROM students WHERE student_id IN ({placeholders})', student_ids)}
+        known_courses = {row['id'] for row in fetch_in_chunks(
+            cursor, 'SELECT id FROM courses WHERE id IN ({placeholders})', course_ids)}
+        enrolled = {(row['student_id'], row['course_id']): (row['exam_score'], row['daily_score'])
+                    for row in fetch_in_chunks(
+                        cursor, 'SELECT student_id, course_id, exam_score, daily_score FROM student_courses '
+                                'WHERE student_id IN ({placeholders})', student_ids)}
+        
+        updates = []
+        inserts = []
+        created_at = datetime.now().isoformat()
+        for index, grade in grades:
+            if grade['student_id'] not in known_students:
+                errors.append({'index': index, 'message': '学生不存在'})
+                continue
+            if grade['course_id'] not in known_courses:
+                errors.append({'index': index, 'message': '课程不存在'})
+                continue
+            current = enrolled.get((grade['student_id'], grade['course_id']))
+            old_exam, old_daily = current if current else (0, 0)
+            exam_score = (old_exam or 0) if grade['exam_score'] is None else grade['exam_score']
+            daily_score = (old_daily or 0) if grade['daily_score'] is None else grade['daily_score']
+            final_score = compute_final_score(exam_score, daily_score)
+            if current:
+                updates.append((exam_score, daily_score, final_score, grade['semester'],
+                                grade['student_id'], grade['course_id']))
+            else:
+                inserts.append((grade['student_id'], grade['course_id'], exam_score, daily_score,
+                                final_score, grade['semester'], created_at))
+        
+        if errors:
+            conn.close()
+            errors.sort(key=lambda error: error['index'])
+            return jsonify({'success': False, 'message': '成绩数据有误，未写入任何记录', 'errors': errors}), 400
+        
+        if updates:
+            execute_with_retry(cursor, '''
+                UPDATE student_courses SET exam_score=?, daily_score=?, final_score=?, semester=COALESCE(?, semester)
+                WHERE student_id=? AND course_id=?
+            ''', updates, many=True)
+        if inserts:
+            execute_with_retry(cursor, '''
+                INSERT INTO student_courses (student_id, course_id, exam_score,
+                                            daily_score, final_score, semester, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', inserts, many=True)
+        conn.commit()
+        bump_tables('student_courses')
+        conn.close()
+        return jsonify({'success': True, 'message': '成绩录入成功', 'updated': len(updates), 'inserted': len(inserts)})
+    except Exception as e:
+        conn.rollback()
+        conn.close()
+        return jsonify({'success': False, 'message': f'录入失败: {str(e)}'}), 500
+
+
 @student_courses_bp.route('/api/student-courses/<int:id>', methods=['PUT'])
 def update_student_course(id):
     """更新学生选课记录（包括课程、成绩和学期）"""
     data = request.json
-    print(f"Received data for update: {data}")  # Debug print
     
     if not data:
         return jsonify({'success': False, 'message': '请求数据不能为空'}), 400
+    try:
+        exam_score = parse_score(data.get('exam_score')) or 0
+        daily_score = parse_score(data.get('daily_score')) or 0
+    except ValueError:
+        return jsonify({'success': False, 'message': SCORE_MESSAGE}), 400
     
     conn = get_db()
     cursor = conn.cursor()
@@ -136,9 +308,7 @@ def update_student_course(id):
             return jsonify({'success': False, 'message': '选课记录不存在'}), 404
         
         # 获取更新数据
-        exam_score = data.get('exam_score', 0) or 0
-        daily_score = data.get('daily_score', 0) or 0
-        final_score = exam_score * 0.7 + daily_score * 0.3
+        final_score = compute_final_score(exam_score, daily_score)
         semester = data.get('semester')
         
         # 如果提供了course_id，验证课程是否存在并检查重复
@@ -205,6 +375,7 @@ def update_student_course(id):
         execute_with_retry(cursor, update_query, tuple(update_values))
         
         conn.commit()
+        bump_tables('student_courses')
         
         if cursor.rowcount == 0:
             conn.close()
@@ -214,7 +385,7 @@ def update_student_course(id):
         return jsonify({'success': True, 'message': '更新成功'})
     except Exception as e:
         conn.close()
-        print(f"Update error: {e}")  # Debug print
+        current_app.logger.exception('更新选课记录失败')
         return jsonify({'success': False, 'message': f'更新失败: {str(e)}'}), 500
 
 
@@ -227,6 +398,7 @@ def delete_student_course(id):
     try:
         execute_with_retry(cursor, 'DELETE FROM student_courses WHERE id=?', (id,))
         conn.commit()
+        bump_tables('student_courses')
         
         if cursor.rowcount == 0:
             conn.close()
@@ -2,59 +2,84 @@
 from flask import Blueprint, request, jsonify
 from datetime import datetime
 import sqlite3
-import json
-from database import get_db, execute_with_retry
+from database import get_db, get_read_db, execute_with_retry
+from utils.cache import bump_tables
+from utils.response_cache import cached_response
+from utils.pagination import InvalidCursor, parse_pagination, paginate_query, page_response
+from utils.counting import parse_count_mode, count_rows
+from utils.options import parse_options_args, prefix_range, options_response
+from utils.importing import detect_format, iter_records
+from utils.export import parse_export_format, export_response
+from services.student_service import StudentService, STUDENT_INSERT_SQL, student_row, student_dict, family_info_json
 
 students_bp = Blueprint('students', __name__)
 
 
 @students_bp.route('/api/students', methods=['GET'])
+@cached_response('students')
 def get_students():
     """获取所有学生"""
-    page = int(request.args.get('page', 1))
-    limit = int(request.args.get('limit', 10))
+    try:
+        page, limit, after = parse_pagination(request.args)
+    except InvalidCursor:
+        return jsonify({'success': False, 'message': '分页游标无效'}), 400
+    except ValueError:
+        return jsonify({'success': False, 'message': 'page 和 limit 必须为正整数'}), 400
+    try:
+        count_mode = parse_count_mode(request.args)
+    except ValueError:
+        return jsonify({'success': False, 'message': 'count 参数只能是 exact、estimate 或 none'}), 400
     
-    conn = get_db()
+    conn = get_read_db()
     cursor = conn.cursor()
     
     # Get total count
-    cursor.execute('SELECT COUNT(*) as total FROM students')
-    total = cursor.fetchone()['total']
+    total = count_rows(cursor, 'students', [], [], ('students',), count_mode)
     
     # Paginate
-    cursor.execute('SELECT * FROM students ORDER BY created_at DESC LIMIT ? OFFSET ?', (limit, (page - 1) * limit))
-    students = []
-    for row in cursor.fetchall():
-        student = dict(row)
-        # 映射字段名以匹配前端
-        student['phone'] = student.get('contact', '')
-        student['teacher_name'] = student.get('teacher', '')
-        
-        # 从 family_info 中解析 email 和 address
-        family_info = student.get('family_info', '')
-        if family_info:
-            try:
-                # 尝试解析 JSON 格式的 family_info
-                family_data = json.loads(family_info)
-                student['email'] = family_data.get('email', '')
-                student['address'] = family_data.get('address', '')
-            except (json.JSONDecodeError, TypeError):
-                # 如果不是 JSON 格式，尝试旧格式（用 | 分隔）
-                if '|' in family_info:
-                    parts = family_info.split('|', 1)
-                    student['email'] = parts[0] if len(parts) > 0 else ''
-                    student['address'] = parts[1] if len(parts) > 1 else ''
-                else:
-                    # 旧数据可能是纯文本，作为 email 或 address
-                    student['email'] = family_info if '@' in family_info else ''
-                    student['address'] = family_info if '@' not in family_info else ''
-        else:
-            student['email'] = ''
-            student['address'] = ''
-        
-        students.append(student)
+    query, params = paginate_query('SELECT * FROM students WHERE 1=1', [], 'created_at', 'id', page, limit, after)
+    cursor.execute(query, params)
+    students = [student_dict(row) for row in cursor.fetchall()]
+    conn.close()
+    return jsonify(page_response(total, students, page, limit, after, 'created_at'))
+
+
+@students_bp.route('/api/students/export', methods=['GET'])
+def export_students():
+    """流式导出学生信息，format=csv|ndjson"""
+    try:
+        fmt = parse_export_format(request.args)
+    except ValueError:
+        return jsonify({'success': False, 'message': 'format 参数只能是 csv 或 ndjson'}), 400
+    return export_response(get_read_db(), 'SELECT * FROM students ORDER BY created_at DESC, id DESC', (),
+                           fmt, 'students', transform=student_dict)
+
+
+@students_bp.route('/api/students/options', methods=['GET'])
+def get_student_options():
+    """学生下拉选项（学号 + 姓名），q 按学号或姓名前缀过滤"""
+    try:
+        q, limit = parse_options_args(request.args)
+    except ValueError:
+        return jsonify({'success': False, 'message': 'limit 参数无效'}), 400
+    return options_response('students', q, limit, ('students',), _load_student_options)
+
+
+def _load_student_options(q, limit):
+    conn = get_read_db()
+    cursor = conn.cursor()
+    if q:
+        low, high = prefix_range(q)
+        cursor.execute('''
+            SELECT student_id, name FROM students
+            WHERE (student_id >= ? AND student_id < ?) OR (name >= ? AND name < ?)
+            ORDER BY name, student_id LIMIT ?
+        ''', (low, high, low, high, limit + 1))
+    else:
+        cursor.execute('SELECT student_id, name FROM students ORDER BY name, student_id LIMIT ?', (limit + 1,))
+    rows = [dict(row) for row in cursor.fetchall()]
     conn.close()
-    return jsonify({'total': total, 'data': students, 'page': page, 'limit': limit})
+    return rows
 
 
 @students_bp.route('/api/students', methods=['POST'])
@@ -66,19 +91,9 @@ def add_student():
     
     try:
         # 映射前端字段到数据库字段
-        contact = data.get('phone') or data.get('contact', '')
-        teacher = data.get('teacher_name') or data.get('teacher', '')
-        
-        # 将 email 和 address 以 JSON 格式存储在 family_info 中
-        email = data.get('email', '')
-        address = data.get('address', '')
-        family_info_json = json.dumps({'email': email, 'address': address}, ensure_ascii=False)
-        
-        execute_with_retry(cursor, '''
-            INSERT INTO students (student_id, name, gender, age, contact, family_info, class_name, teacher, created_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (data['student_id'], data['name'], data['gender'], data.get('age'), contact, family_info_json, data.get('class_name'), teacher, datetime.now().isoformat()))
+        execute_with_retry(cursor, STUDENT_INSERT_SQL, student_row(data, datetime.now().isoformat()))
         conn.commit()
+        bump_tables('students')
         conn.close()
         return jsonify({'success': True, 'message': '学生添加成功'})
     except sqlite3.IntegrityError as e:
@@ -94,6 +109,25 @@ def add_student():
         return jsonify({'success': False, 'message': f'意外错误: {str(e)}'}), 500
 
 
+@students_bp.route('/api/students/import', methods=['POST'])
+def import_students():
+    """批量导入学生
+
+    请求体为 CSV（带表头）或 JSON Lines，字段同添加学生接口；
+    通过 ?format=csv|jsonl 或 Content-Type（text/csv、application/x-ndjson）指定格式。
+    """
+    fmt = detect_format(request.args, request.content_type)
+    if fmt is None:
+        return jsonify({'success': False, 'message': '请指定导入格式：csv 或 jsonl'}), 400
+    try:
+        result = StudentService().import_students(iter_records(request.stream, fmt))
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'导入失败: {str(e)}'}), 500
+    result['success'] = result['failed'] == 0
+    result['message'] = f"成功导入 {result['inserted']} 名学生，失败 {result['failed']} 行"
+    return jsonify(result)
+
+
 @students_bp.route('/api/students/<string:student_id>', methods=['PUT'])
 def update_student(student_id):
     """更新学生信息"""
@@ -105,21 +139,20 @@ def update_student(student_id):
     contact = data.get('phone') or data.get('contact', '')
     teacher = data.get('teacher_name') or data.get('teacher', '')
     
-    # 将 email 和 address 以 JSON 格式存储在 family_info 中
-    email = data.get('email', '')
-    address = data.get('address', '')
-    family_info_json = json.dumps({'email': email, 'address': address}, ensure_ascii=False)
+    email = data.get('email') or ''
+    address = data.get('address') or ''
     
     try:
         execute_with_retry(cursor, '''
-            UPDATE students SET name=?, gender=?, age=?, contact=?, family_info=?,
+            UPDATE students SET name=?, gender=?, age=?, contact=?, email=?, address=?, family_info=?,
                           class_name=?, teacher=?
             WHERE student_id=?
-        ''', (data['name'], data['gender'], data.get('age'), contact, family_info_json,
+        ''', (data['name'], data['gender'], data.get('age'), contact, email, address,
+              family_info_json(email, address),
               data.get('class_name'), teacher, student_id))
     
         conn.commit()
-        print(f"Student {student_id} updated successfully")  # Confirmation log
+        bump_tables('students')
         conn.close()
         return jsonify({'success': True, 'message': '学生信息更新成功'})
     except Exception as e:
@@ -136,6 +169,7 @@ def delete_student(student_id):
     try:
         execute_with_retry(cursor, 'DELETE FROM students WHERE student_id=?', (student_id,))
         conn.commit()
+        bump_tables('students')
         
         if cursor.rowcount == 0:
             conn.close()
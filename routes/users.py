@@ -2,44 +2,62 @@
 from flask import Blueprint, request, jsonify
 from datetime import datetime
 import sqlite3
-import hashlib
-from database import get_db, execute_with_retry
+from database import get_db, get_read_db, execute_with_retry
+from utils.cache import bump_tables
+from utils.password_hashing import HashingBusy, hash_password
+from utils.sessions import revoke_user_sessions
+from utils.response_cache import cached_response
+from utils.pagination import InvalidCursor, parse_pagination, paginate_query, page_response
+from utils.counting import parse_count_mode, count_rows
 
 users_bp = Blueprint('users', __name__)
 
 
 @users_bp.route('/api/users', methods=['GET'])
+@cached_response('users')
 def get_users():
     """获取所有用户"""
-    page = int(request.args.get('page', 1))
-    limit = int(request.args.get('limit', 10))
+    try:
+        page, limit, after = parse_pagination(request.args)
+    except InvalidCursor:
+        return jsonify({'success': False, 'message': '分页游标无效'}), 400
+    except ValueError:
+        return jsonify({'success': False, 'message': 'page 和 limit 必须为正整数'}), 400
+    try:
+        count_mode = parse_count_mode(request.args)
+    except ValueError:
+        return jsonify({'success': False, 'message': 'count 参数只能是 exact、estimate 或 none'}), 400
     
-    conn = get_db()
-    db_cursor = conn.cursor()
+    conn = get_read_db()
+    cursor = conn.cursor()
     
     # Get total count
-    cursor.execute('SELECT COUNT(*) as total FROM users')
-    total = cursor.fetchone()['total']
+    total = count_rows(cursor, 'users', [], [], ('users',), count_mode)
     
     # Paginate
-    cursor.execute('SELECT id, username, role, created_at FROM users ORDER BY created_at DESC LIMIT ? OFFSET ?', (limit, (page - 1) * limit))
+    query, params = paginate_query('SELECT id, username, role, created_at FROM users WHERE 1=1', [],
+                                   'created_at', 'id', page, limit, after)
+    cursor.execute(query, params)
     users = [dict(row) for row in cursor.fetchall()]
     conn.close()
-    return jsonify({'total': total, 'data': users, 'page': page, 'limit': limit})
+    return jsonify(page_response(total, users, page, limit, after, 'created_at'))
 
 
 @users_bp.route('/api/users', methods=['POST'])
 def add_user():
     """添加用户"""
     data = request.json
-    conn = get_db()
-    db_cursor = conn.cursor()
     
     if not data.get('password'):
-        conn.close()
         return jsonify({'success': False, 'message': '密码不能为空'}), 400
     
-    password_hash = hashlib.md5(data['password'].encode()).hexdigest()
+    try:
+        password_hash = hash_password(data['password'])
+    except HashingBusy:
+        return jsonify({'success': False, 'message': '服务繁忙，请稍后重试'}), 503
+    
+    conn = get_db()
+    cursor = conn.cursor()
     
     try:
         execute_with_retry(cursor, '''
@@ -48,6 +66,7 @@ def add_user():
         ''', (data['username'], password_hash, data.get('role', 'admin'),
               datetime.now().isoformat()))
         conn.commit()
+        bump_tables('users')
         conn.close()
         return jsonify({'success': True, 'message': '用户添加成功'})
     except sqlite3.IntegrityError:
@@ -66,8 +85,16 @@ def update_user(user_id):
     if not data:
         return jsonify({'success': False, 'message': '请求数据不能为空'}), 400
     
+    # bcrypt 哈希在占用写通道之前计算
+    password_hash = None
+    if data.get('password'):
+        try:
+            password_hash = hash_password(data['password'])
+        except HashingBusy:
+            return jsonify({'success': False, 'message': '服务繁忙，请稍后重试'}), 503
+    
     conn = get_db()
-    db_cursor = conn.cursor()
+    cursor = conn.cursor()
     
     try:
         # 先获取当前用户信息
@@ -80,12 +107,10 @@ def update_user(user_id):
         
         # 如果只提供密码，只更新密码，保留原有角色
         if 'password' in data and data['password'] and 'role' not in data:
-            password_hash = hashlib.md5(data['password'].encode()).hexdigest()
             execute_with_retry(cursor, 'UPDATE users SET password=? WHERE id=?',
                           (password_hash, user_id))
         # 如果同时提供密码和角色，更新两者
         elif 'password' in data and data['password'] and 'role' in data:
-            password_hash = hashlib.md5(data['password'].encode()).hexdigest()
             execute_with_retry(cursor, 'UPDATE users SET password=?, role=? WHERE id=?',
                           (password_hash, data.get('role'), user_id))
         # 如果只提供角色，只更新角色
@@ -97,6 +122,9 @@ def update_user(user_id):
             return jsonify({'success': False, 'message': '请提供要更新的字段'}), 400
         
         conn.commit()
+        bump_tables('users')
+        # 角色或密码已变化，已登录的会话需要重新登录
+        revoke_user_sessions(user_id)
         
         if cursor.rowcount == 0:
             conn.close()
@@ -113,11 +141,13 @@ def update_user(user_id):
 def delete_user(user_id):
     """删除用户"""
     conn = get_db()
-    db_cursor = conn.cursor()
+    cursor = conn.cursor()
     
     try:
         execute_with_retry(cursor, 'DELETE FROM users WHERE id=?', (user_id,))
         conn.commit()
+        bump_tables('users')
+        revoke_user_sessions(user_id)
         
         if cursor.rowcount == 0:
             conn.close()
@@ -5,15 +5,20 @@
 import pytest
 import json
 from datetime import datetime
-from app import app
-from database import init_db, get_db
 import os
+import tempfile
+
+# 必须在导入 app / database 之前指定数据库，任何连接都不会打开仓库中的 student_management.db
+os.environ['DATABASE'] = os.path.join(tempfile.mkdtemp(prefix='test_black_box_'), 'test.db')
+
+from app import app
+from database import init_db, get_db, use_database, close_pool
 
 
 @pytest.fixture
-def client():
-    """创建测试客户端"""
-    os.environ['DATABASE'] = 'test_black_box.db'
+def client(tmp_path):
+    """创建测试客户端（每个测试使用独立的临时数据库）"""
+    use_database(str(tmp_path / 'test.db'))
     app.config['TESTING'] = True
     
     init_db()
@@ -21,8 +26,7 @@ def client():
     with app.test_client() as client:
         yield client
     
-    if os.path.exists('test_black_box.db'):
-        os.remove('test_black_box.db')
+    close_pool()
 
 
 @pytest.fixture
@@ -536,7 +540,7 @@ class TestAttendanceScenarios:
         response = client.post('/api/attendance', json={
             'student_id': 'BT_ATT_STU_002',
             'date': '2025-12-11',
-            'status': '缺勤',
+            'status': '缺席',
             'reason': '生病'
         })
         
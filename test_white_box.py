@@ -6,17 +6,22 @@ import pytest
 import json
 from datetime import datetime
 import hashlib
-from app import app
-from database import init_db, get_db
 import os
 import sqlite3
+import tempfile
+
+# 必须在导入 app / database 之前指定数据库，任何连接都不会打开仓库中的 student_management.db
+os.environ['DATABASE'] = os.path.join(tempfile.mkdtemp(prefix='test_white_box_'), 'test.db')
+
+from app import app
+from database import init_db, get_db, use_database, close_pool
 
 
 @pytest.fixture
-def client():
+def client(tmp_path):
     """创建测试客户端"""
-    # 使用测试数据库
-    os.environ['DATABASE'] = 'test_student_management.db'
+    # 每个测试使用独立的临时数据库，不依赖其他测试留下的数据
+    use_database(str(tmp_path / 'test.db'))
     
     app.config['TESTING'] = True
     
@@ -26,9 +31,8 @@ def client():
     with app.test_client() as client:
         yield client
     
-    # 清理测试数据库
-    if os.path.exists('test_student_management.db'):
-        os.remove('test_student_management.db')
+    # 关闭连接，临时目录由 pytest 清理
+    close_pool()
 
 
 @pytest.fixture
@@ -673,6 +677,1080 @@ class TestStudentCourseModule:
         assert data['data'][0]['student_id'] == 'COURSE_STU_008'
 
 
+
+class TestConnectionPool:
+    """测试数据库连接池 - get_db() 连接复用与回收"""
+    
+    def test_connection_reused_after_close(self, client):
+        """测试33：同一线程归还后再次获取得到同一连接"""
+        conn = get_db()
+        conn.close()
+        conn2 = get_db()
+        conn2.close()
+        assert conn is conn2
+    
+    def test_uncommitted_transaction_rolled_back_on_release(self, client):
+        """测试34：归还连接时回滚未提交的事务"""
+        conn = get_db()
+        conn.execute('INSERT INTO users (username, password, role, created_at) VALUES (?, ?, ?, ?)',
+                     ('pool_tmp_user', 'x', 'admin', datetime.now().isoformat()))
+        conn.close()
+        conn = get_db()
+        row = conn.execute('SELECT id FROM users WHERE username = ?', ('pool_tmp_user',)).fetchone()
+        conn.close()
+        assert row is None
+    
+    def test_pool_stats_track_checkouts(self, client):
+        """测试35：连接池统计借出与复用次数"""
+        from database import get_pool_stats
+        before = get_pool_stats()
+        client.get('/api/students')
+        after = get_pool_stats()
+        assert after['read']['checkouts'] > before['read']['checkouts']
+        assert after['read']['in_use'] == 0
+        assert after['write']['in_use'] == 0
+    
+    def test_read_connection_is_read_only(self, client):
+        """测试36：只读连接拒绝写入，数据库运行在 WAL 模式"""
+        from database import get_read_db
+        conn = get_read_db()
+        try:
+            assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+            with pytest.raises(sqlite3.OperationalError):
+                conn.execute("DELETE FROM users WHERE username = 'nobody'")
+        finally:
+            conn.close()
+    
+    def test_writer_lane_reentrant_in_same_thread(self, client, db):
+        """测试37：同一线程持有写连接时接口仍可写入（写通道可重入）"""
+        response = client.post('/api/students', json={
+            'student_id': 'POOL_STU_001',
+            'name': '连接池学生',
+            'gender': '男',
+            'class_name': '高一1班'
+        })
+        assert response.status_code == 200
+        row = db.execute('SELECT name FROM students WHERE student_id = ?', ('POOL_STU_001',)).fetchone()
+        assert row['name'] == '连接池学生'
+
+
+
+class TestLockRetry:
+    """测试锁竞争处理 - execute_with_retry()"""
+    
+    def test_write_waits_for_external_lock(self, client):
+        """测试38：其他连接持有写锁时，写入等待锁释放后成功并记录等待时间"""
+        import threading
+        import database
+        from database import execute_with_retry, get_lock_wait_stats
+        before = get_lock_wait_stats()
+        other = sqlite3.connect(database.DATABASE, isolation_level=None, check_same_thread=False)
+        other.execute('BEGIN IMMEDIATE')
+        timer = threading.Timer(0.3, lambda: other.execute('COMMIT'))
+        timer.start()
+        conn = get_db()
+        try:
+            execute_with_retry(conn.cursor(), 'INSERT INTO users (username, password, role, created_at) VALUES (?, ?, ?, ?)',
+                               ('lock_wait_user', 'x', 'admin', datetime.now().isoformat()))
+            conn.commit()
+        finally:
+            conn.close()
+            timer.join()
+            other.close()
+        after = get_lock_wait_stats()
+        assert after['calls'] == before['calls'] + 1
+        assert after['total_time'] - before['total_time'] >= 0.2
+
+
+
+class TestQueryPlans:
+    """测试索引迁移 - 路由查询不出现全表扫描"""
+    
+    def test_migrations_applied(self, client, db):
+        """测试39：init_db 执行全部迁移并记录 schema 版本"""
+        from database import MIGRATIONS
+        version = db.execute('PRAGMA user_version').fetchone()[0]
+        assert version == MIGRATIONS[-1][0]
+    
+    def test_route_queries_use_indexes(self, client):
+        """测试40：所有路由查询都走索引，且排序不需要临时 B 树"""
+        from database import explain_route_queries
+        for entry in explain_route_queries():
+            assert not entry['full_scan'], entry
+            assert not entry['temp_sort'], entry
+            if entry['name'].endswith('_after_cursor'):
+                # 游标分页应直接在索引上定位，而不是从头扫描
+                assert all(step.startswith('SEARCH') for step in entry['plan']), entry
+
+
+
+class TestStatisticsModule:
+    """测试统计模块 - get_statistics()"""
+    
+    def test_course_statistics_aggregates(self, client, db):
+        """测试41：按课程统计的平均成绩与出勤率"""
+        client.post('/api/students', json={'student_id': 'STAT_STU_1', 'name': '统计学生1', 'gender': '男'})
+        client.post('/api/students', json={'student_id': 'STAT_STU_2', 'name': '统计学生2', 'gender': '女'})
+        cursor = db.cursor()
+        cursor.execute('''INSERT INTO courses (course_code, course_name, teacher, credits, created_at)
+                         VALUES (?, ?, ?, ?, ?)''', ('STAT101', '统计课程', '老师', 2, datetime.now().isoformat()))
+        course_id = cursor.lastrowid
+        db.commit()
+        client.post('/api/student-courses', json={'student_id': 'STAT_STU_1', 'course_id': course_id,
+                                                  'exam_score': 80, 'daily_score': 90})
+        client.post('/api/student-courses', json={'student_id': 'STAT_STU_2', 'course_id': course_id,
+                                                  'exam_score': 60, 'daily_score': 70})
+        for student_id, status in (('STAT_STU_1', '出勤'), ('STAT_STU_2', '出勤'), ('STAT_STU_2', '缺席')):
+            client.post('/api/attendance', json={'student_id': student_id, 'course_id': course_id,
+                                                 'date': '2025-09-01', 'status': status})
+        
+        response = client.get('/api/statistics')
+        
+        assert response.status_code == 200
+        data = json.loads(response.data)
+        course = next(c for c in data['course_statistics'] if c['course_id'] == course_id)
+        assert course['avg_score'] == round((83 + 63) / 2, 2)
+        assert course['attendance_rate'] == round(2 / 3 * 100, 2)
+        assert data['course_count'] >= 1
+
+    
+    def test_materialized_statistics_consistent_after_writes(self, client, db):
+        """测试42：增删改之后物化统计与重新计算的结果一致"""
+        from database import rebuild_statistics
+        client.post('/api/students', json={'student_id': 'STAT_STU_3', 'name': '统计学生3', 'gender': '男'})
+        cursor = db.cursor()
+        cursor.execute('''INSERT INTO courses (course_code, course_name, teacher, credits, created_at)
+                         VALUES (?, ?, ?, ?, ?)''', ('STAT102', '统计课程2', '老师', 2, datetime.now().isoformat()))
+        course_id = cursor.lastrowid
+        db.commit()
+        client.post('/api/student-courses', json={'student_id': 'STAT_STU_3', 'course_id': course_id,
+                                                  'exam_score': 50, 'daily_score': 50})
+        sc_id = db.execute('SELECT id FROM student_courses WHERE student_id = ?', ('STAT_STU_3',)).fetchone()[0]
+        client.put(f'/api/student-courses/{sc_id}', json={'exam_score': 90, 'daily_score': 100})
+        client.post('/api/attendance', json={'student_id': 'STAT_STU_3', 'course_id': course_id,
+                                             'date': '2025-09-02', 'status': '缺席'})
+        att_id = db.execute('SELECT id FROM attendance WHERE student_id = ?', ('STAT_STU_3',)).fetchone()[0]
+        client.put(f'/api/attendance/{att_id}', json={'status': '出勤'})
+        client.post('/api/attendance', json={'student_id': 'STAT_STU_3', 'course_id': course_id,
+                                             'date': '2025-09-03', 'status': '出勤'})
+        client.delete(f'/api/attendance/{att_id}')
+        
+        def snapshot():
+            return ([tuple(r) for r in db.execute('SELECT * FROM course_stats ORDER BY course_id')],
+                    tuple(db.execute('SELECT * FROM global_stats').fetchone()))
+        
+        maintained = snapshot()
+        rebuild_statistics(db.cursor())
+        db.commit()
+        assert maintained == snapshot()
+        course = db.execute('SELECT * FROM course_stats WHERE course_id = ?', (course_id,)).fetchone()
+        assert course['score_count'] == 1 and course['score_sum'] == 93
+        assert course['attendance_total'] == 1 and course['attendance_present'] == 1
+
+
+class TestCursorPagination:
+    """测试游标分页 - cursor / next_cursor"""
+    
+    def test_cursor_walks_all_rows_without_duplicates(self, client):
+        """测试43：按 next_cursor 逐页读取，覆盖全部学生且不重复"""
+        for i in range(5):
+            client.post('/api/students', json={
+                'student_id': f'CURSOR_STU_{i}',
+                'name': f'游标学生{i}',
+                'gender': '男',
+                'class_name': '高一1班'
+            })
+        total = json.loads(client.get('/api/students').data)['total']
+        
+        seen = []
+        token = ''
+        while True:
+            data = json.loads(client.get(f'/api/students?limit=2&cursor={token}').data)
+            assert len(data['data']) <= 2
+            seen.extend(s['student_id'] for s in data['data'])
+            token = data['next_cursor']
+            if token is None:
+                break
+        
+        assert len(seen) == total
+        assert len(set(seen)) == total
+    
+    def test_invalid_cursor_rejected(self, client):
+        """测试44：无法解析的游标返回 400"""
+        response = client.get('/api/attendance?cursor=not-a-cursor')
+        assert response.status_code == 400
+        data = json.loads(response.data)
+        assert data['success'] == False
+
+
+
+class TestListCounts:
+    """测试列表总数 - count 参数与写入后的缓存失效"""
+    
+    def test_count_none_skips_total(self, client):
+        """测试45：count=none 时不返回总数"""
+        response = client.get('/api/attendance?count=none')
+        assert response.status_code == 200
+        assert json.loads(response.data)['total'] is None
+    
+    def test_invalid_count_mode_rejected(self, client):
+        """测试46：非法的 count 参数返回 400"""
+        response = client.get('/api/parents?count=fast')
+        assert response.status_code == 400
+    
+    def test_count_refreshed_after_write(self, client):
+        """测试47：新增记录后缓存的总数失效"""
+        client.post('/api/students', json={'student_id': 'COUNT_STU_1', 'name': '计数学生', 'gender': '男'})
+        url = '/api/rewards-punishments?student_id=COUNT_STU_1'
+        assert json.loads(client.get(url).data)['total'] == 0
+        client.post('/api/rewards-punishments', json={'student_id': 'COUNT_STU_1', 'type': '奖励',
+                                                      'title': '三好学生', 'date': '2025-06-01'})
+        assert json.loads(client.get(url).data)['total'] == 1
+        assert json.loads(client.get(url + '&count=estimate').data)['total'] == 1
+
+
+
+class TestOptionsEndpoints:
+    """测试下拉选项接口 - 精简字段、前缀过滤、ETag"""
+    
+    def test_student_options_prefix_and_fields(self, client):
+        """测试48：学生选项只返回学号和姓名，并支持前缀过滤"""
+        client.post('/api/students', json={'student_id': 'OPT_STU_1', 'name': '选项学生', 'gender': '女'})
+        response = client.get('/api/students/options?q=OPT_STU')
+        assert response.status_code == 200
+        data = json.loads(response.data)
+        assert data['data'] == [{'student_id': 'OPT_STU_1', 'name': '选项学生'}]
+        assert data['has_more'] is False
+    
+    def test_options_etag_and_invalidation(self, client):
+        """测试49：内容未变时返回 304，新增课程后 ETag 变化"""
+        first = client.get('/api/courses/options')
+        etag = first.headers['ETag']
+        assert client.get('/api/courses/options', headers={'If-None-Match': etag}).status_code == 304
+        client.post('/api/courses', json={'course_code': 'OPT101', 'course_name': '选项课程'})
+        second = client.get('/api/courses/options', headers={'If-None-Match': etag})
+        assert second.status_code == 200
+        assert '选项课程' in [c['course_name'] for c in json.loads(second.data)['data']]
+    
+    def test_options_invalid_limit(self, client):
+        """测试50：非法的 limit 参数返回 400"""
+        assert client.get('/api/students/options?limit=abc').status_code == 400
+
+
+
+class TestResponseCache:
+    """测试读接口响应缓存 - 命中、写后失效、统计"""
+    
+    def test_repeated_get_served_from_cache(self, client):
+        """测试51：相同路由和参数的第二次请求命中缓存（参数顺序不影响）"""
+        client.get('/api/courses?page=1&limit=5')
+        response = client.get('/api/courses?limit=5&page=1')
+        assert response.headers['X-Cache'] == 'HIT'
+    
+    def test_write_invalidates_dependent_routes(self, client):
+        """测试52：新增学生后学生列表和统计接口重新查询"""
+        before = json.loads(client.get('/api/statistics').data)['student_count']
+        client.get('/api/students')
+        client.post('/api/students', json={'student_id': 'CACHE_STU_1', 'name': '缓存学生', 'gender': '男'})
+        students = client.get('/api/students')
+        assert students.headers['X-Cache'] == 'MISS'
+        assert 'CACHE_STU_1' in [s['student_id'] for s in json.loads(students.data)['data']]
+        assert json.loads(client.get('/api/statistics').data)['student_count'] == before + 1
+    
+    def test_cache_stats_exposed(self, client, monkeypatch):
+        """测试53：缓存统计接口返回命中/未命中/淘汰计数"""
+        monkeypatch.setattr(app, 'debug', True)
+        data = json.loads(client.get('/api/_debug/cache').data)
+        for name in ('responses', 'counts', 'options'):
+            assert {'hits', 'misses', 'evictions', 'invalidations'} <= set(data[name])
+
+
+
+class TestConditionalGet:
+    """测试条件请求 - ETag / Last-Modified / 304"""
+    
+    def test_if_none_match_returns_304_until_write(self, client):
+        """测试54：ETag 未变时返回 304，写入后返回新内容"""
+        etag = client.get('/api/parents').headers['ETag']
+        assert client.get('/api/parents', headers={'If-None-Match': etag}).status_code == 304
+        client.post('/api/students', json={'student_id': 'ETAG_STU_1', 'name': 'ETag学生', 'gender': '男'})
+        response = client.get('/api/parents', headers={'If-None-Match': etag})
+        assert response.status_code == 200
+        assert response.headers['ETag'] != etag
+    
+    def test_etag_differs_per_query(self, client):
+        """测试55：不同查询参数的 ETag 不同"""
+        first = client.get('/api/attendance?page=1').headers['ETag']
+        second = client.get('/api/attendance?page=2').headers['ETag']
+        assert first != second
+    
+    def test_if_modified_since(self, client):
+        """测试56：If-Modified-Since 不早于 Last-Modified 时返回 304（修改所在的那一秒过去之后）"""
+        import time
+        last_modified = client.get('/api/statistics').headers['Last-Modified']
+        assert client.get('/api/statistics', headers={'If-Modified-Since': last_modified}).status_code == 200
+        time.sleep(1.05 - time.time() % 1)
+        response = client.get('/api/statistics', headers={'If-Modified-Since': last_modified})
+        assert response.status_code == 304
+
+
+
+class TestStudentImport:
+    """测试批量导入学生 - CSV / JSON Lines、逐行错误"""
+    
+    def test_import_csv_with_row_errors(self, client):
+        """测试57：CSV 导入合法行，缺字段、文件内重复和已存在的学号逐行报错"""
+        client.post('/api/students', json={'student_id': 'IMP_OLD', 'name': '已有学生', 'gender': '男'})
+        body = (
+            'student_id,name,gender,age,email\n'
+            'IMP_001,导入一,男,18,a@example.com\n'
+            'IMP_002,,女,19,\n'
+            'IMP_001,重复,男,18,\n'
+            'IMP_OLD,已有,男,20,\n'
+            'IMP_003,导入三,女,abc,\n'
+            'IMP_004,导入四,女,,\n'
+        )
+        response = client.post('/api/students/import', data=body.encode('utf-8'), content_type='text/csv')
+        data = json.loads(response.data)
+        assert data['inserted'] == 2
+        assert [(e['line'], e['student_id']) for e in data['errors']] == [
+            (3, 'IMP_002'), (4, 'IMP_001'), (5, 'IMP_OLD'), (6, 'IMP_003')]
+        students = json.loads(client.get('/api/students/options?q=IMP_0').data)['data']
+        assert {s['student_id'] for s in students} == {'IMP_001', 'IMP_004'}
+    
+    def test_import_jsonl(self, client):
+        """测试58：JSON Lines 导入，格式错误的行单独报错"""
+        body = '{"student_id": "IMPJ_1", "name": "甲", "gender": "男"}\nnot json\n'
+        response = client.post('/api/students/import?format=jsonl', data=body.encode('utf-8'))
+        data = json.loads(response.data)
+        assert data['inserted'] == 1
+        assert data['errors'][0]['line'] == 2
+        assert data['success'] is False
+    
+    def test_import_requires_format(self, client):
+        """测试59：未指定格式时返回 400"""
+        response = client.post('/api/students/import', data=b'x', content_type='text/plain')
+        assert response.status_code == 400
+
+
+
+class TestBatchGrades:
+    """测试批量录入成绩 - 更新已选课、新增未选课、整体校验"""
+    
+    def _setup(self, client, suffix):
+        client.post('/api/students', json={'student_id': f'GRD{suffix}_1', 'name': '成绩一', 'gender': '男'})
+        client.post('/api/students', json={'student_id': f'GRD{suffix}_2', 'name': '成绩二', 'gender': '女'})
+        client.post('/api/courses', json={'course_code': f'GRD{suffix}', 'course_name': f'成绩课程{suffix}'})
+        courses = json.loads(client.get(f'/api/courses/options?q=成绩课程{suffix}').data)['data']
+        course_id = courses[0]['id']
+        client.post('/api/student-courses', json={'student_id': f'GRD{suffix}_1', 'course_id': course_id,
+                                                  'semester': '2025春'})
+        return course_id
+    
+    def test_batch_upsert(self, client):
+        """测试60：已选课的记录更新成绩，未选课的新增记录，总成绩按 7:3 计算"""
+        course_id = self._setup(client, 'A')
+        response = client.post('/api/student-courses/grades', json={'grades': [
+            {'student_id': 'GRDA_1', 'course_id': course_id, 'exam_score': 90, 'daily_score': 80},
+            {'student_id': 'GRDA_2', 'course_id': course_id, 'exam_score': 60, 'daily_score': 100, 'semester': '2025春'},
+        ]})
+        data = json.loads(response.data)
+        assert (data['updated'], data['inserted']) == (1, 1)
+        rows = json.loads(client.get(f'/api/student-courses?course_id={course_id}').data)['data']
+        scores = {row['student_id']: (row['final_score'], row['semester']) for row in rows}
+        assert scores['GRDA_1'] == (pytest.approx(87.0), '2025春')
+        assert scores['GRDA_2'] == (pytest.approx(72.0), '2025春')
+    
+    def test_batch_rejected_as_a_whole(self, client):
+        """测试61：任一记录无效时整批不写入，并返回逐条错误"""
+        course_id = self._setup(client, 'B')
+        response = client.post('/api/student-courses/grades', json={'grades': [
+            {'student_id': 'GRDB_2', 'course_id': course_id, 'exam_score': 70},
+            {'student_id': 'NO_SUCH', 'course_id': course_id, 'exam_score': 70},
+            {'student_id': 'GRDB_2', 'course_id': 'x'},
+        ]})
+        assert response.status_code == 400
+        errors = json.loads(response.data)['errors']
+        assert [e['index'] for e in errors] == [1, 2]
+        rows = json.loads(client.get('/api/student-courses?student_id=GRDB_2').data)['data']
+        assert rows == []
+
+
+
+class TestRollCall:
+    """测试按课次点名 - 选课校验、重复提交幂等"""
+    
+    def _setup(self, client):
+        for student_id in ('ROLL_1', 'ROLL_2', 'ROLL_3'):
+            client.post('/api/students', json={'student_id': student_id, 'name': student_id, 'gender': '男'})
+        client.post('/api/courses', json={'course_code': 'ROLL101', 'course_name': '点名课程'})
+        course_id = json.loads(client.get('/api/courses/options?q=点名课程').data)['data'][0]['id']
+        for student_id in ('ROLL_1', 'ROLL_2'):
+            client.post('/api/student-courses', json={'student_id': student_id, 'course_id': course_id})
+        return course_id
+    
+    def test_roll_call_idempotent(self, client):
+        """测试62：重复提交点名只更新状态，不产生重复记录"""
+        course_id = self._setup(client)
+        roll = {'course_id': course_id, 'date': '2025-03-01',
+                'records': {'ROLL_1': '出勤', 'ROLL_2': {'status': '请假', 'reason': '病假'}}}
+        first = json.loads(client.post('/api/attendance/roll-call', json=roll).data)
+        assert (first['inserted'], first['updated']) == (2, 0)
+        roll['records']['ROLL_2'] = '出勤'
+        second = json.loads(client.post('/api/attendance/roll-call', json=roll).data)
+        assert (second['inserted'], second['updated']) == (0, 2)
+        rows = json.loads(client.get(f'/api/attendance?course_id={course_id}&date=2025-03-01').data)['data']
+        assert sorted((r['student_id'], r['status']) for r in rows) == [('ROLL_1', '出勤'), ('ROLL_2', '出勤')]
+    
+    def test_roll_call_rejects_unenrolled(self, client):
+        """测试63：包含未选课学生或非法状态时整份点名不写入"""
+        course_id = self._setup(client)
+        response = client.post('/api/attendance/roll-call', json={
+            'course_id': course_id, 'date': '2025-03-02',
+            'records': {'ROLL_1': '出勤', 'ROLL_3': '出勤', 'ROLL_2': '迟到'}})
+        assert response.status_code == 400
+        errors = {e['student_id'] for e in json.loads(response.data)['errors']}
+        assert errors == {'ROLL_2', 'ROLL_3'}
+        rows = json.loads(client.get(f'/api/attendance?course_id={course_id}&date=2025-03-02').data)['data']
+        assert rows == []
+
+
+
+class TestStreamingExport:
+    """测试流式导出 - CSV / NDJSON 与列表接口相同的过滤条件"""
+    
+    def test_export_students_csv(self, client):
+        """测试64：学生导出为带表头的 CSV，包含解析后的邮箱"""
+        client.post('/api/students', json={'student_id': 'EXP_1', 'name': '导出学生', 'gender': '女',
+                                           'email': 'exp@example.com'})
+        response = client.get('/api/students/export')
+        assert response.status_code == 200
+        assert response.mimetype == 'text/csv'
+        text = response.get_data(as_text=True).lstrip('\ufeff')
+        header, *lines = text.splitlines()
+        assert 'student_id' in header.split(',') and 'email' in header.split(',')
+        assert any('EXP_1' in line and 'exp@example.com' in line for line in lines)
+    
+    def test_export_attendance_ndjson_with_filters(self, client):
+        """测试65：考勤导出为 NDJSON，并按 student_id 过滤"""
+        client.post('/api/students', json={'student_id': 'EXP_2', 'name': '导出考勤', 'gender': '男'})
+        client.post('/api/attendance', json={'student_id': 'EXP_2', 'date': '2025-04-01', 'status': '出勤'})
+        client.post('/api/attendance', json={'student_id': 'EXP_2', 'date': '2025-04-02', 'status': '缺席'})
+        response = client.get('/api/attendance/export?format=ndjson&student_id=EXP_2')
+        rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        assert [(r['date'], r['status'], r['student_name']) for r in rows] == [
+            ('2025-04-02', '缺席', '导出考勤'), ('2025-04-01', '出勤', '导出考勤')]
+    
+    def test_export_invalid_format(self, client):
+        """测试66：非法的导出格式返回 400"""
+        assert client.get('/api/student-courses/export?format=xlsx').status_code == 400
+
+
+
+class TestPasswordHashing:
+    """测试密码哈希 - MD5 升级为 bcrypt、哈希任务已满时快速拒绝"""
+    
+    def test_legacy_md5_upgraded_on_login(self, client):
+        """测试67：旧 MD5 密码登录成功后换成 bcrypt，之后仍可登录"""
+        conn = get_db()
+        conn.execute('INSERT INTO users (username, password, role, created_at) VALUES (?, ?, ?, ?)',
+                     ('md5_user', hashlib.md5('secret1'.encode()).hexdigest(), 'teacher', datetime.now().isoformat()))
+        conn.commit()
+        conn.close()
+        assert json.loads(client.post('/api/login', json={'username': 'md5_user', 'password': 'secret1'}).data)['success']
+        conn = get_db()
+        stored = conn.execute('SELECT password FROM users WHERE username = ?', ('md5_user',)).fetchone()['password']
+        conn.close()
+        assert stored.startswith('$2')
+        assert json.loads(client.post('/api/login', json={'username': 'md5_user', 'password': 'secret1'}).data)['success']
+        assert not json.loads(client.post('/api/login', json={'username': 'md5_user', 'password': 'wrong'}).data)['success']
+    
+    def test_saturated_pool_rejects_fast(self, client, monkeypatch):
+        """测试68：哈希任务已满时登录直接返回 503"""
+        import threading
+        from utils import password_hashing
+        saturated = threading.BoundedSemaphore(1)
+        saturated.acquire()
+        monkeypatch.setattr(password_hashing, 'AUTH_HASH_WORKERS', 1)
+        monkeypatch.setattr(password_hashing, '_slots', saturated)
+        response = client.post('/api/login', json={'username': 'busy_new_user', 'password': '123456'})
+        assert response.status_code == 503
+        assert response.headers['Retry-After'] == '1'
+
+
+
+class TestSessions:
+    """测试登录会话 - 令牌解析、退出、修改用户后撤销"""
+    
+    def _login(self, client, username, password):
+        data = json.loads(client.post('/api/login', json={'username': username, 'password': password}).data)
+        return data['token'], {'Authorization': f"Bearer {data['token']}"}
+    
+    def test_token_resolves_identity(self, client):
+        """测试69：令牌解析出用户身份（含学号），无效令牌返回 401"""
+        _, headers = self._login(client, 'session_stu', '123456')
+        me = json.loads(client.get('/api/me', headers=headers).data)['user']
+        assert (me['username'], me['role'], me['student_id']) == ('session_stu', 'student', 'session_stu')
+        assert client.get('/api/me', headers={'Authorization': 'Bearer forged'}).status_code == 401
+        assert client.get('/api/me').status_code == 401
+    
+    def test_logout_and_user_update_revoke_sessions(self, client):
+        """测试70：退出登录撤销当前会话；修改用户撤销该用户的全部会话"""
+        _, first = self._login(client, 'session_stu2', '123456')
+        _, second = self._login(client, 'session_stu2', '123456')
+        client.post('/api/logout', headers=first)
+        assert client.get('/api/me', headers=first).status_code == 401
+        assert client.get('/api/me', headers=second).status_code == 200
+        user_id = json.loads(client.get('/api/me', headers=second).data)['user']['id']
+        client.put(f'/api/users/{user_id}', json={'role': 'teacher'})
+        assert client.get('/api/me', headers=second).status_code == 401
+
+
+
+class TestLoginProvisioning:
+    """测试首次登录自动创建账号 - 并发登录只创建一次"""
+    
+    def test_concurrent_first_logins_create_one_user(self, client):
+        """测试71：同一新用户名并发首次登录，全部成功且只创建一个用户和学生"""
+        import threading
+        results = []
+        
+        def first_login():
+            with app.test_client() as c:
+                results.append(json.loads(c.post('/api/login', json={'username': 'race_user', 'password': '123456'}).data))
+        
+        threads = [threading.Thread(target=first_login) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert all(r['success'] for r in results)
+        assert len({r['user']['id'] for r in results}) == 1
+        conn = get_db()
+        users = conn.execute('SELECT COUNT(*) FROM users WHERE username = ?', ('race_user',)).fetchone()[0]
+        students = conn.execute('SELECT COUNT(*) FROM students WHERE student_id = ?', ('race_user',)).fetchone()[0]
+        conn.close()
+        assert (users, students) == (1, 1)
+
+
+
+class TestSearch:
+    """测试全文检索 - 前缀匹配、触发器同步、参数校验"""
+    
+    def test_search_by_name_prefix_and_student_id(self, client):
+        """测试72：按两字姓名前缀和学号都能检索到学生"""
+        client.post('/api/students', json={'student_id': 'FTS001', 'name': '欧阳检索', 'gender': '男', 'class_name': '检索一班'})
+        data = json.loads(client.get('/api/search?q=欧阳&type=students').data)
+        assert [s['student_id'] for s in data['data']] == ['FTS001']
+        assert data['data'][0]['type'] == 'students'
+        data = json.loads(client.get('/api/search?q=fts001').data)
+        assert data['total'] == 1 and data['data'][0]['name'] == '欧阳检索'
+    
+    def test_search_index_follows_updates_and_deletes(self, client):
+        """测试73：修改、删除学生后检索结果随之变化"""
+        client.post('/api/students', json={'student_id': 'FTS002', 'name': '司马旧名', 'gender': '女', 'class_name': '检索二班'})
+        assert json.loads(client.get('/api/search?q=司马&type=students').data)['total'] == 1
+        client.put('/api/students/FTS002', json={'name': '诸葛新名', 'gender': '女', 'class_name': '检索二班'})
+        assert json.loads(client.get('/api/search?q=司马&type=students').data)['total'] == 0
+        assert json.loads(client.get('/api/search?q=诸葛&type=students').data)['total'] == 1
+        client.delete('/api/students/FTS002')
+        assert json.loads(client.get('/api/search?q=诸葛&type=students').data)['total'] == 0
+    
+    def test_search_rejects_invalid_params(self, client):
+        """测试74：缺少关键词或类型无效时返回 400"""
+        assert client.get('/api/search?q=').status_code == 400
+        assert client.get('/api/search?q=abc&type=teachers').status_code == 400
+        assert client.get('/api/search?q=abc&limit=x').status_code == 400
+
+
+
+class TestStudentContactColumns:
+    """测试 email/address 列迁移 - 旧 family_info 格式回填"""
+    
+    def test_migration_backfills_legacy_family_info(self, monkeypatch):
+        """测试75：JSON、"email|address"、纯文本三种旧格式都能分批回填到新列"""
+        import database
+        monkeypatch.setattr(database, 'MIGRATION_BATCH_SIZE', 2)
+        conn = sqlite3.connect(':memory:')
+        cursor = conn.cursor()
+        cursor.execute('CREATE TABLE students (id INTEGER PRIMARY KEY, family_info TEXT)')
+        cursor.executemany('INSERT INTO students (family_info) VALUES (?)', [
+            ('{"email": "a@example.com", "address": "北京"}',),
+            ('b@example.com|上海',),
+            ('c@example.com',),
+            ('广州',),
+            (None,),
+        ])
+        database._migration_006_student_contact_columns(cursor)
+        rows = cursor.execute('SELECT email, address FROM students ORDER BY id').fetchall()
+        conn.close()
+        assert rows == [('a@example.com', '北京'), ('b@example.com', '上海'), ('c@example.com', ''),
+                        ('', '广州'), ('', '')]
+
+
+
+class TestSqlProfiling:
+    """测试 SQL 剖析 - 调试响应头、慢查询日志"""
+    
+    def test_debug_headers_and_slow_query_log(self, client, monkeypatch):
+        """测试76：调试模式下返回本请求的语句数和耗时；超过阈值的语句带参数形状和执行计划进入慢查询日志"""
+        from utils import sql_profiling
+        from utils.response_cache import clear_response_cache
+        clear_response_cache()
+        sql_profiling.clear_slow_queries()
+        monkeypatch.setattr(sql_profiling, 'SQL_SLOW_QUERY_MS', 0)
+        monkeypatch.setattr(app, 'debug', True)
+        response = client.get('/api/courses?limit=5')
+        assert int(response.headers['X-SQL-Queries']) >= 1
+        assert response.headers['X-SQL-Time'].endswith('ms')
+        log = json.loads(client.get('/api/_debug/slow-queries?limit=50').data)
+        entry = next(q for q in log['queries'] if q['endpoint'] == 'courses.get_courses' and 'LIMIT' in q['sql'])
+        assert entry['params'] == '(int, int)'
+        assert entry['plan'] and 'SCAN courses' in entry['plan'][0]
+    
+    def test_fast_queries_stay_out_of_log(self, client, monkeypatch):
+        """测试77：默认阈值下普通查询不进入慢查询日志，非调试模式不返回剖析响应头"""
+        from routes import debug
+        from utils import sql_profiling
+        sql_profiling.clear_slow_queries()
+        response = client.get('/api/courses')
+        assert 'X-SQL-Queries' not in response.headers
+        monkeypatch.setattr(debug, 'DEBUG_ENDPOINTS', True)
+        assert json.loads(client.get('/api/_debug/slow-queries').data)['queries'] == []
+
+
+
+class TestMetrics:
+    """测试 /metrics - Prometheus 文本格式、按线程分片的计数"""
+    
+    def test_metrics_exposes_route_counters_and_histograms(self, client):
+        """测试78：/metrics 输出按路由的请求数、耗时直方图、SQL 耗时和缓存命中数"""
+        client.get('/api/courses')
+        client.get('/api/courses')
+        response = client.get('/metrics')
+        assert response.content_type.startswith('text/plain; version=0.0.4')
+        text = response.get_data(as_text=True)
+        assert 'http_requests_total{endpoint="courses.get_courses",method="GET",status="200"}' in text
+        assert 'http_request_duration_seconds_bucket{endpoint="courses.get_courses",method="GET",le="+Inf"}' in text
+        assert 'http_request_db_seconds_count{endpoint="courses.get_courses",method="GET"}' in text
+        assert 'cache_requests_total{cache="responses",result="hit"}' in text
+        assert 'db_lock_retries_total' in text
+    
+    def test_thread_shards_merge_without_losing_counts(self):
+        """测试79：多线程并发计数，线程退出后分片合并，总数不丢失"""
+        import threading
+        from utils.metrics import Registry
+        registry = Registry()
+        
+        def work():
+            for _ in range(1000):
+                registry.inc('http_requests_total', (('endpoint', 'x'),))
+        
+        threads = [threading.Thread(target=work) for _ in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert registry.collect().counters[('http_requests_total', (('endpoint', 'x'),))] == 20000
+
+
+
+class TestBenchmarkDataGenerator:
+    """测试基准数据生成器 - 确定性、统计表和全文索引重建"""
+    
+    def test_generate_is_deterministic_and_rebuilds_derived_data(self, tmp_path):
+        """测试80：同一规模和种子生成相同数据；灌完后索引、触发器、统计表、全文索引都已重建"""
+        from benchmarks.datagen import generate
+        first, second = str(tmp_path / 'a.db'), str(tmp_path / 'b.db')
+        counts = generate(first, 200, seed=7, log=lambda line: None)
+        generate(second, 200, seed=7, log=lambda line: None)
+        a, b = sqlite3.connect(first), sqlite3.connect(second)
+        for table in ('students', 'student_courses', 'attendance', 'parents'):
+            assert a.execute(f'SELECT * FROM {table} ORDER BY id').fetchall() == \
+                b.execute(f'SELECT * FROM {table} ORDER BY id').fetchall()
+        stats = a.execute('SELECT student_count, attendance_total FROM global_stats').fetchone()
+        assert stats == (counts['students'], counts['attendance'])
+        name = a.execute('SELECT name FROM students WHERE id = 1').fetchone()[0]
+        assert a.execute('SELECT COUNT(*) FROM students_fts WHERE students_fts MATCH ?', (f'"{name}"',)).fetchone()[0] >= 1
+        assert a.execute("SELECT COUNT(*) FROM sqlite_master WHERE name = 'idx_attendance_course_date'").fetchone()[0] == 1
+        a.close()
+        b.close()
+
+
+
+class TestAccessLogReplay:
+    """测试访问日志与回放 - JSONL 记录、敏感字段处理、进程内回放"""
+    
+    def test_access_log_records_requests_and_redacts_passwords(self, client, tmp_path):
+        """测试81：每个请求记录一行 JSONL，含路由规则、状态码和耗时；密码字段被置空并标记"""
+        from utils import access_log
+        path = tmp_path / 'access.jsonl'
+        access_log.open_log(str(path))
+        try:
+            client.get('/api/courses?page=1&limit=5')
+            client.post('/api/login', json={'username': 'admin', 'password': 'admin123'})
+            client.post('/api/students', data='not json', content_type='text/plain')
+        finally:
+            access_log.close_log()
+        client.get('/api/courses')  # 关闭后不再记录
+        records = [json.loads(line) for line in path.read_text(encoding='utf-8').splitlines()]
+        assert len(records) == 3
+        assert records[0]['endpoint'] == '/api/courses' and records[0]['query'] == 'page=1&limit=5'
+        assert records[0]['status'] == 200 and records[0]['ms'] >= 0 and 'body' not in records[0]
+        assert records[1]['body'] == {'username': 'admin', 'password': None} and records[1]['redacted']
+        assert records[2]['body_omitted']
+    
+    def test_replay_in_process_reports_per_route(self, client, tmp_path):
+        """测试82：回放记录的日志，按路由汇总延迟和错误率；脱敏的登录请求用给定密码补上，其余跳过"""
+        from utils import access_log
+        from benchmarks.replay import load_records, prepare, replay, report, InProcessTarget
+        path = tmp_path / 'access.jsonl'
+        access_log.open_log(str(path))
+        try:
+            for _ in range(3):
+                client.get('/api/courses')
+            client.get('/api/students/options')
+            client.post('/api/login', json={'username': 'admin', 'password': 'admin123'})
+            client.post('/api/login', json={'username': 'someone', 'password': 'x'})
+        finally:
+            access_log.close_log()
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write('not json\n')
+        records, bad_lines = load_records(str(path))
+        assert len(records) == 6 and bad_lines == [7]
+        jobs, skipped = prepare(records, {'admin': 'admin123'})
+        assert len(jobs) == 5 and skipped['redacted'] == 1
+        rows = report(replay(jobs, InProcessTarget(app), concurrency=2, speed=0), duration=1)
+        by_name = {row['name']: row for row in rows}
+        assert by_name['GET /api/courses']['samples'] == 3
+        assert by_name['POST /api/login']['status_mismatches'] == 0
+        assert by_name['Aggregated']['samples'] == 5 and by_name['Aggregated']['errors'] == 0
+        assert by_name['GET /api/courses']['p99'] >= by_name['GET /api/courses']['median']
+
+
+
+class TestPaginationLimits:
+    """测试分页参数校验 - limit / page 必须为正整数，limit 有上限"""
+    
+    def test_non_positive_limit_and_page_are_rejected(self, client):
+        """测试83：limit=0、负数 limit、page=0 返回 400（游标分页也不会因取不到行而 500）；超大 limit 按上限处理"""
+        from config import PAGE_MAX_LIMIT
+        for query in ('cursor=&limit=0', 'cursor=&limit=-5', 'page=1&limit=0', 'page=1&limit=-1', 'page=0&limit=10',
+                      'limit=abc'):
+            response = client.get(f'/api/students?{query}')
+            assert response.status_code == 400, query
+            assert json.loads(response.data)['success'] is False
+        data = json.loads(client.get(f'/api/courses?cursor=&limit={PAGE_MAX_LIMIT * 10}').data)
+        assert data['limit'] == PAGE_MAX_LIMIT
+
+
+
+class TestConditionalGetFreshness:
+    """测试条件请求的新鲜度 - 绕过 bump_tables 的写入在缓存过期后可见"""
+    
+    def test_stale_validator_gets_new_content_after_ttl(self, client, monkeypatch):
+        """测试84：直接写库不递增表版本号，缓存过期后旧 ETag 不再得到 304；内容未变时重新查询仍返回 304"""
+        import database
+        from utils import response_cache
+        monkeypatch.setattr(response_cache._response_cache, 'ttl', 0)  # 条目立即过期
+        etag = client.get('/api/courses').headers['ETag']
+        assert client.get('/api/courses', headers={'If-None-Match': etag}).status_code == 304
+        conn = sqlite3.connect(database.DATABASE)
+        conn.execute("INSERT INTO courses (course_code, course_name, teacher, credits, created_at) "
+                     "VALUES ('EXT001', '外部写入课程', '张老师', 2, ?)", (datetime.now().isoformat(),))
+        conn.commit()
+        conn.close()
+        response = client.get('/api/courses', headers={'If-None-Match': etag})
+        assert response.status_code == 200
+        assert response.headers['ETag'] != etag
+        assert 'EXT001' in [c['course_code'] for c in json.loads(response.data)['data']]
+        # 内容刚刚变化，Last-Modified 就在当前这一秒，If-Modified-Since 不能得到 304
+        since = response.headers['Last-Modified']
+        assert client.get('/api/courses', headers={'If-Modified-Since': since}).status_code == 200
+
+
+
+class TestDebugEndpointAccess:
+    """测试运行状态接口的访问控制 - 非调试模式只对管理员开放"""
+    
+    def test_debug_endpoints_hidden_outside_debug_mode(self, client):
+        """测试85：非调试模式下未登录和学生用户访问 /api/_debug/* 返回 404，管理员可以访问"""
+        for path in ('/api/_debug/cache', '/api/_debug/hashing', '/api/_debug/slow-queries'):
+            assert client.get(path).status_code == 404
+        student = json.loads(client.post('/api/login', json={'username': 'student', 'password': 'student123'}).data)
+        headers = {'Authorization': f"Bearer {student['token']}"}
+        assert client.get('/api/_debug/slow-queries', headers=headers).status_code == 404
+        admin = json.loads(client.post('/api/login', json={'username': 'admin', 'password': 'admin123'}).data)
+        headers = {'Authorization': f"Bearer {admin['token']}"}
+        assert client.get('/api/_debug/slow-queries', headers=headers).status_code == 200
+
+
+
+class TestHashingSlots:
+    """测试密码哈希排队名额 - 超时后名额保留到任务真正结束"""
+    
+    def test_timed_out_job_keeps_slot_until_finished(self, monkeypatch):
+        """测试86：等待超时抛出 HashingBusy，但任务仍在进程中执行时继续占用名额，结束后才归还"""
+        import time
+        from utils import password_hashing
+        monkeypatch.setattr(password_hashing, 'AUTH_HASH_WORKERS', max(password_hashing.AUTH_HASH_WORKERS, 1))
+        password_hashing._run(time.sleep, 0)  # 先启动进程池，避免把进程启动时间算进超时
+        monkeypatch.setattr(password_hashing, 'AUTH_HASH_TIMEOUT', 0.05)
+        with pytest.raises(password_hashing.HashingBusy):
+            password_hashing._run(time.sleep, 0.5)
+        assert password_hashing.get_hashing_stats()['in_flight'] == 1
+        deadline = time.time() + 5
+        while password_hashing.get_hashing_stats()['in_flight'] and time.time() < deadline:
+            time.sleep(0.05)
+        assert password_hashing.get_hashing_stats()['in_flight'] == 0
+
+
+
+class TestMigrationRecovery:
+    """测试迁移中断后重新启动"""
+
+    def test_rerun_after_interrupted_migration(self, client, db):
+        """测试87：迁移 6 已加列但未记录版本时重新 init_db 不报重复列；失败的迁移整体回滚"""
+        import database
+        db.execute('PRAGMA user_version = 5')
+        db.commit()
+        init_db()
+        assert db.execute('PRAGMA user_version').fetchone()[0] == database.MIGRATIONS[-1][0]
+
+        def broken(cursor):
+            cursor.execute("ALTER TABLE students ADD COLUMN broken_column TEXT")
+            raise RuntimeError('migration interrupted')
+
+        original = database.MIGRATIONS
+        database.MIGRATIONS = original + [(original[-1][0] + 1, 'broken', broken)]
+        try:
+            with pytest.raises(RuntimeError):
+                init_db()
+        finally:
+            database.MIGRATIONS = original
+        columns = [row[1] for row in db.execute('PRAGMA table_info(students)').fetchall()]
+        assert 'broken_column' not in columns
+        assert db.execute('PRAGMA user_version').fetchone()[0] == original[-1][0]
+
+
+
+class TestGradeBatchPartialFields:
+    """测试批量录入成绩 - 只更新提供的字段"""
+
+    def test_missing_score_keeps_existing_value(self, client):
+        """测试88：批量记录缺少考试成绩时保留原考试成绩，只更新平时成绩并重算总成绩"""
+        client.post('/api/students', json={'student_id': 'GRDP_1', 'name': '部分成绩', 'gender': '男'})
+        client.post('/api/courses', json={'course_code': 'GRDP', 'course_name': '部分成绩课程'})
+        course_id = json.loads(client.get('/api/courses/options?q=部分成绩课程').data)['data'][0]['id']
+        client.post('/api/student-courses', json={'student_id': 'GRDP_1', 'course_id': course_id,
+                                                  'exam_score': 90, 'daily_score': 50})
+        response = client.post('/api/student-courses/grades', json={'grades': [
+            {'student_id': 'GRDP_1', 'course_id': course_id, 'daily_score': 100},
+        ]})
+        assert json.loads(response.data)['updated'] == 1
+        row = json.loads(client.get('/api/student-courses?student_id=GRDP_1').data)['data'][0]
+        assert row['exam_score'] == pytest.approx(90)
+        assert row['daily_score'] == pytest.approx(100)
+        assert row['final_score'] == pytest.approx(93.0)
+
+
+
+class TestPasswordUpgradeFailure:
+    """测试密码哈希升级失败不影响登录"""
+
+    def test_login_succeeds_when_upgrade_write_fails(self, client, monkeypatch):
+        """测试89：MD5 升级写库失败时登录仍然成功，哈希留到下次登录再升级"""
+        from routes import auth
+
+        def locked(*args, **kwargs):
+            raise sqlite3.OperationalError('database is locked')
+
+        conn = get_db()
+        conn.execute('INSERT INTO users (username, password, role, created_at) VALUES (?, ?, ?, ?)',
+                     ('md5_locked', hashlib.md5('secret1'.encode()).hexdigest(), 'teacher', datetime.now().isoformat()))
+        conn.commit()
+        conn.close()
+        monkeypatch.setattr(auth, 'execute_with_retry', locked)
+        response = client.post('/api/login', json={'username': 'md5_locked', 'password': 'secret1'})
+        assert response.status_code == 200
+        assert json.loads(response.data)['success']
+        conn = get_db()
+        stored = conn.execute('SELECT password FROM users WHERE username = ?', ('md5_locked',)).fetchone()['password']
+        conn.close()
+        assert stored == hashlib.md5('secret1'.encode()).hexdigest()
+
+
+
+class TestWriterDeadline:
+    """测试写通道排队时间受请求截止时间约束"""
+
+    def test_writer_wait_bounded_by_request_deadline(self, client, monkeypatch):
+        """测试90：其他线程占用写通道时，写请求等到请求截止时间即返回 503 和 Retry-After"""
+        import threading
+        import time
+        import database
+        monkeypatch.setattr(database, 'DB_REQUEST_DEADLINE', 0.3)
+        holding, done = threading.Event(), threading.Event()
+
+        def hold_writer():
+            conn = database._get_writer().acquire()
+            holding.set()
+            done.wait(10)
+            conn.close()
+
+        holder = threading.Thread(target=hold_writer)
+        holder.start()
+        holding.wait(5)
+        try:
+            start = time.monotonic()
+            response = client.post('/api/students', json={'student_id': 'LANE_STU', 'name': '排队学生', 'gender': '男'})
+            elapsed = time.monotonic() - start
+        finally:
+            done.set()
+            holder.join()
+        assert response.status_code == 503
+        assert response.headers['Retry-After'] == '1'
+        assert elapsed < 5
+
+
+
+class TestSearchRanking:
+    """测试全文检索按相关度排序"""
+
+    def test_relevant_row_after_many_weak_hits_ranks_first(self, client, db):
+        """测试91：相关度最高的记录排在最前，即使它在大量弱命中之后插入"""
+        filler = ' '.join(['填充'] * 30)
+        created_at = datetime.now().isoformat()
+        db.executemany('''INSERT INTO students (student_id, name, gender, class_name, teacher, created_at)
+                          VALUES (?, ?, ?, ?, ?, ?)''',
+                       [(f'RANKW{i:05d}', '弱命中', '男', filler, f'rankterm {filler}', created_at) for i in range(1200)])
+        db.execute('''INSERT INTO students (student_id, name, gender, created_at) VALUES (?, ?, ?, ?)''',
+                   ('RANKBEST', 'rankterm', '女', created_at))
+        db.commit()
+        data = json.loads(client.get('/api/search?q=rankterm&type=students&limit=5').data)
+        assert data['total'] == 1201
+        assert data['data'][0]['student_id'] == 'RANKBEST'
+        assert 'phone' in data['data'][0]
+
+
+
+class TestAttendanceValidation:
+    """测试考勤校验 - 点名学号去空格后判重、单条记录状态校验"""
+
+    def _setup(self, client):
+        client.post('/api/students', json={'student_id': 'ATTV_1', 'name': '考勤校验', 'gender': '男'})
+        client.post('/api/courses', json={'course_code': 'ATTV101', 'course_name': '考勤校验课程'})
+        course_id = json.loads(client.get('/api/courses/options?q=考勤校验课程').data)['data'][0]['id']
+        client.post('/api/student-courses', json={'student_id': 'ATTV_1', 'course_id': course_id})
+        return course_id
+
+    def test_roll_call_rejects_ids_duplicated_after_strip(self, client):
+        """测试92：学号去掉首尾空格后重复时整份点名返回 400，错误中是去空格后的学号"""
+        course_id = self._setup(client)
+        response = client.post('/api/attendance/roll-call', json={
+            'course_id': course_id, 'date': '2025-05-01', 'records': {' ATTV_1': '出勤', 'ATTV_1': '缺席'}})
+        assert response.status_code == 400
+        assert json.loads(response.data)['errors'] == [{'student_id': 'ATTV_1', 'message': '学生ID重复'}]
+        assert json.loads(client.get('/api/attendance?student_id=ATTV_1').data)['data'] == []
+        response = client.post('/api/attendance/roll-call', json={
+            'course_id': course_id, 'date': '2025-05-01', 'records': {' ATTV_1 ': '出勤'}})
+        assert json.loads(response.data)['inserted'] == 1
+
+    def test_single_record_status_validated(self, client):
+        """测试93：单条添加和修改考勤时状态必须是出勤、缺席或请假"""
+        self._setup(client)
+        response = client.post('/api/attendance', json={'student_id': 'ATTV_1', 'date': '2025-05-02', 'status': '迟到'})
+        assert response.status_code == 400
+        assert client.post('/api/attendance', json={'student_id': 'ATTV_1', 'date': '2025-05-02',
+                                                    'status': '请假'}).status_code == 200
+        att_id = json.loads(client.get('/api/attendance?student_id=ATTV_1').data)['data'][0]['id']
+        assert client.put(f'/api/attendance/{att_id}', json={'status': '旷课'}).status_code == 400
+
+
+
+class TestGradeScoreValidation:
+    """测试成绩取值校验 - 拒绝 nan/inf 和超出 0–100 的成绩"""
+
+    def test_non_finite_and_out_of_range_scores_rejected(self, client):
+        """测试94：批量录入中 nan、inf、负数或超过 100 的成绩逐条报错且整批不写入；单条添加同样校验"""
+        client.post('/api/students', json={'student_id': 'GRDN_1', 'name': '成绩校验', 'gender': '男'})
+        client.post('/api/courses', json={'course_code': 'GRDN', 'course_name': '成绩校验课程'})
+        course_id = json.loads(client.get('/api/courses/options?q=成绩校验课程').data)['data'][0]['id']
+        response = client.post('/api/student-courses/grades', json={'grades': [
+            {'student_id': 'GRDN_1', 'course_id': course_id, 'exam_score': 'nan'},
+            {'student_id': 'GRDN_1', 'course_id': course_id, 'daily_score': 'inf'},
+            {'student_id': 'GRDN_1', 'course_id': course_id, 'exam_score': '-inf'},
+            {'student_id': 'GRDN_1', 'course_id': course_id, 'exam_score': 101},
+            {'student_id': 'GRDN_1', 'course_id': course_id, 'daily_score': -1},
+        ]})
+        assert response.status_code == 400
+        assert [e['index'] for e in json.loads(response.data)['errors']] == [0, 1, 2, 3, 4]
+        assert json.loads(client.get('/api/student-courses?student_id=GRDN_1').data)['data'] == []
+        response = client.post('/api/student-courses', json={'student_id': 'GRDN_1', 'course_id': course_id,
+                                                             'exam_score': 'nan'})
+        assert response.status_code == 400
+        response = client.post('/api/student-courses/grades', json={'grades': [
+            {'student_id': 'GRDN_1', 'course_id': course_id, 'exam_score': 100, 'daily_score': 0}]})
+        assert json.loads(response.data)['inserted'] == 1
+
+
+
+class TestExportHeader:
+    """测试导出表头 - 空结果与有数据时一致"""
+
+    def test_empty_students_export_header_matches_transformed_rows(self, client):
+        """测试95：学生导出为空时的 CSV 表头与有数据时相同（包含 phone、teacher_name）"""
+        def header():
+            text = client.get('/api/students/export').get_data(as_text=True).lstrip('\ufeff')
+            return text.splitlines()[0].split(',')
+
+        empty_header = header()
+        client.post('/api/students', json={'student_id': 'EXPH_1', 'name': '表头学生', 'gender': '男'})
+        assert empty_header == header()
+        assert 'phone' in empty_header and 'teacher_name' in empty_header
+
+
+
+class TestImportSearchIndex:
+    """测试批量导入集中补建全文索引"""
+
+    def test_imported_students_are_searchable(self, client, db):
+        """测试96：导入的学生可以检索到，全文索引完整且延后标记已清空；之后单条新增仍逐行建索引"""
+        body = 'student_id,name,gender,class_name\n' + ''.join(
+            f'IMPFTS{i:03d},上官{i},男,导入{i % 3}班\n' for i in range(30))
+        response = client.post('/api/students/import', data=body.encode('utf-8'), content_type='text/csv')
+        assert json.loads(response.data)['inserted'] == 30
+        assert json.loads(client.get('/api/search?q=上官&type=students').data)['total'] == 30
+        assert db.execute('SELECT COUNT(*) FROM search_index_deferred').fetchone()[0] == 0
+        db.execute("INSERT INTO students_fts (students_fts) VALUES ('integrity-check')")
+        client.post('/api/students', json={'student_id': 'IMPFTS_ONE', 'name': '上官单条', 'gender': '女'})
+        assert json.loads(client.get('/api/search?q=上官单条&type=students').data)['total'] == 1
+
+
+
+class TestReplayDatabase:
+    """测试回放不写入原数据库"""
+
+    def test_in_process_replay_requires_database_and_uses_copy(self, client, tmp_path):
+        """测试97：进程内回放未指定 --database 时报错；指定时回放的是临时副本，写入不影响原库"""
+        import database
+        from benchmarks.replay import copy_database, main
+        log = tmp_path / 'access.jsonl'
+        log.write_text(json.dumps({'t': 1.0, 'method': 'GET', 'path': '/api/courses'}) + '\n', encoding='utf-8')
+        with pytest.raises(SystemExit) as exc:
+            main([str(log)])
+        assert exc.value.code == 2
+        copy = copy_database(database.DATABASE)
+        assert copy != database.DATABASE
+        conn = sqlite3.connect(copy)
+        conn.execute("DELETE FROM users WHERE username = 'admin'")
+        conn.commit()
+        conn.close()
+        conn = get_db()
+        assert conn.execute("SELECT COUNT(*) FROM users WHERE username = 'admin'").fetchone()[0] == 1
+        conn.close()
+
+
 # 测试运行命令
 if __name__ == '__main__':
     pytest.main([__file__, '-v', '--tb=short'])
\ No newline at end of file
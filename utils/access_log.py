@@ -0,0 +1,120 @@
+"""JSONL 访问日志：记录真实流量，供 benchmarks.replay 回放
+
+配置 ACCESS_LOG_PATH 后每个请求追加一行：
+
+    {"t": 1760000000.123, "method": "PUT", "path": "/api/students/S0000001", "query": "",
+     "endpoint": "/api/students/<student_id>", "status": 200, "ms": 3.2, "bytes": 57,
+     "user": "admin", "body": {"name": "张三"}}
+
+- t 为请求开始时刻（Unix 秒），ms 为处理耗时（流式响应不含输出时间，bytes 为 null）；
+- endpoint 为匹配到的路由规则，回放时按它汇总，未匹配时为 null；
+- 只记录 JSON 请求体；密码等字段置为 null 并标记 "redacted": true，非 JSON 或超过
+  ACCESS_LOG_MAX_BODY 的请求体不记录，标记 "body_omitted": true，回放时跳过这些请求。
+"""
+import json
+import threading
+import time
+from flask import g, request
+from config import ACCESS_LOG_PATH, ACCESS_LOG_MAX_BODY
+
+SENSITIVE_FIELDS = frozenset({'password', 'old_password', 'new_password', 'password_hash', 'token'})
+
+_writer = None
+
+
+class AccessLogWriter:
+    """追加写 JSONL 文件；多线程共用一个文件句柄，每行写完立即 flush"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def write(self, record):
+        line = json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n'
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+def open_log(path):
+    """开始记录到 path；已打开的日志先关闭"""
+    global _writer
+    close_log()
+    _writer = AccessLogWriter(path)
+
+
+def close_log():
+    global _writer
+    writer, _writer = _writer, None
+    if writer is not None:
+        writer.close()
+
+
+def redact(value):
+    """去掉敏感字段的值，返回 (新值, 是否有字段被去掉)"""
+    if isinstance(value, dict):
+        redacted = False
+        result = {}
+        for key, item in value.items():
+            if key in SENSITIVE_FIELDS:
+                result[key] = None
+                redacted = True
+            else:
+                result[key], nested = redact(item)
+                redacted = redacted or nested
+        return result, redacted
+    if isinstance(value, list):
+        items = [redact(item) for item in value]
+        return [item for item, _ in items], any(nested for _, nested in items)
+    return value, False
+
+
+def _body_fields(record):
+    if request.method in ('GET', 'HEAD', 'OPTIONS') or not request.content_length:
+        return
+    body = request.get_json(silent=True) if request.content_length <= ACCESS_LOG_MAX_BODY else None
+    if body is None:
+        record['body_omitted'] = True
+        return
+    record['body'], redacted = redact(body)
+    if redacted:
+        record['redacted'] = True
+
+
+def init_app(app):
+    """注册记录钩子；未配置 ACCESS_LOG_PATH 时钩子只做一次判断"""
+    if ACCESS_LOG_PATH:
+        open_log(ACCESS_LOG_PATH)
+
+    @app.before_request
+    def _start_access_log():
+        if _writer is not None:
+            g._access_log_start = (time.time(), time.perf_counter())
+
+    @app.after_request
+    def _write_access_log(response):
+        writer = _writer
+        start = g.pop('_access_log_start', None)
+        if writer is None or start is None:
+            return response
+        started_at, perf_start = start
+        user = g.get('current_user')
+        record = {
+            't': round(started_at, 6),
+            'method': request.method,
+            'path': request.path,
+            'query': request.query_string.decode('utf-8', 'replace'),
+            'endpoint': request.url_rule.rule if request.url_rule else None,
+            'status': response.status_code,
+            'ms': round((time.perf_counter() - perf_start) * 1000, 3),
+            'bytes': None if response.is_streamed else response.content_length,
+            'user': user['username'] if user else None,
+        }
+        _body_fields(record)
+        writer.write(record)
+        return response
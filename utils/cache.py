@@ -0,0 +1,122 @@
+"""进程内缓存工具
+
+- 表版本号：写接口提交后调用 bump_tables() 递增对应表的版本，
+  缓存条目记录生成时依赖表的版本，版本变化即视为失效；
+  通过 on_bump() 注册的回调会在版本递增后被调用，用于主动清理缓存条目；
+  invalidate_all() 在整个数据库被替换时使所有表的缓存失效（回调收到 None）。
+- LRUCache：带容量上限和 TTL 的线程安全 LRU 缓存，并统计命中/未命中/淘汰次数。
+"""
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+# 版本号只在本进程内有效：重启后从 0 开始，用启动随机数区分不同进程生成的 ETag
+BOOT_NONCE = uuid.uuid4().hex[:12]
+
+_versions = {}
+_epoch = 0  # invalidate_all() 的次数，计入所有表的版本号
+_versions_lock = threading.Lock()
+_listeners = []
+
+
+def on_bump(callback):
+    """注册表修改回调，callback 接收被修改的表名集合（invalidate_all() 时为 None）"""
+    _listeners.append(callback)
+    return callback
+
+
+def bump_tables(*tables):
+    """标记表已被修改（在写操作提交之后调用）
+
+    只影响本进程：其他进程、其他 worker 或绕过写接口直接写库的修改不会递增版本号，
+    依赖版本号的缓存只能靠 TTL 过期发现这些修改。
+    """
+    with _versions_lock:
+        for table in tables:
+            _versions[table] = _versions.get(table, 0) + 1
+    for callback in _listeners:
+        callback(frozenset(tables))
+
+
+def invalidate_all():
+    """所有表都视为已修改（切换到另一个数据库文件时调用）"""
+    global _epoch
+    with _versions_lock:
+        _epoch += 1
+    for callback in _listeners:
+        callback(None)
+
+
+def table_versions(tables):
+    """返回各表当前版本号组成的元组（第一项为 invalidate_all() 的次数）"""
+    return (_epoch,) + tuple(_versions.get(table, 0) for table in tables)
+
+
+_MISSING = object()
+
+
+class LRUCache:
+    """带容量上限和 TTL 的 LRU 缓存"""
+
+    def __init__(self, max_entries=1024, ttl=60):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0, 'invalidations': 0}
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                self._stats['misses'] += 1
+                return default
+            if entry[0] < time.monotonic():
+                del self._data[key]
+                self._stats['expirations'] += 1
+                self._stats['misses'] += 1
+                return default
+            self._data.move_to_end(key)
+            self._stats['hits'] += 1
+            return entry[1]
+
+    def peek(self, key, default=None):
+        """读取条目但不检查 TTL、不计入统计（用于允许陈旧数据的场景）"""
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            return default if entry is _MISSING else entry[1]
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def delete(self, key):
+        """删除单个条目"""
+        with self._lock:
+            if self._data.pop(key, _MISSING) is not _MISSING:
+                self._stats['invalidations'] += 1
+
+    def invalidate(self, predicate):
+        """删除 predicate(key) 为真的条目"""
+        with self._lock:
+            doomed = [key for key in self._data if predicate(key)]
+            for key in doomed:
+                del self._data[key]
+            self._stats['invalidations'] += len(doomed)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = len(self._data)
+            stats['max_entries'] = self.max_entries
+        return stats
@@ -0,0 +1,59 @@
+"""列表接口的总数计算
+
+总数只针对主表及必要的过滤条件计算，不再把整条关联查询包进 COUNT(*) 子查询；
+结果按 (SQL, 参数) 缓存，依赖表的版本号变化时重新计算。
+
+count 参数：
+- exact（默认）：精确总数，命中未失效的缓存时直接返回
+- estimate：允许使用已失效的缓存值；无缓存且没有过滤条件时用 MAX(rowid) 估算
+- none：不计算总数，total 返回 null
+"""
+from config import COUNT_CACHE_SIZE, COUNT_CACHE_TTL
+from utils.cache import LRUCache, table_versions
+
+COUNT_MODES = ('exact', 'estimate', 'none')
+
+_count_cache = LRUCache(max_entries=COUNT_CACHE_SIZE, ttl=COUNT_CACHE_TTL)
+
+
+def parse_count_mode(args):
+    """解析 count 参数，非法值抛出 ValueError"""
+    mode = args.get('count', 'exact')
+    if mode not in COUNT_MODES:
+        raise ValueError(mode)
+    return mode
+
+
+def count_rows(cursor, table, conditions, params, depends_on, mode='exact'):
+    """统计 table 中满足 conditions 的行数
+
+    conditions 为 SQL 条件片段列表（以 AND 连接），depends_on 为结果依赖的表，
+    这些表被写接口修改后缓存失效。
+    """
+    if mode == 'none':
+        return None
+    where = ' AND '.join(conditions) if conditions else '1=1'
+    query = f'SELECT COUNT(*) FROM {table} WHERE {where}'
+    key = (query, tuple(params))
+    versions = table_versions(depends_on)
+
+    if mode == 'estimate':
+        cached = _count_cache.peek(key)
+        if cached is not None:
+            return cached[1]
+        if not conditions:
+            base = table.split()[0]
+            cursor.execute(f'SELECT COALESCE(MAX(rowid), 0) FROM {base}')
+            return cursor.fetchone()[0]
+
+    cached = _count_cache.get(key)
+    if cached is not None and cached[0] == versions:
+        return cached[1]
+    cursor.execute(query, params)
+    total = cursor.fetchone()[0]
+    _count_cache.set(key, (versions, total))
+    return total
+
+
+def get_count_cache_stats():
+    return _count_cache.stats()
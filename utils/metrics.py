@@ -0,0 +1,171 @@
+"""进程内指标，以 Prometheus 文本格式输出
+
+请求路径上只做本线程分片内的加法：每个线程有自己的分片（threading.local），
+写入不加锁，抓取时再汇总所有分片；线程退出时其分片并入已退出线程的汇总，
+每个请求一个线程的服务器也不会无限积累分片。直方图桶边界预先给定，记录时二分查找桶位置。
+缓存命中、锁重试等已有的统计在抓取时读取（见 routes/metrics.py），不在请求路径上重复计数。
+"""
+import bisect
+import threading
+import time
+import weakref
+from flask import g, request
+from utils import sql_profiling
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (128, 512, 2048, 8192, 32768, 131072, 524288, 2097152, 8388608)
+
+# 名称 -> (类型, 说明, 直方图桶)
+METRICS = {
+    'http_requests_total': ('counter', '按路由、方法、状态码统计的请求数', None),
+    'http_request_duration_seconds': ('histogram', '请求处理耗时（不含流式响应的输出时间）', LATENCY_BUCKETS),
+    'http_response_size_bytes': ('histogram', '响应体大小（流式响应不计）', SIZE_BUCKETS),
+    'http_request_db_seconds': ('histogram', '单个请求内 SQL 语句的总耗时', LATENCY_BUCKETS),
+    'http_request_db_statements_total': ('counter', '请求内执行的 SQL 语句数', None),
+}
+
+
+class _Shard:
+    """一个线程的指标分片，只有所属线程写入"""
+    __slots__ = ('counters', 'histograms')
+
+    def __init__(self):
+        self.counters = {}  # (名称, 标签) -> 值
+        self.histograms = {}  # (名称, 标签) -> [各桶计数..., +Inf 计数, 总和]
+
+
+class _ThreadToken:
+    """只被所属线程的 threading.local 引用，线程退出时被回收，触发分片合并"""
+
+
+def _merge(target, shard):
+    for key, value in list(shard.counters.items()):
+        target.counters[key] = target.counters.get(key, 0) + value
+    for key, values in list(shard.histograms.items()):
+        merged = target.histograms.get(key)
+        if merged is None:
+            target.histograms[key] = list(values)
+        else:
+            for i, value in enumerate(values):
+                merged[i] += value
+
+
+class Registry:
+    """按线程分片的计数器和直方图"""
+
+    def __init__(self, metrics=METRICS):
+        self.metrics = metrics
+        self._local = threading.local()
+        # 只在线程首次记录、线程退出和抓取时加锁；RLock 防止抓取时触发的回收在同一线程内重入
+        self._lock = threading.RLock()
+        self._shards = set()
+        self._retired = _Shard()
+
+    def _shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = _Shard()
+            self._local.token = token = _ThreadToken()
+            with self._lock:
+                self._shards.add(shard)
+            weakref.finalize(token, self._retire, shard)
+        return shard
+
+    def _retire(self, shard):
+        with self._lock:
+            self._shards.discard(shard)
+            _merge(self._retired, shard)
+
+    def inc(self, name, labels=(), value=1):
+        counters = self._shard().counters
+        key = (name, labels)
+        counters[key] = counters.get(key, 0) + value
+
+    def observe(self, name, labels, value):
+        histograms = self._shard().histograms
+        key = (name, labels)
+        buckets = self.metrics[name][2]
+        values = histograms.get(key)
+        if values is None:
+            values = histograms[key] = [0] * (len(buckets) + 2)
+        values[bisect.bisect_left(buckets, value)] += 1
+        values[-1] += value
+
+    def collect(self):
+        """汇总所有分片，返回 _Shard"""
+        total = _Shard()
+        with self._lock:
+            _merge(total, self._retired)
+            for shard in list(self._shards):
+                _merge(total, shard)
+        return total
+
+    def render(self):
+        """Prometheus 文本格式"""
+        total = self.collect()
+        lines = []
+        for name, (kind, help_text, buckets) in self.metrics.items():
+            lines.extend(header(name, kind, help_text))
+            if kind == 'counter':
+                for (metric, labels), value in sorted(total.counters.items()):
+                    if metric == name:
+                        lines.append(sample(name, labels, value))
+            else:
+                for (metric, labels), values in sorted(total.histograms.items()):
+                    if metric == name:
+                        lines.extend(histogram_samples(name, labels, buckets, values[:-1], values[-1]))
+        return lines
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def header(name, kind, help_text):
+    return [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+
+
+def sample(name, labels, value):
+    """一行样本；labels 为 ((键, 值), ...)"""
+    if labels:
+        name += '{' + ','.join(f'{key}="{_escape(val)}"' for key, val in labels) + '}'
+    return f'{name} {value}'
+
+
+def histogram_samples(name, labels, buckets, counts, total):
+    """直方图样本：counts 为各桶（非累计）计数，最后一个为 +Inf 桶"""
+    lines = []
+    cumulative = 0
+    for bound, count in zip([str(bound) for bound in buckets] + ['+Inf'], counts):
+        cumulative += count
+        lines.append(sample(f'{name}_bucket', (*labels, ('le', bound)), cumulative))
+    lines.append(sample(f'{name}_sum', labels, float(total)))
+    lines.append(sample(f'{name}_count', labels, cumulative))
+    return lines
+
+
+registry = Registry()
+
+
+def init_app(app):
+    """注册请求计时和记录钩子"""
+
+    @app.before_request
+    def _start_timer():
+        g._metrics_start = time.perf_counter()
+
+    @app.after_request
+    def _record_request(response):
+        start = g.pop('_metrics_start', None)
+        if start is None:
+            return response
+        endpoint = request.endpoint or 'unmatched'
+        route = (('endpoint', endpoint), ('method', request.method))
+        registry.inc('http_requests_total', (*route, ('status', str(response.status_code))))
+        registry.observe('http_request_duration_seconds', route, time.perf_counter() - start)
+        if not response.is_streamed:
+            registry.observe('http_response_size_bytes', route, response.content_length or 0)
+        statements, sql_time = sql_profiling.request_sql_totals()
+        registry.observe('http_request_db_seconds', route, sql_time)
+        registry.inc('http_request_db_statements_total', route, statements)
+        return response
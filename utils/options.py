@@ -0,0 +1,55 @@
+"""下拉框选项接口的公共逻辑
+
+选项接口只返回 id + 名称两列，支持 q 前缀过滤（输入联想）；
+结果按 (接口, q, limit) 缓存在进程内，依赖表的版本号变化时重新查询，
+响应带 ETag，客户端携带 If-None-Match 且内容未变时返回 304。
+"""
+import hashlib
+import json
+
+from flask import Response, request
+
+from config import OPTIONS_MAX_LIMIT, OPTIONS_CACHE_SIZE, OPTIONS_CACHE_TTL
+from utils.cache import LRUCache, table_versions
+
+_options_cache = LRUCache(max_entries=OPTIONS_CACHE_SIZE, ttl=OPTIONS_CACHE_TTL)
+
+
+def parse_options_args(args):
+    """解析 q / limit 参数，limit 非法时抛出 ValueError"""
+    q = args.get('q', '').strip()
+    limit = int(args.get('limit', OPTIONS_MAX_LIMIT))
+    if limit < 1:
+        raise ValueError(limit)
+    return q, min(limit, OPTIONS_MAX_LIMIT)
+
+
+def prefix_range(q):
+    """把前缀匹配改写成 [q, q + U+10FFFF) 的范围条件，便于走索引"""
+    return q, q + '\U0010ffff'
+
+
+def options_response(name, q, limit, depends_on, load):
+    """返回选项列表的 JSON 响应
+
+    load(q, limit) 负责查询数据库，返回最多 limit + 1 行（多出的一行用于判断 has_more）。
+    """
+    key = (name, q, limit)
+    versions = table_versions(depends_on)
+    cached = _options_cache.get(key)
+    if cached is None or cached[0] != versions:
+        rows = load(q, limit)
+        body = json.dumps({'data': rows[:limit], 'has_more': len(rows) > limit},
+                          ensure_ascii=False, separators=(',', ':'))
+        etag = hashlib.sha1(body.encode('utf-8')).hexdigest()
+        cached = (versions, body, etag)
+        _options_cache.set(key, cached)
+
+    response = Response(cached[1], mimetype='application/json')
+    response.set_etag(cached[2])
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+
+def get_options_cache_stats():
+    return _options_cache.stats()
@@ -0,0 +1,83 @@
+"""列表接口分页工具
+
+默认使用 page/limit（LIMIT ? OFFSET ?）分页；请求带 cursor 参数时改用游标（keyset）分页：
+按 排序列 + id 定位上一页的最后一行，直接从索引位置继续读取，翻到很深的页也不需要跳过前面的行。
+首页传空的 cursor（?cursor=），之后每次传回响应中的 next_cursor，next_cursor 为 null 表示没有下一页。
+"""
+import base64
+import json
+from config import PAGE_MAX_LIMIT
+
+
+class InvalidCursor(ValueError):
+    """分页游标无法解析"""
+
+
+def encode_cursor(sort_value, row_id):
+    raw = json.dumps([sort_value, row_id], ensure_ascii=False, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token):
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, TypeError, UnicodeError):
+        raise InvalidCursor(token)
+    if not isinstance(row_id, int):
+        raise InvalidCursor(token)
+    return sort_value, row_id
+
+
+def parse_pagination(args):
+    """解析 page / limit / cursor 参数
+
+    返回 (page, limit, after)：after 为 None 表示页码分页，
+    () 表示游标分页的第一页，否则为上一页最后一行的 (排序值, id)。
+    page / limit 不是正整数时抛出 ValueError，游标无法解析时抛出 InvalidCursor；
+    limit 超过 PAGE_MAX_LIMIT 时按上限处理。
+    """
+    limit = int(args.get('limit', 10))
+    if limit < 1:
+        raise ValueError(limit)
+    limit = min(limit, PAGE_MAX_LIMIT)
+    if 'cursor' not in args:
+        page = int(args.get('page', 1))
+        if page < 1:
+            raise ValueError(page)
+        return page, limit, None
+    token = args.get('cursor')
+    return None, limit, decode_cursor(token) if token else ()
+
+
+def paginate_query(query, params, sort_column, id_column, page, limit, after):
+    """为查询追加排序和分页子句，返回新的 (query, params)
+
+    按 sort_column DESC, id_column DESC 排序；游标分页时多取一行用于判断是否还有下一页。
+    """
+    params = list(params)
+    if after is None:
+        query += f' ORDER BY {sort_column} DESC, {id_column} DESC LIMIT ? OFFSET ?'
+        params.extend([limit, (page - 1) * limit])
+        return query, params
+    if after:
+        # 写成 col <= ? AND (...) 的形式，让 SQLite 能在索引上做范围定位而不是从头扫描
+        query += f' AND {sort_column} <= ? AND ({sort_column} < ? OR {id_column} < ?)'
+        params.extend([after[0], after[0], after[1]])
+    query += f' ORDER BY {sort_column} DESC, {id_column} DESC LIMIT ?'
+    params.append(limit + 1)
+    return query, params
+
+
+def page_response(total, rows, page, limit, after, sort_key, id_key='id'):
+    """组装列表接口的响应体；游标分页时截掉多取的一行并生成 next_cursor"""
+    body = {'total': total, 'data': rows, 'page': page, 'limit': limit}
+    if after is not None:
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            next_cursor = encode_cursor(last[sort_key], last[id_key])
+        body['data'] = rows
+        body['next_cursor'] = next_cursor
+    return body
@@ -0,0 +1,115 @@
+"""登录与用户管理使用的密码哈希
+
+bcrypt 每次计算约 100ms CPU，放在独立的进程池中执行：
+- 进程数由 AUTH_HASH_WORKERS 决定（默认等于 CPU 核数，0 表示在请求线程内直接计算）；
+- 排队与执行中的任务数超过 AUTH_HASH_QUEUE_LIMIT 时立即抛出 HashingBusy，由路由返回 503，
+  不让请求在队列里越积越多；等待超时的请求同样返回 503，但任务的名额要等它在进程中真正结束才归还，
+  排队上限始终约束实际进行中的 bcrypt 计算；
+- 服务进程是多线程的，进程池用 spawn 方式启动，不 fork 持有锁和连接的父进程；
+- 旧数据中的 MD5 哈希仍可校验，needs_upgrade() 为真时由登录接口在登录成功后换成 bcrypt。
+"""
+import hashlib
+import hmac
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+
+from config import AUTH_HASH_WORKERS, AUTH_HASH_QUEUE_LIMIT, AUTH_HASH_TIMEOUT, AUTH_BCRYPT_ROUNDS
+from utils.security import hash_password as _bcrypt_hash, verify_password as _bcrypt_verify
+
+
+class HashingBusy(RuntimeError):
+    """哈希任务已满或等待超时"""
+
+
+_executor = None
+_executor_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(max(AUTH_HASH_QUEUE_LIMIT, 1))
+_stats = {'submitted': 0, 'rejected': 0, 'timeouts': 0, 'upgraded': 0, 'in_flight': 0}
+_stats_lock = threading.Lock()
+
+
+def _count(name, delta=1):
+    with _stats_lock:
+        _stats[name] += delta
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ProcessPoolExecutor(max_workers=AUTH_HASH_WORKERS,
+                                                mp_context=multiprocessing.get_context('spawn'))
+    return _executor
+
+
+def _release_slot(future):
+    _count('in_flight', -1)
+    _slots.release()
+
+
+def _run(fn, *args):
+    if AUTH_HASH_WORKERS <= 0:
+        return fn(*args)
+    if not _slots.acquire(blocking=False):
+        _count('rejected')
+        raise HashingBusy('too many pending hash jobs')
+    try:
+        future = _get_executor().submit(fn, *args)
+    except BaseException:
+        _slots.release()
+        raise
+    _count('submitted')
+    _count('in_flight')
+    # 名额在任务完成、失败或被取消时归还，而不是在调用方停止等待时
+    future.add_done_callback(_release_slot)
+    try:
+        return future.result(timeout=AUTH_HASH_TIMEOUT)
+    except FutureTimeout:
+        future.cancel()  # 只对仍在排队的任务有效，已在执行的任务继续占用名额直到算完
+        _count('timeouts')
+        raise HashingBusy('hash job timed out')
+
+
+def is_legacy_hash(stored):
+    """旧版本保存的 32 位十六进制 MD5 哈希"""
+    return len(stored) == 32 and all(ch in '0123456789abcdef' for ch in stored)
+
+
+def hash_password(password):
+    """生成 bcrypt 哈希（在进程池中执行）"""
+    return _run(_bcrypt_hash, password, AUTH_BCRYPT_ROUNDS)
+
+
+def verify_password(password, stored):
+    """校验密码，兼容旧的 MD5 哈希（MD5 很快，直接在当前线程比较）"""
+    if not stored:
+        return False
+    if is_legacy_hash(stored):
+        return hmac.compare_digest(hashlib.md5(password.encode()).hexdigest(), stored)
+    return _run(_bcrypt_verify, password, stored)
+
+
+def needs_upgrade(stored):
+    return is_legacy_hash(stored)
+
+
+def record_upgrade():
+    _count('upgraded')
+
+
+def get_hashing_stats():
+    with _stats_lock:
+        stats = dict(_stats)
+    stats['workers'] = AUTH_HASH_WORKERS
+    stats['queue_limit'] = AUTH_HASH_QUEUE_LIMIT
+    return stats
+
+
+def shutdown():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
@@ -0,0 +1,105 @@
+"""读接口响应缓存与条件请求
+
+cached_response(*tables) 装饰 GET 视图函数：
+- 以 路由 + 规范化后的查询参数 为键缓存 200 响应，条目记录依赖表的版本号；
+  写接口调用 bump_tables() 后，依赖这些表的条目被主动删除，
+  版本号校验则兜住查询与写入交错时可能写入的旧结果。
+- 表版本号只在本进程内有效：其他进程、其他 worker 或直接写库（如 benchmarks.datagen）的修改
+  不会使缓存失效，只能等条目过期，因此缓存内容最多陈旧 RESPONSE_CACHE_TTL 秒。
+- 响应带 ETag（进程启动随机数 + 表版本号 + 响应体摘要）和 Last-Modified。
+  只有缓存条目未过期时才用它回答条件请求（304），过期后重新执行视图，
+  内容变化则 ETag 随之变化，旧的校验值不会一直得到 304。
+- If-None-Match 优先于 If-Modified-Since；Last-Modified 只精确到秒，
+  最近一次修改在当前这一秒内时不使用 If-Modified-Since。
+"""
+import hashlib
+import time
+from datetime import datetime, timezone
+from functools import wraps
+
+from flask import Response, make_response, request
+
+from config import RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL
+from utils.cache import BOOT_NONCE, LRUCache, on_bump, table_versions
+
+_response_cache = LRUCache(max_entries=RESPONSE_CACHE_SIZE, ttl=RESPONSE_CACHE_TTL)
+
+
+@on_bump
+def _invalidate(tables):
+    if tables is None:
+        _response_cache.clear()
+    else:
+        _response_cache.invalidate(lambda key: not tables.isdisjoint(key[0]))
+
+
+def _cache_key(tables):
+    args = tuple(sorted(request.args.items(multi=True)))
+    return (tables, request.path, args)
+
+
+def _etag(key, versions, body):
+    stamps = '.'.join(str(version) for version in versions)
+    digest = hashlib.sha1(repr(key).encode('utf-8') + body).hexdigest()[:16]
+    return f'{BOOT_NONCE}-{stamps}-{digest}'
+
+
+def _not_modified(etag, modified_at):
+    """按 RFC 7232：带 If-None-Match 时只比较 ETag，否则比较 If-Modified-Since（精确到秒）"""
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+    since = request.if_modified_since
+    if since is None or int(modified_at) >= int(time.time()):
+        # 同一秒内之后的写入与这次修改的 Last-Modified 相同，无法判断客户端的副本是否最新
+        return False
+    return int(modified_at) <= since.timestamp()
+
+
+def _with_validators(response, etag, modified_at):
+    response.set_etag(etag)
+    response.last_modified = datetime.fromtimestamp(int(modified_at), tz=timezone.utc)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+def cached_response(*tables):
+    """缓存 GET 视图的响应并支持条件请求，tables 为结果依赖的表"""
+    tables = tuple(tables)
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            key = _cache_key(tables)
+            versions = table_versions(tables)
+            stale = _response_cache.peek(key)
+            cached = _response_cache.get(key)
+            if cached is not None and cached[0] == versions:
+                _, body, mimetype, etag, modified_at = cached
+                if _not_modified(etag, modified_at):
+                    return _with_validators(Response(status=304), etag, modified_at)
+                response = Response(body, mimetype=mimetype)
+                response.headers['X-Cache'] = 'HIT'
+                return _with_validators(response, etag, modified_at)
+
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200 or response.is_streamed:
+                return response
+            body = response.get_data()
+            etag = _etag(key, versions, body)
+            # 内容与上一次相同时沿用原修改时间，否则只知道修改发生在此刻之前
+            modified_at = stale[4] if stale is not None and stale[3] == etag else time.time()
+            _response_cache.set(key, (versions, body, response.mimetype, etag, modified_at))
+            if _not_modified(etag, modified_at):
+                return _with_validators(Response(status=304), etag, modified_at)
+            response.headers['X-Cache'] = 'MISS'
+            return _with_validators(response, etag, modified_at)
+        return wrapper
+    return decorator
+
+
+def clear_response_cache():
+    _response_cache.clear()
+
+
+def get_response_cache_stats():
+    return _response_cache.stats()
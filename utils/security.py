@@ -3,11 +3,11 @@
 import bcrypt
 
 
-def hash_password(password: str) -> str:
+def hash_password(password: str, rounds: int = 12) -> str:
     """使用 bcrypt 对明文密码进行哈希，返回 utf-8 字符串"""
     if isinstance(password, str):
         password = password.encode('utf-8')
-    hashed = bcrypt.hashpw(password, bcrypt.gensalt())
+    hashed = bcrypt.hashpw(password, bcrypt.gensalt(rounds))
     return hashed.decode('utf-8')
 
 
@@ -0,0 +1,60 @@
+"""登录会话
+
+登录成功后生成会话：身份信息（用户 id、用户名、角色、对应的学号）保存在进程内的 LRU 缓存中，
+客户端拿到的令牌只是签名后的 [用户 id, 会话 id]。之后的请求带上
+Authorization: Bearer <令牌>，校验签名并查缓存即可得到当前用户，不需要查询数据库。
+
+会话在 SESSION_TTL 后过期；用户被修改或删除时调用 revoke_user_sessions() 使其全部会话失效。
+"""
+import secrets
+
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+
+from config import SECRET_KEY, SESSION_TTL, SESSION_MAX_ENTRIES
+from utils.cache import LRUCache
+
+_serializer = URLSafeTimedSerializer(SECRET_KEY, salt='session')
+# 键为 (用户 id, 会话 id)，按用户撤销时可以直接匹配键
+_sessions = LRUCache(max_entries=SESSION_MAX_ENTRIES, ttl=SESSION_TTL)
+
+
+def create_session(user):
+    """保存会话并返回令牌；user 为包含 id / username / role / student_id 的 dict"""
+    session_id = secrets.token_urlsafe(16)
+    _sessions.set((user['id'], session_id), dict(user))
+    return _serializer.dumps([user['id'], session_id])
+
+
+def _key(token):
+    try:
+        user_id, session_id = _serializer.loads(token, max_age=SESSION_TTL)
+    except (BadSignature, ValueError, TypeError):
+        return None
+    return user_id, session_id
+
+
+def resolve_session(token):
+    """令牌对应的会话身份信息，无效、过期或已撤销时返回 None"""
+    key = _key(token)
+    return _sessions.get(key) if key else None
+
+
+def revoke_session(token):
+    key = _key(token)
+    if key:
+        _sessions.delete(key)
+
+
+def revoke_user_sessions(user_id):
+    """撤销某个用户的全部会话（用户被修改或删除时调用）"""
+    _sessions.invalidate(lambda key: key[0] == user_id)
+
+
+def token_from_request(request):
+    auth = request.headers.get('Authorization', '')
+    scheme, _, token = auth.partition(' ')
+    return token.strip() if scheme.lower() == 'bearer' and token.strip() else None
+
+
+def get_session_stats():
+    return _sessions.stats()
@@ -0,0 +1,192 @@
+"""SQL 性能剖析
+
+连接池借出的连接统一使用 ProfilingCursor：每条语句的耗时为 execute 加上随后在同一游标上
+fetchone/fetchmany/fetchall 的时间，按请求汇总语句数和总耗时。请求结束时，耗时超过
+SQL_SLOW_QUERY_MS 的语句连同参数形状（只记录类型，不记录值）和 EXPLAIN QUERY PLAN
+写入慢查询日志，通过 /api/_debug/slow-queries 查看（调试模式或管理员）；调试模式下响应头带上本请求的统计。
+"""
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from flask import current_app, g, has_request_context, request
+from config import SQL_SLOW_QUERY_MS, SQL_SLOW_QUERY_LOG_SIZE
+from utils.cache import LRUCache
+
+_WHITESPACE = re.compile(r'\s+')
+
+# 执行计划按 SQL 文本缓存，同一条慢语句不必每次都 EXPLAIN
+_plans = LRUCache(max_entries=256, ttl=300)
+
+
+class ProfilingCursor(sqlite3.Cursor):
+    """记录语句耗时的游标"""
+
+    _entry = None
+
+    def execute(self, sql, parameters=()):
+        self._entry = _begin(sql, parameters, many=False)
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._add_time(start)
+
+    def executemany(self, sql, seq_of_parameters):
+        if isinstance(seq_of_parameters, (list, tuple)):
+            self._entry = _begin(sql, seq_of_parameters, many=True)
+        else:
+            # 迭代器只能消费一次，不取样本参数
+            self._entry = _begin(sql, None, many=True)
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self._add_time(start)
+
+    def fetchone(self):
+        start = time.perf_counter()
+        try:
+            return super().fetchone()
+        finally:
+            self._add_time(start)
+
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        try:
+            return super().fetchmany(self.arraysize if size is None else size)
+        finally:
+            self._add_time(start)
+
+    def fetchall(self):
+        start = time.perf_counter()
+        try:
+            return super().fetchall()
+        finally:
+            self._add_time(start)
+
+    def _add_time(self, start):
+        if self._entry is not None:
+            self._entry['elapsed'] += time.perf_counter() - start
+
+
+def _shape(params):
+    """参数形状：只保留类型名，如 (str, int) 或 {name: str}"""
+    if isinstance(params, dict):
+        return '{' + ', '.join(f'{key}: {type(value).__name__}' for key, value in params.items()) + '}'
+    return '(' + ', '.join(type(value).__name__ for value in params) + ')'
+
+
+def _begin(sql, params, many):
+    """登记一条语句，返回记录耗时的条目；请求外执行的语句不记录"""
+    if not has_request_context():
+        return None
+    if many:
+        sample = params[0] if params else None
+        shape = f'{len(params)} × {_shape(sample)}' if params else ('[]' if params is not None else 'iterator')
+    else:
+        sample = params
+        shape = _shape(params)
+    entry = {'sql': sql, 'sample': sample, 'shape': shape, 'elapsed': 0.0}
+    g.setdefault('_sql_statements', []).append(entry)
+    return entry
+
+
+class SlowQueryLog:
+    """最近的慢查询（环形缓冲）"""
+
+    def __init__(self, size=SQL_SLOW_QUERY_LOG_SIZE):
+        self._entries = deque(maxlen=size)
+        self._lock = threading.Lock()
+        self._stats = {'requests': 0, 'statements': 0, 'slow': 0}
+
+    def record_request(self, statements, slow):
+        with self._lock:
+            self._stats['requests'] += 1
+            self._stats['statements'] += statements
+            self._stats['slow'] += len(slow)
+            self._entries.extend(slow)
+
+    def snapshot(self, limit=None):
+        with self._lock:
+            entries = list(reversed(self._entries))
+            stats = dict(self._stats)
+        return {**stats, 'threshold_ms': SQL_SLOW_QUERY_MS, 'queries': entries[:limit]}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_slow_log = SlowQueryLog()
+
+
+def _explain(sql, sample, connect):
+    """慢语句的执行计划；无法 EXPLAIN 的语句（PRAGMA、参数不可得等）返回 None"""
+    plan = _plans.get(sql)
+    if plan is not None:
+        return plan
+    if sample is None and '?' in sql:
+        return None
+    conn = connect()
+    try:
+        plan = [row[3] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql, sample or ()).fetchall()]
+    except sqlite3.Error:
+        return None
+    finally:
+        conn.close()
+    _plans.set(sql, plan)
+    return plan
+
+
+def request_sql_totals():
+    """当前请求的 (语句数, SQL 总耗时秒)；请求汇总之后调用时返回汇总结果"""
+    if '_sql_totals' in g:
+        return g._sql_totals
+    statements = g.get('_sql_statements', [])
+    return len(statements), sum(entry['elapsed'] for entry in statements)
+
+
+def get_slow_queries(limit=None):
+    """慢查询日志（最近的在前）与累计统计"""
+    return _slow_log.snapshot(limit)
+
+
+def clear_slow_queries():
+    _slow_log.clear()
+
+
+def init_app(app, connect):
+    """注册请求结束时的汇总钩子；connect 返回用于 EXPLAIN 的只读连接"""
+
+    @app.after_request
+    def _record_sql_stats(response):
+        statements = g.pop('_sql_statements', [])
+        total = sum(entry['elapsed'] for entry in statements)
+        g._sql_totals = (len(statements), total)
+        slow = []
+        for entry in statements:
+            elapsed_ms = entry['elapsed'] * 1000
+            if elapsed_ms < SQL_SLOW_QUERY_MS:
+                continue
+            sql = _WHITESPACE.sub(' ', entry['sql']).strip()
+            slow.append({
+                'sql': sql,
+                'params': entry['shape'],
+                'elapsed_ms': round(elapsed_ms, 3),
+                'plan': _explain(entry['sql'], entry['sample'], connect),
+                'method': request.method,
+                'path': request.path,
+                'endpoint': request.endpoint,
+                'at': datetime.now().isoformat(),
+            })
+        # EXPLAIN 本身执行的语句不计入本请求
+        g.pop('_sql_statements', None)
+        _slow_log.record_request(len(statements), slow)
+        if current_app.debug:
+            response.headers['X-SQL-Queries'] = str(len(statements))
+            response.headers['X-SQL-Time'] = f'{total * 1000:.2f}ms'
+            response.headers['X-SQL-Slow-Queries'] = str(len(slow))
+        return response